@@ -0,0 +1,92 @@
+"""Cold start benchmark for the C3 modules and CLI.
+
+Runs every target in a fresh interpreter and reports the median and minimum wall time,
+plus the slowest imports of the first target from ``python -X importtime``:
+
+    python bench/c3_import_bench.py --repeat 20
+    python bench/c3_import_bench.py --budget-ms 200 --output c3_import.json
+
+With ``--budget-ms`` the benchmark fails if the median of any target exceeds the budget.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+
+TARGETS = {
+    "import c3.create_operator": ["-c", "import c3.create_operator"],
+    "import c3.create_gridwrapper": ["-c", "import c3.create_gridwrapper"],
+    "import c3.create_containerless_operator": ["-c", "import c3.create_containerless_operator"],
+    "c3_create_operator --help": ["-m", "c3.create_operator", "--help"],
+}
+
+
+def _env() -> Dict[str, str]:
+    # c3 is imported as a top-level package from src/claimed
+    paths = [os.path.join(SRC, "claimed"), SRC, os.environ.get("PYTHONPATH", "")]
+    return dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, paths)))
+
+
+def measure(args: List[str], repeat: int) -> Dict[str, float]:
+    env = _env()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], env=env, check=True, stdout=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return {"median_ms": round(statistics.median(timings), 1), "min_ms": round(min(timings), 1)}
+
+
+def slowest_imports(args: List[str], top: int) -> List[Dict[str, object]]:
+    """Cumulative import times in ms of the slowest top-level imports."""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", *args], env=_env(), check=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True).stderr
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # top-level imports are not indented
+        if not name[1:].startswith(" "):
+            imports.append({"module": name.strip(), "cumulative_ms": round(int(cumulative) / 1000.0, 1)})
+    return sorted(imports, key=lambda i: i["cumulative_ms"], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="C3 import time benchmark")
+    parser.add_argument("--repeat", type=int, default=10, help="cold starts per target")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest imports to report")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail if a median exceeds this time")
+    args = parser.parse_args()
+
+    baseline = measure(["-c", "pass"], args.repeat)
+    results = {name: measure(target, args.repeat) for name, target in TARGETS.items()}
+    report = {
+        "python": sys.version.split()[0],
+        "interpreter_ms": baseline,
+        "results": results,
+        "slowest_imports": slowest_imports(next(iter(TARGETS.values())), args.top),
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.budget_ms is not None:
+        over = [f"{name}: {r['median_ms']} ms > {args.budget_ms} ms" for name, r in results.items()
+                if r["median_ms"] > args.budget_ms]
+        for o in over:
+            print(f"OVER BUDGET {o}", file=sys.stderr)
+        if over:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
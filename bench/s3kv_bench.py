@@ -0,0 +1,176 @@
+"""Latency and request-count benchmark for ``claimed.mlx.s3_kv_store.S3KVStore``.
+
+Populates a store with N keys carrying M index fields against a local S3 stand-in
+(an in-process moto server, or any endpoint such as MinIO) and measures ``put``,
+``get``, ``update``, ``search`` and ``list``. For every operation it reports p50/p99
+latency and the number of S3 requests issued, counted with botocore event hooks.
+
+    python bench/s3kv_bench.py --moto --sizes 1000,10000 --output results.json
+    python bench/s3kv_bench.py --moto --sizes 1000 --baseline bench/s3kv_baseline.json
+
+Request counts are deterministic and are compared against the baseline exactly
+(plus ``--request-tolerance``); latencies are only compared when the baseline
+contains them and ``--latency-tolerance`` is given, since they depend on the host.
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import boto3
+
+from claimed.mlx.s3_kv_store import S3KVStore, _build_filename
+
+OPERATIONS = ("put", "get", "update", "search", "list")
+
+
+class RequestCounter:
+    """Counts S3 API calls issued by a boto3 client."""
+
+    def __init__(self, client):
+        self.calls: Counter = Counter()
+        client.meta.events.register("before-call.s3.*", self._on_call)
+
+    def _on_call(self, event_name: str, **kwargs):
+        self.calls[event_name.rsplit(".", 1)[-1]] += 1
+
+    def total(self) -> int:
+        return sum(self.calls.values())
+
+
+def _key(i: int) -> str:
+    return f"key-{i:08d}"
+
+
+def _indexes(i: int, n_fields: int) -> Dict[str, str]:
+    return {f"field{j}": str(i % (j + 2)) for j in range(n_fields)}
+
+
+def populate(store: S3KVStore, n_keys: int, n_fields: int, workers: int = 32) -> None:
+    # raw put_object: the existence check of put() would double the set-up time
+    def put(i):
+        s3_key = store._s3_key_for_filename(_build_filename(_key(i), _indexes(i, n_fields)))
+        store.s3.put_object(Bucket=store.bucket, Key=s3_key, Body=json.dumps({"i": i}).encode("utf-8"), ContentType="application/json")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(put, range(n_keys)))
+
+
+def _measure(counter: RequestCounter, fn: Callable[[], Any], samples: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    before = counter.total()
+    for _ in range(samples):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    latencies.sort()
+    return {
+        "samples": samples,
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))], 3),
+        "requests_per_op": round((counter.total() - before) / samples, 3),
+    }
+
+
+def run_size(client, bucket: str, n_keys: int, n_fields: int, samples: int, scan_samples: int, seed: int = 0) -> Dict[str, Any]:
+    store = S3KVStore(bucket=bucket, store_name=f"bench-{n_keys}-{uuid.uuid4().hex[:8]}", s3_client=client)
+    populate(store, n_keys, n_fields)
+    counter = RequestCounter(client)
+    rng = random.Random(seed)
+    next_key = iter(range(n_keys, n_keys + samples))
+
+    results = {
+        "put": _measure(counter, lambda: store.put(_key(next(next_key)), {"new": True}, indexes=_indexes(0, n_fields)), samples),
+        "get": _measure(counter, lambda: store.get(_key(rng.randrange(n_keys))), samples),
+        "update": _measure(counter, lambda: store.update(_key(rng.randrange(n_keys)), {"updated": True}), samples),
+        "search": _measure(counter, lambda: store.search({"field0": "1"}), scan_samples),
+        "list": _measure(counter, lambda: store.list(), scan_samples),
+    }
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], request_tolerance: float = 0.0, latency_tolerance: Optional[float] = None) -> List[str]:
+    """Return a list of human-readable regressions of ``results`` against ``baseline``."""
+    regressions = []
+    for size, ops in baseline.get("results", {}).items():
+        if size not in results:
+            continue
+        for op, base in ops.items():
+            current = results[size].get(op)
+            if current is None:
+                continue
+            limit = base["requests_per_op"] * (1.0 + request_tolerance)
+            if current["requests_per_op"] > limit:
+                regressions.append(f"{op}@{size}: {current['requests_per_op']} requests/op > baseline {base['requests_per_op']}")
+            if latency_tolerance is not None and base.get("p99_ms") is not None:
+                limit = base["p99_ms"] * (1.0 + latency_tolerance)
+                if current["p99_ms"] > limit:
+                    regressions.append(f"{op}@{size}: p99 {current['p99_ms']} ms > baseline {base['p99_ms']} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="S3KVStore benchmark")
+    parser.add_argument("--endpoint", help="S3 endpoint, e.g. a local MinIO (http://localhost:9000)")
+    parser.add_argument("--moto", action="store_true", help="start an in-process moto server as the endpoint")
+    parser.add_argument("--bucket", default="s3kv-bench")
+    parser.add_argument("--sizes", default="1000", help="comma-separated store sizes, e.g. 1000,10000,100000,1000000")
+    parser.add_argument("--index-fields", type=int, default=3)
+    parser.add_argument("--samples", type=int, default=100, help="samples for put/get/update")
+    parser.add_argument("--scan-samples", type=int, default=5, help="samples for search/list")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="baseline JSON file to compare against")
+    parser.add_argument("--request-tolerance", type=float, default=0.0)
+    parser.add_argument("--latency-tolerance", type=float, default=None, help="e.g. 0.5 allows p99 50%% above baseline")
+    args = parser.parse_args()
+
+    server = None
+    endpoint = args.endpoint
+    if args.moto:
+        from moto.server import ThreadedMotoServer
+        server = ThreadedMotoServer(port=0)
+        server.start()
+        host, port = server.get_host_and_port()
+        endpoint = f"http://{host}:{port}"
+    try:
+        client = boto3.client("s3", endpoint_url=endpoint, aws_access_key_id="bench", aws_secret_access_key="bench", region_name="us-east-1")
+        try:
+            client.create_bucket(Bucket=args.bucket)
+        except client.exceptions.BucketAlreadyOwnedByYou:
+            pass
+
+        results: Dict[str, Any] = {}
+        for size in (int(s) for s in args.sizes.split(",")):
+            print(f"benchmarking {size} keys ...", file=sys.stderr)
+            results[str(size)] = run_size(client, args.bucket, size, args.index_fields, args.samples, args.scan_samples)
+    finally:
+        if server is not None:
+            server.stop()
+
+    report = {
+        "config": {"index_fields": args.index_fields, "samples": args.samples, "scan_samples": args.scan_samples},
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.request_tolerance, args.latency_tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
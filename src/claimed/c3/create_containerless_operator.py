@@ -1,17 +1,90 @@
 import argparse
+import compileall
+import hashlib
 import os
+import platform
+import py_compile
+import shutil
 import sys
 import logging
 import subprocess
 import re
+import tempfile
 from c3.create_operator import create_cwl_component
 from c3.pythonscript import Pythonscript
-from c3.templates import component_setup_code_wo_logging, python_component_setup_code
+from c3 import templates
+from c3.utils import _locked
+
+ENV_CACHE_PATH = os.environ.get('CLAIMED_ENV_CACHE',
+                                os.path.join(os.path.expanduser('~'), '.cache', 'claimed', 'envs'))
+ENV_HASH_FILE = 'claimedenv.hash'
+ENV_REQUIREMENTS_FILE = 'claimedenv.requirements'
+ENV_COMPLETE_MARKER = '.complete'
+ARCHIVE_FORMATS = ('zip', 'tar', 'tar.zst')
+
+
+def normalize_requirements(pip_packages):
+    """
+    Returns the pip install arguments as a sorted list without duplicates and with normalized package names,
+    so that the same requirement set always results in the same environment.
+    """
+    requirements = pip_packages.split()
+    if any(r.startswith('-') for r in requirements):
+        # pip options (e.g. -r file, --index-url url) depend on the argument order
+        return requirements
+
+    def normalize(requirement):
+        # PEP 503 normalization of the package name, version specifiers are kept
+        name, rest = re.match(r'([A-Za-z0-9._-]*)(.*)', requirement).groups()
+        return re.sub(r'[-_.]+', '-', name).lower() + rest
+
+    return sorted(set(map(normalize, requirements)))
+
+
+def get_env_hash(requirements):
+    """
+    Hash of the requirement set and the python interpreter that identifies a virtual environment.
+    """
+    sha = hashlib.sha256()
+    sha.update(f'{sys.implementation.name}{sys.version_info[0]}.{sys.version_info[1]}'
+               f'-{sys.platform}-{platform.machine()}\0'.encode('utf-8'))
+    sha.update('\n'.join(requirements).encode('utf-8'))
+    return sha.hexdigest()[:32]
+
+
+def get_env(requirements, cache_path=ENV_CACHE_PATH):
+    """
+    Returns the path of the virtual environment for the requirements in the shared environment cache.
+    The environment is created once per requirement set and reused by all operators.
+    """
+    env_hash = get_env_hash(requirements)
+    env_path = os.path.join(cache_path, env_hash)
+    os.makedirs(cache_path, exist_ok=True)
+    with _locked(env_path):
+        if os.path.isfile(os.path.join(env_path, ENV_COMPLETE_MARKER)):
+            logging.info(f'Reusing environment {env_hash} from {cache_path}')
+            return env_path
+        logging.info(f'Creating environment {env_hash} in {cache_path}')
+        # remove leftovers of an interrupted installation
+        shutil.rmtree(env_path, ignore_errors=True)
+        subprocess.run([sys.executable, '-m', 'venv', env_path], check=True)
+        if requirements:
+            subprocess.run([os.path.join(env_path, 'bin', 'pip'), 'install', *requirements], check=True)
+        logging.debug(subprocess.run([os.path.join(env_path, 'bin', 'pip'), 'list'],
+                                     stdout=subprocess.PIPE, text=True).stdout)
+        with open(os.path.join(env_path, ENV_COMPLETE_MARKER), 'w') as f:
+            f.write(' '.join(requirements))
+    return env_path
+
 
 def create_containerless_operator(
         file_path,
         version,
-        skip_logging = False
+        skip_logging = False,
+        bundle_env = False,
+        env_cache = ENV_CACHE_PATH,
+        archive_format = 'zip',
+        precompile = False,
     ):
 
     if version is None:
@@ -23,6 +96,8 @@ def create_containerless_operator(
 
     if file_extension != '.py':
         raise NotImplementedError('Containerless operators currenly only support python scripts')
+    if archive_format not in ARCHIVE_FORMATS:
+        raise ValueError(f'Unsupported archive format {archive_format}, select one of {", ".join(ARCHIVE_FORMATS)}.')
     
     all_pip_packages_found = ''
     with open(file_path, 'r') as file:
@@ -43,19 +118,47 @@ def create_containerless_operator(
     with open(file_path, 'r') as f:
         script = f.read()
     if skip_logging:
-        script = component_setup_code_wo_logging + script
+        script = templates.component_setup_code_wo_logging + script
     else:
-        script = python_component_setup_code + script
+        script = templates.python_component_setup_code + script
     with open(target_code, 'w') as f:
         f.write(script)
 
-    subprocess.run(';'.join(['rm -Rf claimedenv','python -m venv claimedenv', 
-                                        'source ./claimedenv/bin/activate', 
-                                        f'pip install {all_pip_packages_found.strip()}',
-                                        'pip list',
-                                        f'zip -r claimed-{filename}:{version}.zip {target_code} claimedenv',
-                                        'rm -Rf claimedenv',
-                                        f'rm {target_code}']), shell=True)
+    requirements = normalize_requirements(all_pip_packages_found)
+    env_path = get_env(requirements, env_cache)
+
+    # the archive references the environment by its hash, the runner resolves it in the environment cache
+    archive = os.path.abspath(f'claimed-{filename}:{version}.{archive_format}')
+    with tempfile.TemporaryDirectory(prefix='claimed-') as staging_dir:
+        shutil.move(target_code, os.path.join(staging_dir, target_code))
+        with open(os.path.join(staging_dir, ENV_HASH_FILE), 'w') as f:
+            f.write(os.path.basename(env_path))
+        with open(os.path.join(staging_dir, ENV_REQUIREMENTS_FILE), 'w') as f:
+            f.write(' '.join(requirements))
+        files = [target_code, ENV_HASH_FILE, ENV_REQUIREMENTS_FILE]
+        if bundle_env:
+            # self-contained archive, the environment is hardlinked from the cache instead of reinstalled
+            shutil.copytree(env_path, os.path.join(staging_dir, 'claimedenv'), symlinks=True,
+                            copy_function=_link_or_copy, ignore=shutil.ignore_patterns(ENV_COMPLETE_MARKER))
+            files.append('claimedenv')
+        if precompile:
+            # hash-based pyc files stay valid after unpacking, independent of file modification times
+            compileall.compile_file(os.path.join(staging_dir, target_code), quiet=1,
+                                    invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+            files.append('__pycache__')
+        if os.path.exists(archive):
+            os.remove(archive)
+        if archive_format == 'zip':
+            subprocess.run(['zip', '-q', '-r', archive, *files], cwd=staging_dir, check=True)
+        else:
+            # tar keeps the exact modification times, so the pyc files of the environment remain valid
+            subprocess.run(['tar', *(['--zstd'] if archive_format == 'tar.zst' else []), '-cf', archive, *files],
+                           cwd=staging_dir, check=True)
+    # the runner unpacks each archive once into a cache keyed by this hash
+    with open(f'{archive}.sha256', 'w') as f:
+        f.write(_hash_archive(archive))
+    logging.info(f'Created operator archive {archive}')
+
     script_data = Pythonscript(file_path)
     inputs = script_data.get_inputs()
     outputs = script_data.get_outputs()
@@ -63,6 +166,20 @@ def create_containerless_operator(
     create_cwl_component(filename, "containerless", version, file_path, inputs, outputs)
 
 
+def _hash_archive(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        # e.g. cache and staging directory on different file systems
+        shutil.copy2(src, dst)
 
 
 def main():
@@ -74,6 +191,14 @@ def main():
     parser.add_argument('-v', '--version', type=str, default=None,
                         help='Container image version. Auto-increases the version number if not provided (default 0.1)')
     parser.add_argument('-l', '--log_level', type=str, default='INFO')
+    parser.add_argument('--bundle-env', action='store_true',
+                        help='Include the virtual environment in the archive instead of referencing it by hash.')
+    parser.add_argument('--env-cache', type=str, default=ENV_CACHE_PATH,
+                        help=f'Directory of the shared environment cache (default: {ENV_CACHE_PATH}).')
+    parser.add_argument('--format', type=str, default='zip', choices=ARCHIVE_FORMATS,
+                        help='Archive format. Uncompressed tar or tar.zst archives start faster (default: zip).')
+    parser.add_argument('--precompile', action='store_true',
+                        help='Include precompiled bytecode of the operator code in the archive.')
     args = parser.parse_args()
 
     # Init logging
@@ -88,6 +213,10 @@ def main():
     create_containerless_operator(
         file_path=args.FILE_PATH,
         version=args.version,
+        bundle_env=args.bundle_env,
+        env_cache=args.env_cache,
+        archive_format=args.format,
+        precompile=args.precompile,
     )
 
 if __name__ == '__main__':
@@ -6,7 +6,7 @@ from string import Template
 from c3.pythonscript import Pythonscript
 from c3.utils import convert_notebook
 from c3.create_operator import create_operator
-from c3.templates import component_setup_code_wo_logging
+from c3 import templates
 import c3
 
 
@@ -24,18 +24,19 @@ def wrap_component(component_path,
     logging.info(f'Using backend: {backend}')
 
     backends = {
-        'local': c3.templates.grid_wrapper_template,
-        'cos': c3.templates.cos_grid_wrapper_template,
-        'legacy_cos': c3.templates.legacy_cos_grid_wrapper_template,
-        's3kv': c3.templates.s3kv_grid_wrapper_template,
-        'grid_wrapper': c3.templates.grid_wrapper_template,
-        'cos_grid_wrapper': c3.templates.cos_grid_wrapper_template,
-        'legacy_cos_grid_wrapper': c3.templates.legacy_cos_grid_wrapper_template,
-        's3kv_grid_wrapper': c3.templates.s3kv_grid_wrapper_template,
-        'simple_grid_wrapper': c3.templates.simple_grid_wrapper_template,
-        'folder_grid_wrapper': c3.templates.folder_grid_wrapper_template,
+        'local': c3.templates.GRID_WRAPPER_FILE,
+        'cos': c3.templates.COS_GRID_WRAPPER_FILE,
+        'legacy_cos': c3.templates.LEGACY_COS_GRID_WRAPPER_FILE,
+        's3kv': c3.templates.S3KV_GRID_WRAPPER_FILE,
+        'grid_wrapper': c3.templates.GRID_WRAPPER_FILE,
+        'cos_grid_wrapper': c3.templates.COS_GRID_WRAPPER_FILE,
+        'legacy_cos_grid_wrapper': c3.templates.LEGACY_COS_GRID_WRAPPER_FILE,
+        's3kv_grid_wrapper': c3.templates.S3KV_GRID_WRAPPER_FILE,
+        'simple_grid_wrapper': c3.templates.SIMPLE_GRID_WRAPPER_FILE,
+        'folder_grid_wrapper': c3.templates.FOLDER_GRID_WRAPPER_FILE,
     }
-    gw_template = backends.get(backend)
+    # only the selected template is loaded
+    gw_template = c3.templates.get_template(backends[backend]) if backend in backends else None
 
     logging.debug(f'Using backend template: {gw_template}')
 
@@ -115,7 +116,7 @@ def edit_component_code(file_path, component_process):
     assert component_process in script, (f'Did not find the grid process {component_process} in the script. '
                                          f'Please provide the grid process in the arguments `-p <grid_process>`.')
     # Add code for logging and cli parameters to the beginning of the script
-    script = component_setup_code_wo_logging + script
+    script = templates.component_setup_code_wo_logging + script
     # replace old filename with new file name
     script = script.replace(file_name, target_file_name)
     with open(target_file, 'w') as f:
@@ -189,6 +190,11 @@ def main():
                         help='Select image platform, default is linux/amd64. Alternativly, select linux/arm64".')
     parser.add_argument('--image_version', type=str, default='python3.12',
                         help='Select python or R version (defaults to python3.12).')
+    parser.add_argument('--optimize-layers', action='store_true',
+                        help='Generate a layer-cache-friendly dockerfile: requirements are installed first in a '
+                             'single step with BuildKit cache mounts, code is added last.')
+    parser.add_argument('--precompile', action='store_true',
+                        help='With --optimize-layers, precompile the python code to bytecode in the image.')
 
     args = parser.parse_args()
 
@@ -238,6 +244,8 @@ def main():
             platform=args.platform,
             dockerfile=args.dockerfile,
             image_version=args.image_version,
+            optimize_layers=args.optimize_layers,
+            precompile=args.precompile,
         )
     except Exception as err:
         logging.error('Error while generating CLAIMED grid wrapper. '
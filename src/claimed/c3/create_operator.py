@@ -1,6 +1,7 @@
 
 import os
 import sys
+import contextlib
 import logging
 import shutil
 import argparse
@@ -8,23 +9,26 @@ import subprocess
 import glob
 import re
 import json
+import time
+import tempfile
 from pathlib import Path
 from string import Template
 from typing import Optional
 from c3.pythonscript import Pythonscript
 from c3.notebook import Notebook
 from c3.rscript import Rscript
-from c3.utils import convert_notebook, get_image_version
-from c3.templates import (python_component_setup_code, component_setup_code_wo_logging, r_component_setup_code,
-                          python_dockerfile_template, r_dockerfile_template,
-                          kfp_component_template, kubernetes_job_template, cwl_component_template)
+from c3.utils import (convert_notebook, get_image_version, get_build_hash, lookup_build_cache, update_build_cache,
+                      image_exists, prefetch_registry_image_tags, add_registry_image_tag, BUILD_CACHE_PATH,
+                      BUILD_HASH_LABEL)
+from c3 import templates
 
 CLAIMED_VERSION = 'V0.1'
 
 
 def create_dockerfile(dockerfile_template, dockerfile, requirements, target_code, target_dir, additional_files,
-                      working_dir, command, image_version):
+                      working_dir, command, image_version, optimize_layers=False, precompile=False):
     # Check for requirements file
+    requirements_files = []
     for i in range(len(requirements)):
         if '-r ' in requirements[i]:
             r_file_search = re.search('-r ~?\/?([^\s]*\.txt)', requirements[i])
@@ -34,14 +38,26 @@ def create_dockerfile(dockerfile_template, dockerfile, requirements, target_code
                 if requirements_file not in additional_files and os.path.isfile(requirements_file):
                     # Add missing requirements text file to additional files
                     additional_files.append(r_file_search.groups()[0])
+                requirements_files.append(requirements_file)
             if '/' not in requirements[i]:
                 # Add missing home directory to the command `pip install -r ~/requirements.txt`
                 requirements[i] = requirements[i].replace('-r ', '-r ~/')
 
-    requirements_docker = list(map(lambda s: 'RUN ' + s, requirements))
-    requirements_docker = '\n'.join(requirements_docker)
-    additional_files_docker = list(map(lambda s: f"ADD {s} {working_dir}{s}", additional_files))
-    additional_files_docker = '\n'.join(additional_files_docker)
+    if optimize_layers:
+        # Requirements files and all installs go into the first layers, so that code changes only rebuild the
+        # final layers. The installs are chained in a single RUN with cache mounts (requires BuildKit).
+        requirements_files_docker = '\n'.join(f"ADD {s} {working_dir}{s}"
+                                               for s in additional_files if s in requirements_files)
+        additional_files = [s for s in additional_files if s not in requirements_files]
+        requirements_docker = ''.join(' && \\\n    ' + s for s in requirements)
+        additional_files_docker = '\n'.join(f"ADD {s} {working_dir}{s}" for s in additional_files)
+        precompile_docker = f'RUN python -m compileall -q -j 0 {working_dir}' if precompile else ''
+    else:
+        requirements_files_docker = precompile_docker = ''
+        requirements_docker = list(map(lambda s: 'RUN ' + s, requirements))
+        requirements_docker = '\n'.join(requirements_docker)
+        additional_files_docker = list(map(lambda s: f"ADD {s} {working_dir}{s}", additional_files))
+        additional_files_docker = '\n'.join(additional_files_docker)
 
     # Select base image
     if 'python' in command:
@@ -58,6 +74,8 @@ def create_dockerfile(dockerfile_template, dockerfile, requirements, target_code
     docker_file = dockerfile_template.substitute(
         base_image=base_image,
         requirements_docker=requirements_docker,
+        requirements_files_docker=requirements_files_docker,
+        precompile_docker=precompile_docker,
         target_code=target_code,
         target_dir=target_dir,
         additional_files_docker=additional_files_docker,
@@ -96,7 +114,7 @@ def create_kfp_component(name, description, repository, version, command, target
     for output_key in outputs.keys():
         parameter_values += f"        - {{outputPath: {output_key}}}\n"
 
-    yaml = kfp_component_template.substitute(
+    yaml = templates.kfp_component_template.substitute(
         name=name,
         description=description,
         repository=repository,
@@ -125,7 +143,7 @@ def create_kubernetes_job(name, repository, version, target_code, target_dir, co
         env_entries += f"        - name: {key}\n          value: value_of_{key}\n"
     env_entries = env_entries.rstrip()
 
-    job_yaml = kubernetes_job_template.substitute(
+    job_yaml = templates.kubernetes_job_template.substitute(
         name=name,
         repository=repository,
         version=version,
@@ -166,7 +184,7 @@ def create_cwl_component(name, repository, version, file_path, inputs, outputs):
         output_envs += (f"  {output}:\n    type: string\n    "
                         f"inputBinding:\n      position: {i}\n      prefix: --{output}\n")
 
-    cwl = cwl_component_template.substitute(
+    cwl = templates.cwl_component_template.substitute(
         name=name,
         repository=repository,
         version=version,
@@ -254,6 +272,10 @@ def create_operator(file_path: str,
                     dockerfile='Dockerfile.generated',
                     image_version='python3.12',
                     skip_docker_build=False,
+                    build_cache=BUILD_CACHE_PATH,
+                    build_lock=None,
+                    optimize_layers=False,
+                    precompile=False,
                     ):
     logging.info('Parameters: ')
     logging.info('file_path: ' + file_path)
@@ -270,14 +292,15 @@ def create_operator(file_path: str,
         with open(target_code, 'r') as f:
             script = f.read()
         if skip_logging:
-            script = component_setup_code_wo_logging + script
+            script = templates.component_setup_code_wo_logging + script
         else:
-            script = python_component_setup_code + script
+            script = templates.python_component_setup_code + script
         with open(target_code, 'w') as f:
             f.write(script)
         # getting parameter from the script
         script_data = Pythonscript(target_code)
-        dockerfile_template = custom_dockerfile_template or python_dockerfile_template
+        dockerfile_template = custom_dockerfile_template or (
+            templates.python_optimized_dockerfile_template if optimize_layers else templates.python_dockerfile_template)
         command = '/opt/app-root/bin/python'
         working_dir = '/opt/app-root/src/'
 
@@ -291,12 +314,14 @@ def create_operator(file_path: str,
         # Add code for logging and cli parameters to the beginning of the notebook
         notebook['cells'].insert(0, {
             'cell_type': 'code', 'execution_count': None, 'metadata': {}, 'outputs': [],
-            'source': component_setup_code_wo_logging if skip_logging else python_component_setup_code})
+            'source': (templates.component_setup_code_wo_logging if skip_logging
+                       else templates.python_component_setup_code)})
         with open(target_code, 'w') as json_file:
              json.dump(notebook, json_file)
         # getting parameter from the script
         script_data = Notebook(target_code)
-        dockerfile_template = custom_dockerfile_template or python_dockerfile_template
+        dockerfile_template = custom_dockerfile_template or (
+            templates.python_optimized_dockerfile_template if optimize_layers else templates.python_dockerfile_template)
         command = '/opt/app-root/bin/ipython'
         working_dir = '/opt/app-root/src/'
 
@@ -308,12 +333,15 @@ def create_operator(file_path: str,
         # Add code for logging and cli parameters to the beginning of the script
         with open(target_code, 'r') as f:
             script = f.read()
-        script = r_component_setup_code + script
+        script = templates.r_component_setup_code + script
         with open(target_code, 'w') as f:
             f.write(script)
         # getting parameter from the script
         script_data = Rscript(target_code)
-        dockerfile_template = custom_dockerfile_template or r_dockerfile_template
+        dockerfile_template = custom_dockerfile_template or templates.r_dockerfile_template
+        if optimize_layers and custom_dockerfile_template is None:
+            logging.warning('Optimized dockerfile layers are only supported for python components, using default.')
+            optimize_layers = False
         command = 'Rscript'
         working_dir = '/home/docker/'
     else:
@@ -363,7 +391,21 @@ def create_operator(file_path: str,
                  f'{", ".join(additional_files_found)}')
 
     create_dockerfile(dockerfile_template, dockerfile, requirements, target_code, target_dir, additional_files_found,
-                      working_dir, command, image_version)
+                      working_dir, command, image_version, optimize_layers, precompile)
+
+    # Reuse an existing image if the Dockerfile and all files in the image are unchanged
+    build_hash = None
+    cache_hit = False
+    if build_cache and not skip_docker_build:
+        build_hash = get_build_hash(dockerfile, [target_code] + additional_files_found, platform)
+        image = f'{repository}/claimed-{name}' if repository is not None else f'claimed-{name}'
+        cached_version = None if no_cache else lookup_build_cache(image, build_hash, build_cache)
+        logging.debug(f'Build hash {build_hash}, cached version {cached_version}')
+        if cached_version is not None and version in (None, cached_version) \
+                and image_exists(f'{image}:{cached_version}', remote=repository is not None and not local_mode):
+            logging.info(f'Found unchanged image {image}:{cached_version} in build cache, skip docker build and push.')
+            version = cached_version
+            cache_hit = True
 
     if version is None:
         # auto increase version based on registered images
@@ -376,61 +418,68 @@ def create_operator(file_path: str,
         local_mode = True
         repository = 'local'
 
-    if not skip_docker_build:                   
-        if subprocess.run('docker buildx', shell=True, stdout=subprocess.PIPE).returncode == 0:
-            # Using docker buildx
-            logging.debug('Using docker buildx')
-            build_command = f'docker buildx build -f {dockerfile}'
-        else:
-            logging.debug('Using docker build. Consider installing docker-buildx.')
-            build_command = f'docker build -f {dockerfile}'
-    
-        logging.info(f'Building container image claimed-{name}:{version}')
-        try:
-            # Run docker build
-            subprocess.run(
-                f"{build_command} --platform {platform} -t claimed-{name}:{version} . {'--no-cache' if no_cache else ''}",
-                stdout=None if log_level == 'DEBUG' else subprocess.PIPE, check=True, shell=True
-            )
-            if repository is not None:
-                # Run docker tag
-                logging.debug(f'Tagging images with "latest" and "{version}"')
-                subprocess.run(
-                    f"docker tag claimed-{name}:{version} {repository}/claimed-{name}:{version}",
-                    stdout=None if log_level == 'DEBUG' else subprocess.PIPE, check=True, shell=True,
-                )
-                subprocess.run(
-                    f"docker tag claimed-{name}:{version} {repository}/claimed-{name}:latest",
-                    stdout=None if log_level == 'DEBUG' else subprocess.PIPE, check=True, shell=True,
-                )
-        except Exception as err:
-            logging.error('Docker build failed. Consider running C3 with `--log_level DEBUG` to see the docker build logs.')
-            if not keep_generated_files:
-                remove_temporary_files(file_path, target_code)
-            raise err
-        logging.info(f'Successfully built image claimed-{name}:{version}')
+    if not skip_docker_build and not cache_hit:
+        # limit the number of concurrent docker builds in bulk mode
+        with build_lock or contextlib.nullcontext():
+            if subprocess.run('docker buildx', shell=True, stdout=subprocess.PIPE).returncode == 0:
+                # Using docker buildx
+                logging.debug('Using docker buildx')
+                build_command = f'docker buildx build -f {dockerfile}'
+            else:
+                logging.debug('Using docker build. Consider installing docker-buildx.')
+                build_command = f'docker build -f {dockerfile}'
     
-        if local_mode:
-            logging.info(f'No repository provided, skip docker push.')
-        else:
-            logging.info(f'Pushing images to registry {repository}')
+            logging.info(f'Building container image claimed-{name}:{version}')
             try:
-                # Run docker push
-                subprocess.run(
-                    f"docker push {repository}/claimed-{name}:latest",
-                    stdout=None if log_level == 'DEBUG' else subprocess.PIPE, check=True, shell=True,
-                )
+                # Run docker build
                 subprocess.run(
-                    f"docker push {repository}/claimed-{name}:{version}",
-                    stdout=None if log_level == 'DEBUG' else subprocess.PIPE, check=True, shell=True,
+                    f"{build_command} --platform {platform} -t claimed-{name}:{version} "
+                    f"{f'--label {BUILD_HASH_LABEL}={build_hash} ' if build_hash else ''}. {'--no-cache' if no_cache else ''}",
+                    stdout=None if log_level == 'DEBUG' else subprocess.PIPE, check=True, shell=True
                 )
-                logging.info('Successfully pushed image to registry')
+                if repository is not None:
+                    # Run docker tag
+                    logging.debug(f'Tagging images with "latest" and "{version}"')
+                    subprocess.run(
+                        f"docker tag claimed-{name}:{version} {repository}/claimed-{name}:{version}",
+                        stdout=None if log_level == 'DEBUG' else subprocess.PIPE, check=True, shell=True,
+                    )
+                    subprocess.run(
+                        f"docker tag claimed-{name}:{version} {repository}/claimed-{name}:latest",
+                        stdout=None if log_level == 'DEBUG' else subprocess.PIPE, check=True, shell=True,
+                    )
             except Exception as err:
-                logging.error(f'Could not push images to namespace {repository}. '
-                              f'Please check if docker is logged in or select a namespace with access.')
+                logging.error('Docker build failed. Consider running C3 with `--log_level DEBUG` to see the docker build logs.')
                 if not keep_generated_files:
                     remove_temporary_files(file_path, target_code)
                 raise err
+            logging.info(f'Successfully built image claimed-{name}:{version}')
+    
+            if local_mode:
+                logging.info(f'No repository provided, skip docker push.')
+            else:
+                logging.info(f'Pushing images to registry {repository}')
+                try:
+                    # Run docker push
+                    subprocess.run(
+                        f"docker push {repository}/claimed-{name}:latest",
+                        stdout=None if log_level == 'DEBUG' else subprocess.PIPE, check=True, shell=True,
+                    )
+                    subprocess.run(
+                        f"docker push {repository}/claimed-{name}:{version}",
+                        stdout=None if log_level == 'DEBUG' else subprocess.PIPE, check=True, shell=True,
+                    )
+                    logging.info('Successfully pushed image to registry')
+                    add_registry_image_tag(f'{repository}/claimed-{name}', version)
+                except Exception as err:
+                    logging.error(f'Could not push images to namespace {repository}. '
+                                  f'Please check if docker is logged in or select a namespace with access.')
+                    if not keep_generated_files:
+                        remove_temporary_files(file_path, target_code)
+                    raise err
+
+            if build_hash is not None:
+                update_build_cache(image, build_hash, version, build_cache)
 
     # Check for existing files and optionally modify them before overwriting
     try:
@@ -454,11 +503,172 @@ def create_operator(file_path: str,
     if not keep_generated_files:
         remove_temporary_files(file_path, target_code)
 
+    return f'{repository}/claimed-{name}:{version}'
+
+
+COMPONENT_SUFFIXES = ('.py', '.ipynb', '.r')
+OPERATOR_SUFFIXES = ('.yaml', '.job.yaml', '.cwl')
+
+
+def find_component_files(path):
+    """
+    Returns the components in a directory (recursive) or matching a glob pattern.
+    Hidden files, private modules and generated `claimed_*` files are skipped.
+    """
+    if os.path.isdir(path):
+        file_paths = glob.glob(os.path.join(path, '**', '*'), recursive=True)
+    else:
+        file_paths = glob.glob(path, recursive=True)
+    return sorted(f for f in file_paths
+                  if os.path.isfile(f) and f.lower().endswith(COMPONENT_SUFFIXES)
+                  and not os.path.basename(f).startswith(('_', '.', 'claimed_'))
+                  and '.ipynb_checkpoints' not in f)
+
+
+def _copy_to_context(path, build_context):
+    target = os.path.join(build_context, path)
+    os.makedirs(os.path.dirname(target) or build_context, exist_ok=True)
+    if os.path.isdir(path):
+        shutil.copytree(path, target, dirs_exist_ok=True)
+    else:
+        shutil.copy2(path, target)
+
+
+def _resolve_existing_files(file_paths, rename_files=None, overwrite_files=False):
+    """
+    Asks once for all components with an existing Kubernetes job file how to handle them, because the workers
+    of the process pool cannot prompt. Returns the rename_files and overwrite_files values for the workers.
+    """
+    if rename_files is None and overwrite_files:
+        return None, True
+    existing = [f for f in file_paths if Path(f).with_suffix('.job.yaml').is_file()]
+    if len(existing) == 0:
+        return rename_files, overwrite_files
+    if rename_files is None:
+        rename_files = input(f'\nFound {len(existing)} existing Kubernetes job files, e.g. '
+                             f'{Path(existing[0]).with_suffix(".job.yaml")}.\n'
+                             f'ENTER to overwrite the files or write Y to rename them to modified_<file name>:\n')
+    if rename_files.strip() == '':
+        return '', overwrite_files
+    if rename_files.lower() != 'y':
+        raise ValueError(f'Bulk mode only supports renaming existing job files to modified_<file name>, '
+                         f'got {rename_files}.')
+    modified = [p for p in (Path(f).with_name('modified_' + Path(f).name).with_suffix('.job.yaml') for f in existing)
+                if p.exists()]
+    if modified and not overwrite_files:
+        overwrite = input(f'{len(modified)} modified paths already exist, e.g. {modified[0]}. '
+                          f'ENTER to overwrite the files.')
+        if overwrite != '':
+            logging.error('Abort creating operators. Please rename files manually and rerun the script.')
+            raise FileExistsError
+    return 'y', True
+
+
+def _create_operator_in_context(file_path, additional_files, kwargs):
+    """
+    Runs create_operator in an isolated temporary build context, so that multiple components can be built
+    concurrently. The generated operator files are copied next to the original component.
+    """
+    start = time.time()
+    result = {'file': file_path, 'status': 'failed', 'image': None, 'seconds': None, 'error': None}
+    cwd = os.getcwd()
+    try:
+        # create_operators resolved the choice for existing files before starting the pool, so this does not prompt
+        check_existing_files(file_path, kwargs.get('rename_files'), kwargs.get('overwrite_files', False))
+        with tempfile.TemporaryDirectory(prefix='c3-') as build_context:
+            for path in [file_path] + [f for pattern in additional_files for f in glob.glob(pattern)]:
+                _copy_to_context(path, build_context)
+            os.chdir(build_context)
+            try:
+                result['image'] = create_operator(file_path=file_path, additional_files=list(additional_files),
+                                                  **{**kwargs, 'overwrite_files': True, 'rename_files': None})
+            finally:
+                os.chdir(cwd)
+            for suffix in OPERATOR_SUFFIXES:
+                operator_file = Path(file_path).with_suffix(suffix)
+                if (Path(build_context) / operator_file).is_file():
+                    shutil.copy(Path(build_context) / operator_file, operator_file)
+        result['status'] = 'success'
+    except Exception as err:
+        logging.error(f'Failed to create operator for {file_path}: {err}')
+        result['error'] = f'{type(err).__name__}: {err}'
+    result['seconds'] = round(time.time() - start, 1)
+    return result
+
+
+def create_operators(paths,
+                     additional_files=(),
+                     max_workers=None,
+                     max_docker_builds=2,
+                     report='c3_build_report.json',
+                     **kwargs):
+    """
+    Creates operators for all components in the given directories or glob patterns (bulk mode).
+    Components are parsed concurrently in a process pool, while the number of concurrent docker builds is
+    limited by max_docker_builds. Additional files are added to every component. Returns a list of results
+    per component that is also written to the report file.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    file_paths = sorted({f for path in paths for f in find_component_files(path)})
+    if len(file_paths) == 0:
+        raise FileNotFoundError(f'No components found for {", ".join(paths)}.')
+    for file_path in file_paths + list(additional_files):
+        if os.path.relpath(file_path).startswith('..'):
+            raise PermissionError(f"Forbidden path outside the docker build context: {file_path}. "
+                                  f"Change the current working directory to include all files.")
+    file_paths = [os.path.relpath(f) for f in file_paths]
+    kwargs['rename_files'], kwargs['overwrite_files'] = _resolve_existing_files(
+        file_paths, kwargs.get('rename_files'), kwargs.get('overwrite_files', False))
+
+    if kwargs.get('version') is None and kwargs.get('repository') is not None:
+        # look up the registry tags of all components concurrently, the workers use the cached tags
+        prefetch_registry_image_tags(f"{kwargs['repository']}/claimed-{Path(f).stem.replace('_', '-').lower()}"
+                                     for f in file_paths)
+    logging.info(f'Creating {len(file_paths)} operators with {max_workers or os.cpu_count()} workers '
+                 f'and up to {max_docker_builds} concurrent docker builds')
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    start = time.time()
+    results = []
+    with multiprocessing.Manager() as manager, \
+            ProcessPoolExecutor(max_workers=max_workers) as executor:
+        build_lock = manager.BoundedSemaphore(max_docker_builds)
+        futures = {executor.submit(_create_operator_in_context, file_path, additional_files,
+                                   {**kwargs, 'build_lock': build_lock}): file_path
+                   for file_path in file_paths}
+        for future in as_completed(futures):
+            result = future.result()
+            logging.info(f'{result["status"].upper()} {result["file"]} ({result["seconds"]}s)'
+                         + (f' {result["image"]}' if result['image'] else ''))
+            results.append(result)
+    results.sort(key=lambda r: r['file'])
+
+    failed = [r['file'] for r in results if r['status'] != 'success']
+    summary = {
+        'components': len(results),
+        'succeeded': len(results) - len(failed),
+        'failed': len(failed),
+        'seconds': round(time.time() - start, 1),
+        'results': results,
+    }
+    if report:
+        with open(report, 'w') as f:
+            json.dump(summary, f, indent=2)
+        logging.info(f'Wrote build report to {report}')
+    logging.info(f'Created {summary["succeeded"]} of {summary["components"]} operators in {summary["seconds"]}s')
+    if failed:
+        logging.error('Failed components:\n' + '\n'.join(failed))
+    return results
+
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('FILE_PATH', type=str,
-                        help='Path to python script or notebook')
+                        help='Path to python script or notebook. A directory or glob pattern builds all '
+                             'components in bulk mode.')
     parser.add_argument('ADDITIONAL_FILES', type=str, nargs='*',
                         help='Paths to additional files to include in the container image')
     parser.add_argument('-r', '--repository', type=str, default=None,
@@ -475,7 +685,11 @@ def main():
                         help='Name or path of the generated dockerfile.')
     parser.add_argument('--local_mode', action='store_true',
                         help='Continue processing after docker errors.')
-    parser.add_argument('--no-cache', action='store_true', help='Not using cache for docker build.')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Not using cache for docker build and always rebuild unchanged components.')
+    parser.add_argument('--build-cache', type=str, default=BUILD_CACHE_PATH,
+                        help='File recording the image version built for each build hash. Unchanged components reuse '
+                             f'the existing image. Empty string disables the build cache (default: {BUILD_CACHE_PATH}).')
     parser.add_argument('--skip-logging', action='store_true',
                         help='Exclude logging code from component setup code')
     parser.add_argument('--keep-generated-files', action='store_true',
@@ -486,6 +700,17 @@ def main():
                         help='Select python or R version (defaults to python3.12).')
     parser.add_argument('--skip-docker-build', action='store_true',
                         help='Enable skipping docker build (default: False).')
+    parser.add_argument('--optimize-layers', action='store_true',
+                        help='Generate a layer-cache-friendly dockerfile for python components: requirements are '
+                             'installed first in a single step with BuildKit cache mounts, code is added last.')
+    parser.add_argument('--precompile', action='store_true',
+                        help='With --optimize-layers, precompile the python code to bytecode in the image.')
+    parser.add_argument('--max-workers', type=int, default=None,
+                        help='Bulk mode: number of components processed in parallel (default: number of CPUs).')
+    parser.add_argument('--max-docker-builds', type=int, default=2,
+                        help='Bulk mode: maximum number of concurrent docker builds (default: 2).')
+    parser.add_argument('--report', type=str, default='c3_build_report.json',
+                        help='Bulk mode: path of the JSON build report (default: c3_build_report.json).')
 
     args = parser.parse_args()
 
@@ -506,6 +731,36 @@ def main():
     else:
         custom_dockerfile_template = None
 
+    if os.path.isdir(args.FILE_PATH) or glob.has_magic(args.FILE_PATH):
+        # Bulk mode
+        results = create_operators(
+            args.FILE_PATH,
+            additional_files=args.ADDITIONAL_FILES,
+            max_workers=args.max_workers,
+            max_docker_builds=args.max_docker_builds,
+            report=args.report,
+            repository=args.repository,
+            version=args.version,
+            custom_dockerfile_template=custom_dockerfile_template,
+            log_level=args.log_level,
+            local_mode=args.local_mode,
+            no_cache=args.no_cache,
+            overwrite_files=args.overwrite,
+            rename_files=args.rename,
+            skip_logging=args.skip_logging,
+            keep_generated_files=args.keep_generated_files,
+            platform=args.platform,
+            dockerfile=args.dockerfile,
+            image_version=args.image_version,
+            skip_docker_build=args.skip_docker_build,
+            build_cache=args.build_cache,
+            optimize_layers=args.optimize_layers,
+            precompile=args.precompile,
+        )
+        if any(r['status'] != 'success' for r in results):
+            sys.exit(1)
+        return
+
     create_operator(
         file_path=args.FILE_PATH,
         repository=args.repository,
@@ -523,6 +778,9 @@ def main():
         dockerfile=args.dockerfile,
         image_version=args.image_version,
         skip_docker_build=args.skip_docker_build,
+        build_cache=args.build_cache,
+        optimize_layers=args.optimize_layers,
+        precompile=args.precompile,
     )
 
 
@@ -14,17 +14,26 @@
 # limitations under the License.
 #
 
+import ast
+import logging
 import os
 import re
+from functools import cached_property
 
 from traitlets.config import LoggingConfigurable
 
-from typing import TypeVar, List, Dict
+from typing import TypeVar, List, Dict, Optional
 
 # Setup forward reference for type hint on return from class factory method.  See
 # https://stackoverflow.com/questions/39205527/can-you-annotate-return-type-when-value-is-instance-of-cls/39205612#39205612
 F = TypeVar('F', bound='FileReader')
 
+ENV_NAME_PATTERN = re.compile(r'[a-zA-Z_]+[A-Za-z0-9_]*\Z')
+# The default value match can end with an additional ', ", or ) which is removed
+DEFAULT_SUFFIX_PATTERN = re.compile(r"['\")]?$")
+# Commented-out code such as "# os.environ['name'] = 'value'" is no description
+COMMENTED_CODE_PATTERN = re.compile(r"os\.(?:environ\[|environ\.get\(|getenv\()|Sys\.[gs]etenv\(")
+
 
 class FileReader(LoggingConfigurable):
     """
@@ -49,6 +58,13 @@ class FileReader(LoggingConfigurable):
         else:
             return None
 
+    def read_source(self) -> str:
+        """
+        Returns the complete source code, used by parsers that do not work line by line.
+        """
+        with open(self._filepath) as f:
+            return f.read()
+
     def read_next_code_line(self) -> List[str]:
         """
         Implements a generator for lines of code in the specified filepath. Subclasses
@@ -79,6 +95,11 @@ class NotebookReader(FileReader):
     def language(self) -> str:
         return self._language
 
+    def read_source(self) -> str:
+        # IPython magics and shell escapes are no Python, keep them as comments to preserve line numbers
+        return '\n'.join('#' + line if line.lstrip().startswith(('!', '%')) else line
+                         for line in self.read_next_code_line())
+
     def read_next_code_line(self) -> List[str]:
         for cell in self._notebook.cells:
             if cell.source and cell.cell_type == "code":
@@ -89,11 +110,24 @@ class NotebookReader(FileReader):
 class ScriptParser():
     """
     Base class for parsing individual lines of code. Subclasses implement a search_expressions()
-    function that returns language-specific regexes to match against code lines.
+    function that returns language-specific regexes to match against code lines, and may implement
+    type_expressions() returning (regex, type) pairs that identify the type of an input.
     """
 
     _comment_char = "#"
 
+    @cached_property
+    def _compiled_search_expressions(self) -> Dict[str, List[re.Pattern]]:
+        return {key: [re.compile(pattern) for pattern in patterns]
+                for key, patterns in self.search_expressions().items()}
+
+    @cached_property
+    def _compiled_type_expressions(self) -> List[tuple]:
+        return [(re.compile(pattern), type) for pattern, type in self.type_expressions()]
+
+    def type_expressions(self) -> List[tuple]:
+        return []
+
     def _get_line_without_comments(self, line):
         if self._comment_char in line:
             index = line.find(self._comment_char)
@@ -107,15 +141,147 @@ class ScriptParser():
             return []
 
         matches = []
-        for key, value in self.search_expressions().items():
-            for pattern in value:
-                regex = re.compile(pattern)
+        for key, regexes in self._compiled_search_expressions.items():
+            for regex in regexes:
                 for match in regex.finditer(line):
                     matches.append((key, match))
         return matches
 
+    def get_type(self, line) -> str:
+        for regex, type in self._compiled_type_expressions:
+            if regex.search(line):
+                return type
+        return 'String'
+
+    def parse_interface(self, reader: FileReader) -> dict:
+        """
+        Single pass over all code lines collecting the inputs with description, type and default value,
+        and the outputs. The description of an input is the comment in the line above its first occurrence.
+        """
+        interface = {"inputs": {}, "outputs": []}
+        previous_line = ''
+        for line in reader.read_next_code_line():
+            for key, match in self.parse_environment_variables(line):
+                name = match.group(1)
+                if key == "inputs":
+                    if name not in interface["inputs"]:
+                        default_value = match.group(2)
+                        if default_value:
+                            default_value = DEFAULT_SUFFIX_PATTERN.sub('', default_value, count=1)
+                        interface["inputs"][name] = _input_variable(name, previous_line, self.get_type(line),
+                                                                    default_value)
+                elif name not in interface["outputs"]:
+                    interface["outputs"].append(name)
+            previous_line = line
+        return interface
+
+
+def _input_variable(name: str, comment_line: str, type: str, default: Optional[str]) -> dict:
+    if not comment_line.strip().startswith('#') or COMMENTED_CODE_PATTERN.search(comment_line):
+        # previous line was no description
+        comment_line = ''
+        logging.debug(f'Interface: No description for variable {name} provided.')
+    if type != 'String' and default is not None:
+        default = default.strip('\"\'')
+    return {
+        'description': comment_line.replace('#', '').replace("\"", "\'").strip(),
+        'type': type,
+        'default': default
+    }
+
+
+class _EnvironmentVisitor(ast.NodeVisitor):
+    """
+    Collects os.getenv(...), os.environ.get(...) and os.environ[...] reads as inputs and
+    os.environ[...] assignments as outputs in a single walk over the syntax tree.
+    """
+
+    casts = {'int': 'Integer', 'float': 'Float', 'bool': 'Boolean'}
+
+    def __init__(self, source: str):
+        self.source = source
+        self.lines = source.split('\n')
+        self.interface = {"inputs": {}, "outputs": []}
+        self._statement_line = 1
+        self._cast_types = {}
+
+    @staticmethod
+    def _is_os_environ(node) -> bool:
+        return (isinstance(node, ast.Attribute) and node.attr == 'environ'
+                and isinstance(node.value, ast.Name) and node.value.id == 'os')
+
+    @classmethod
+    def _is_getenv(cls, node) -> bool:
+        if not isinstance(node, ast.Attribute):
+            return False
+        if node.attr == 'getenv':
+            return isinstance(node.value, ast.Name) and node.value.id == 'os'
+        return node.attr == 'get' and cls._is_os_environ(node.value)
+
+    @staticmethod
+    def _env_name(node) -> Optional[str]:
+        if isinstance(node, ast.Constant) and isinstance(node.value, str) and ENV_NAME_PATTERN.match(node.value):
+            return node.value
+        return None
+
+    def _add_input(self, name: str, default_node, node):
+        if name in self.interface["inputs"]:
+            return
+        default = None
+        if default_node is not None:
+            if isinstance(default_node, ast.Constant) and isinstance(default_node.value, str):
+                default = default_node.value
+            else:
+                default = ast.get_source_segment(self.source, default_node)
+        # the comment above the statement, not above a continuation line of it
+        line = self._statement_line
+        comment_line = self.lines[line - 2] if line >= 2 else ''
+        self.interface["inputs"][name] = _input_variable(name, comment_line,
+                                                         self._cast_types.get(id(node), 'String'), default)
+
+    def generic_visit(self, node):
+        if isinstance(node, ast.stmt):
+            outer, self._statement_line = self._statement_line, node.lineno
+            super().generic_visit(node)
+            self._statement_line = outer
+        else:
+            super().generic_visit(node)
+
+    def visit_Call(self, node):
+        if isinstance(node.func, ast.Name) and node.func.id in self.casts and len(node.args) == 1:
+            self._cast_types[id(node.args[0])] = self.casts[node.func.id]
+        if self._is_getenv(node.func) and node.args:
+            name = self._env_name(node.args[0])
+            if name:
+                self._add_input(name, node.args[1] if len(node.args) > 1 else None, node)
+        self.generic_visit(node)
+
+    def visit_Subscript(self, node):
+        if self._is_os_environ(node.value):
+            name = self._env_name(node.slice)
+            if name and isinstance(node.ctx, ast.Store):
+                if name not in self.interface["outputs"]:
+                    self.interface["outputs"].append(name)
+            elif name:
+                self._add_input(name, None, node)
+        self.generic_visit(node)
+
 
 class PythonScriptParser(ScriptParser):
+    def parse_interface(self, reader: FileReader) -> dict:
+        source = reader.read_source()
+        try:
+            tree = ast.parse(source)
+        except SyntaxError:
+            # e.g. cell magics in notebooks, fall back to matching line by line
+            return super().parse_interface(reader)
+        visitor = _EnvironmentVisitor(source)
+        visitor.visit(tree)
+        return visitor.interface
+
+    def type_expressions(self) -> List[tuple]:
+        return [(r'=\s*int\(\s*os', 'Integer'), (r'=\s*float\(\s*os', 'Float'), (r'=\s*bool\(\s*os', 'Boolean')]
+
     def search_expressions(self) -> Dict[str, List]:
         # First regex matches envvar assignments that use os.getenv("name", "value") with ow w/o default provided
         # Second regex matches envvar assignments that use os.environ.get("name", "value") with or w/o default provided
@@ -130,6 +296,10 @@ class PythonScriptParser(ScriptParser):
 
 
 class RScriptParser(ScriptParser):
+    def type_expressions(self) -> List[tuple]:
+        # double and logical in R
+        return [(r'=\s*as.numeric\(\s*os', 'Float'), (r'=\s*bool\(\s*os', 'Boolean')]
+
     def search_expressions(self) -> Dict[str, List]:
 
 
@@ -149,28 +319,19 @@ class ContentParser(LoggingConfigurable):
     }
 
     def parse(self, filepath: str) -> dict:
-        """Returns a model dictionary of all the regex matches for each key in the regex dictionary"""
+        """Returns a model dictionary with the default value of each input and the list of outputs"""
+        interface = self.parse_interface(filepath)
+        return {"inputs": {name: variable['default'] for name, variable in interface["inputs"].items()},
+                "outputs": interface["outputs"]}
 
-        properties = {"inputs": {}, "outputs": []}
+    def parse_interface(self, filepath: str) -> dict:
+        """Returns the inputs with description, type and default value, and the outputs of a file"""
         reader = self._get_reader(filepath)
         parser = self._get_parser(reader.language)
 
         if not parser:
-            return properties
-
-        for line in reader.read_next_code_line():
-            matches = parser.parse_environment_variables(line)
-            for key, match in matches:
-                if key == "inputs":
-                    default_value = match.group(2)
-                    if default_value:
-                        # The default value match can end with an additional ', ", or ) which is removed
-                        default_value = re.sub(r"['\")]?$", '', default_value, count=1)
-                    properties[key][match.group(1)] = default_value
-                else:
-                    properties[key].append(match.group(1))
-
-        return properties
+            return {"inputs": {}, "outputs": []}
+        return parser.parse_interface(reader)
 
     def _validate_file(self, filepath: str):
         """
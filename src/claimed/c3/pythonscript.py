@@ -18,51 +18,20 @@ class Pythonscript:
             self.description = self.name
         else:
             self.description = self.script.split('"""')[1].strip()
+        # one pass over the script yields inputs and outputs
+        self._interface = ContentParser().parse_interface(self.path)
         self.inputs = self._get_input_vars()
         self.outputs = self._get_output_vars()
 
     def _get_input_vars(self):
-        cp = ContentParser()
-        env_names = cp.parse(self.path)['inputs']
-        return_value = dict()
-        for env_name, default in env_names.items():
-            comment_line = str()
-            for line in self.script.split('\n'):
-                if re.search("[\"']" + env_name + "[\"']", line):
-                    # Check the description for current variable
-                    if not comment_line.strip().startswith('#'):
-                        # previous line was no description, reset comment_line.
-                        comment_line = ''
-                    if comment_line == '':
-                        logging.debug(f'Interface: No description for variable {env_name} provided.')
-                    if re.search(r'=\s*int\(\s*os', line):
-                        type = 'Integer'
-                        default = default.strip('\"\'')
-                    elif re.search(r'=\s*float\(\s*os', line):
-                        type = 'Float'
-                        default = default.strip('\"\'')
-                    elif re.search(r'=\s*bool\(\s*os', line):
-                        type = 'Boolean'
-                        default = default.strip('\"\'')
-                    else:
-                        type = 'String'
-                    return_value[env_name] = {
-                        'description': comment_line.replace('#', '').replace("\"", "\'").strip(),
-                        'type': type,
-                        'default': default
-                    }
-                    break
-                comment_line = line
-        return return_value
+        return self._interface['inputs']
 
     def _get_output_vars(self):
-        cp = ContentParser()
-        output_names = cp.parse(self.path)['outputs']
         # TODO: Does not check for description code
         return_value = {name: {
             'description': f'Output path for {name}',
             'type': 'String',
-        } for name in output_names}
+        } for name in self._interface['outputs']}
         return return_value
 
     def get_requirements(self):
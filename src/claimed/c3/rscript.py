@@ -1,5 +1,4 @@
 
-import logging
 import os
 import re
 from c3.parser import ContentParser
@@ -15,44 +14,17 @@ class Rscript:
         self.name = os.path.basename(path)[:-2].replace('_', '-').lower()
         # TODO: Currently does not support a description
         self.description = self.name
+        # one pass over the script yields inputs and outputs
+        self._interface = ContentParser().parse_interface(self.path)
         self.inputs = self._get_input_vars()
         self.outputs = self._get_output_vars()
 
     def _get_input_vars(self):
-        cp = ContentParser()
-        env_names = cp.parse(self.path)['inputs']
-        return_value = dict()
-        for env_name, default in env_names.items():
-            comment_line = str()
-            for line in self.script.split('\n'):
-                if re.search("[\"']" + env_name + "[\"']", line):
-                    # Check the description for current variable
-                    if not comment_line.strip().startswith('#'):
-                        # previous line was no description, reset comment_line.
-                        comment_line = ''
-                    if comment_line == '':
-                        logging.debug(f'Interface: No description for variable {env_name} provided.')
-                    if re.search(r'=\s*as.numeric\(\s*os', line):
-                        type = 'Float'  # double in R
-                    elif re.search(r'=\s*bool\(\s*os', line):
-                        type = 'Boolean'  # logical in R
-                    else:
-                        type = 'String'  # character in R
-
-                    return_value[env_name] = {
-                        'description': comment_line.replace('#', '').replace("\"", "\'").strip(),
-                        'type': type,
-                        'default': default
-                    }
-                    break
-                comment_line = line
-        return return_value
+        return self._interface['inputs']
 
     def _get_output_vars(self):
-        cp = ContentParser()
-        output_names = cp.parse(self.path)['outputs']
         # TODO: Does not check for description
-        return_value = {name: {'description': 'output path'} for name in output_names}
+        return_value = {name: {'description': 'output path'} for name in self._interface['outputs']}
         return return_value
 
     def get_requirements(self):
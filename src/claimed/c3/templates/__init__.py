@@ -1,5 +1,5 @@
-
 import os
+from functools import lru_cache
 from string import Template
 from pathlib import Path
 
@@ -8,6 +8,7 @@ PYTHON_COMPONENT_SETUP_CODE = 'component_setup_code.py'
 R_COMPONENT_SETUP_CODE = 'component_setup_code.R'
 PYTHON_COMPONENT_SETUP_CODE_WO_LOGGING = 'component_setup_code_wo_logging.py'
 PYTHON_DOCKERFILE_FILE = 'python_dockerfile_template'
+PYTHON_OPTIMIZED_DOCKERFILE_FILE = 'python_optimized_dockerfile_template'
 R_DOCKERFILE_FILE = 'R_dockerfile_template'
 KFP_COMPONENT_FILE = 'kfp_component_template.yaml'
 KUBERNETES_JOB_FILE = 'kubernetes_job_template.job.yaml'
@@ -19,48 +20,51 @@ S3KV_GRID_WRAPPER_FILE = 's3kv_grid_wrapper_template.py'
 SIMPLE_GRID_WRAPPER_FILE = 'simple_grid_wrapper_template.py'
 FOLDER_GRID_WRAPPER_FILE = 'folder_grid_wrapper_template.py'
 
-# load templates
 template_path = Path(os.path.dirname(__file__))
 
-with open(template_path / PYTHON_COMPONENT_SETUP_CODE, 'r') as f:
-    python_component_setup_code = f.read()
-
-with open(template_path / R_COMPONENT_SETUP_CODE, 'r') as f:
-    r_component_setup_code = f.read()
-
-with open(template_path / PYTHON_COMPONENT_SETUP_CODE_WO_LOGGING, 'r') as f:
-    component_setup_code_wo_logging = f.read()
-
-with open(template_path / PYTHON_DOCKERFILE_FILE, 'r') as f:
-    python_dockerfile_template = Template(f.read())
-
-with open(template_path / R_DOCKERFILE_FILE, 'r') as f:
-    r_dockerfile_template = Template(f.read())
-
-with open(template_path / KFP_COMPONENT_FILE, 'r') as f:
-    kfp_component_template = Template(f.read())
-
-with open(template_path / KUBERNETES_JOB_FILE, 'r') as f:
-    kubernetes_job_template = Template(f.read())
-
-with open(template_path / CWL_COMPONENT_FILE, 'r') as f:
-    cwl_component_template = Template(f.read())
-
-with open(template_path / GRID_WRAPPER_FILE, 'r') as f:
-    grid_wrapper_template = Template(f.read())
-
-with open(template_path / COS_GRID_WRAPPER_FILE, 'r') as f:
-    cos_grid_wrapper_template = Template(f.read())
-
-with open(template_path / LEGACY_COS_GRID_WRAPPER_FILE, 'r') as f:
-    legacy_cos_grid_wrapper_template = Template(f.read())
-
-with open(template_path / S3KV_GRID_WRAPPER_FILE, 'r') as f:
-    s3kv_grid_wrapper_template = Template(f.read())
-
-with open(template_path / SIMPLE_GRID_WRAPPER_FILE, 'r') as f:
-    simple_grid_wrapper_template = Template(f.read())
 
-with open(template_path / FOLDER_GRID_WRAPPER_FILE, 'r') as f:
-    folder_grid_wrapper_template = Template(f.read())
-    
\ No newline at end of file
+@lru_cache(maxsize=None)
+def get_text(file_name):
+    """Returns the content of a template file, read on first use."""
+    with open(template_path / file_name, 'r') as f:
+        return f.read()
+
+
+@lru_cache(maxsize=None)
+def get_template(file_name):
+    """Returns a template file as string.Template, parsed on first use."""
+    return Template(get_text(file_name))
+
+
+# templates are loaded lazily when accessed as module attributes, e.g. c3.templates.python_dockerfile_template
+_TEXTS = {
+    'python_component_setup_code': PYTHON_COMPONENT_SETUP_CODE,
+    'r_component_setup_code': R_COMPONENT_SETUP_CODE,
+    'component_setup_code_wo_logging': PYTHON_COMPONENT_SETUP_CODE_WO_LOGGING,
+}
+_TEMPLATES = {
+    'python_dockerfile_template': PYTHON_DOCKERFILE_FILE,
+    'python_optimized_dockerfile_template': PYTHON_OPTIMIZED_DOCKERFILE_FILE,
+    'r_dockerfile_template': R_DOCKERFILE_FILE,
+    'kfp_component_template': KFP_COMPONENT_FILE,
+    'kubernetes_job_template': KUBERNETES_JOB_FILE,
+    'cwl_component_template': CWL_COMPONENT_FILE,
+    'grid_wrapper_template': GRID_WRAPPER_FILE,
+    'cos_grid_wrapper_template': COS_GRID_WRAPPER_FILE,
+    'legacy_cos_grid_wrapper_template': LEGACY_COS_GRID_WRAPPER_FILE,
+    's3kv_grid_wrapper_template': S3KV_GRID_WRAPPER_FILE,
+    'simple_grid_wrapper_template': SIMPLE_GRID_WRAPPER_FILE,
+    'folder_grid_wrapper_template': FOLDER_GRID_WRAPPER_FILE,
+}
+
+
+def __getattr__(name):
+    if name in _TEXTS:
+        return get_text(_TEXTS[name])
+    if name in _TEMPLATES:
+        return get_template(_TEMPLATES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_TEXTS) + list(_TEMPLATES))
@@ -30,12 +30,230 @@ import time
 from datetime import datetime
 import shutil
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
 import json
+import threading
+import fcntl
+import math
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from urllib.parse import quote
+
+
+class LRUDiskCache:
+    def __init__(self, cache_dir: str = '/tmp/s3kv_cache', max_bytes: int = 1024 ** 3, max_entries: int = None,
+                 max_age_days: float = 7, cleanup_interval: float = 300, background_cleanup: bool = False,
+                 low_water: float = 0.9):
+        """
+        Size-bounded JSON file cache with least-recently-used eviction.
+
+        The cache directory is shared by all processes using it, and so are the budgets: the total
+        size and number of entries are kept in a usage file that every process updates under a file
+        lock, and when a budget is exceeded the least recently read entries (by access time, which
+        get() refreshes) are removed until the usage is below low_water times the budget, so that the
+        directory scan of an eviction is amortized over the following writes. Entries older than max_age_days are removed at most every
+        cleanup_interval seconds, or by a background thread that runs until close().
+
+        :param cache_dir: Directory holding one <key>.json file per entry.
+        :param max_bytes: Maximum total size of cached files.
+        :param max_entries: (Optional) Maximum number of cached entries.
+        :param max_age_days: Maximum age of an entry before it is removed.
+        :param cleanup_interval: Minimum number of seconds between two age-based cleanups.
+        :param background_cleanup: Run the age-based cleanup in a daemon thread instead of on access.
+        :param low_water: Fraction of the budgets that an eviction frees the cache down to.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 86400
+        self.cleanup_interval = cleanup_interval
+        self.background_cleanup = background_cleanup
+        self.low_water = low_water
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cleanup()
+
+        if background_cleanup:
+            self._thread = threading.Thread(target=self._cleanup_loop, daemon=True)
+            self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """
+        Stops the background cleanup thread, if any.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def _usage_path(self) -> str:
+        return os.path.join(self.cache_dir, '.usage')
+
+    @contextmanager
+    def _locked(self):
+        # the thread lock serializes threads, the file lock other processes sharing cache_dir
+        with self._lock, open(os.path.join(self.cache_dir, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _cleanup_loop(self):
+        while not self._stop.wait(self.cleanup_interval):
+            self.cleanup()
+
+    def _maybe_cleanup(self):
+        if not self.background_cleanup and time.time() - self._last_cleanup > self.cleanup_interval:
+            self.cleanup()
+
+    def _read_usage(self):
+        try:
+            with open(self._usage_path(), 'r') as f:
+                usage = json.load(f)
+            return usage['bytes'], usage['entries']
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def _write_usage(self, total_bytes: int, entries: int):
+        tmp_path = f'{self._usage_path()}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'bytes': total_bytes, 'entries': entries}, f)
+        os.replace(tmp_path, self._usage_path())
+
+    def _over_budget(self, total_bytes: int, entries: int, fraction: float = 1) -> bool:
+        return (total_bytes > self.max_bytes * fraction
+                or (self.max_entries is not None and entries > math.ceil(self.max_entries * fraction)))
+
+    def _rebalance(self, max_age_seconds: float = None):
+        """
+        Recounts the usage from the directory and removes expired and least recently used entries.
+        Must be called with the lock held.
+        """
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith('.json'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_atime, entry.name, stat.st_size, stat.st_mtime))
+        total_bytes = sum(size for _, _, size, _ in entries)
+        count = len(entries)
+        # evict below the low water mark, so that the next writes do not need to rescan the directory
+        fraction = self.low_water if self._over_budget(total_bytes, count) else 1
+        for _, name, size, mtime in sorted(entries):
+            expired = max_age_seconds is not None and now - mtime > max_age_seconds
+            if not expired and not self._over_budget(total_bytes, count, fraction):
+                if max_age_seconds is None:
+                    break
+                continue
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
+            count -= 1
+        self._write_usage(total_bytes, count)
+
+    def cleanup(self, max_age_days: float = None):
+        """
+        Removes entries written longer ago than max_age_days (default: the cache's max_age_days)
+        and recounts the usage of the cache directory.
+        """
+        max_age_seconds = self.max_age_seconds if max_age_days is None else max_age_days * 86400
+        with self._locked():
+            self._rebalance(max_age_seconds)
+        self._last_cleanup = time.time()
+
+    def get(self, key: str):
+        """
+        :return: The cached value, or None if the key is not cached.
+        """
+        self._maybe_cleanup()
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                value = json.load(f)
+                mtime = os.fstat(f.fileno()).st_mtime
+        except FileNotFoundError:
+            return None
+        try:
+            # mark as recently used, independent of the file system's atime mount option
+            os.utime(path, (time.time(), mtime))
+        except FileNotFoundError:
+            pass
+        return value
+
+    def put(self, key: str, value):
+        data = json.dumps(value).encode('utf-8')
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        with self._locked():
+            try:
+                old_size, new_entries = os.stat(path).st_size, 0
+            except FileNotFoundError:
+                old_size, new_entries = 0, 1
+            os.replace(tmp_path, path)
+            usage = self._read_usage()
+            if usage is None:
+                self._rebalance()
+            else:
+                total_bytes, entries = usage[0] + len(data) - old_size, usage[1] + new_entries
+                if self._over_budget(total_bytes, entries):
+                    self._rebalance()
+                else:
+                    self._write_usage(total_bytes, entries)
+        self._maybe_cleanup()
+
+    def delete(self, key: str):
+        with self._locked():
+            try:
+                size = os.stat(self._path(key)).st_size
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                return
+            usage = self._read_usage()
+            if usage is not None:
+                self._write_usage(max(0, usage[0] - size), max(0, usage[1] - 1))
+
+    def copy(self, source_key: str, destination_key: str):
+        value = self.get(source_key)
+        if value is not None:
+            self.put(destination_key, value)
+
+    def clear(self):
+        with self._locked():
+            for entry in os.scandir(self.cache_dir):
+                if entry.is_file() and entry.name.endswith('.json'):
+                    try:
+                        os.remove(entry.path)
+                    except FileNotFoundError:
+                        pass
+            self._write_usage(0, 0)
 
 
 class S3KV:
     def __init__(self, s3_endpoint_url:str, bucket_name: str, 
-                 aws_access_key_id: str = None, aws_secret_access_key: str = None , enable_local_cache=True):
+                 aws_access_key_id: str = None, aws_secret_access_key: str = None , enable_local_cache=True,
+                 cache_dir: str = '/tmp/s3kv_cache', cache_max_bytes: int = 1024 ** 3, cache_max_entries: int = None,
+                 cache_max_age_days: float = 7, cache_cleanup_interval: float = 300, cache_background_cleanup: bool = False,
+                 max_workers: int = 32):
         """
         Initializes the S3KV object with the given S3 bucket, AWS credentials, and Elasticsearch host.
 
@@ -43,18 +261,30 @@ class S3KV:
         :param bucket_name: The name of the S3 bucket to use for storing the key-value data.
         :param aws_access_key_id: (Optional) AWS access key ID.
         :param aws_secret_access_key: (Optional) AWS secret access key.
+        :param enable_local_cache: Keep written and fetched values in the local LRU disk cache.
+        :param cache_dir: Local cache directory.
+        :param cache_max_bytes: Size budget of the local cache.
+        :param cache_max_entries: (Optional) Entry budget of the local cache.
+        :param cache_max_age_days: Maximum age of cached entries.
+        :param cache_cleanup_interval: Minimum number of seconds between two age-based cache cleanups.
+        :param cache_background_cleanup: Run the age-based cache cleanup in a background thread.
+        :param max_workers: Number of concurrent requests for bulk operations like cache_all_keys.
         """
         self.bucket_name = bucket_name
         self.enable_local_cache = enable_local_cache
+        self.max_workers = max_workers
+        self._tag_index_checked = False
         self.s3_client = boto3.client(
             's3',
             endpoint_url=s3_endpoint_url,
             aws_access_key_id=aws_access_key_id,
-            aws_secret_access_key=aws_secret_access_key
+            aws_secret_access_key=aws_secret_access_key,
+            config=Config(max_pool_connections=max(10, max_workers))
         )
 
-        if not os.path.exists('/tmp/s3kv_cache'):
-            os.makedirs('/tmp/s3kv_cache')
+        self.cache = LRUDiskCache(cache_dir, max_bytes=cache_max_bytes, max_entries=cache_max_entries,
+                                  max_age_days=cache_max_age_days, cleanup_interval=cache_cleanup_interval,
+                                  background_cleanup=cache_background_cleanup)
 
     def _get_object_key(self, key: str) -> str:
         """
@@ -65,31 +295,87 @@ class S3KV:
         """
         return f"s3kv/{key}.json"
 
-    def cache_all_keys(self):
+    def _get_tag_prefix(self, tag_key: str, tag_value: str) -> str:
         """
-        Saves all keys to the local /tmp directory as they are being added.
+        Constructs the prefix of the tag index entries for a tag.
+        Each tagged key has an empty marker object s3kv-tags/<tag key>/<tag value>/<key>.
+
+        :param tag_key: The tag key.
+        :param tag_value: The tag value.
+        :return: The S3 prefix listing all keys with this tag.
         """
-        keys = self.list_keys()
-        for key in keys:
+        return f"s3kv-tags/{quote(tag_key, safe='')}/{quote(tag_value, safe='')}/"
+
+    def _get_tag_index_marker(self) -> str:
+        """
+        Object written by rebuild_tag_index; while it exists the tag index covers all tagged keys.
+        """
+        return 's3kv-tags/.indexed'
+
+    def has_tag_index(self) -> bool:
+        """
+        Checks if the tag index is complete, i.e. rebuild_tag_index ran on this bucket.
+        Tags written by tag_key are mirrored either way.
+
+        :return: True if find_keys_by_tag_value can be served from the tag index.
+        """
+        if not self._tag_index_checked:
+            try:
+                self.s3_client.head_object(Bucket=self.bucket_name, Key=self._get_tag_index_marker())
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') not in ('404', 'NotFound', 'NoSuchKey'):
+                    raise
+                return False
+            # the marker is only removed by rebuild_tag_index, so a positive answer is cached
+            self._tag_index_checked = True
+        return True
+
+    def fetch_many(self, keys, max_workers: int = None, cache: bool = False):
+        """
+        Fetches many keys concurrently while the key iterable is still being consumed.
+
+        :param keys: An iterable of keys, e.g. the generator from iter_keys.
+        :param max_workers: (Optional) Number of concurrent downloads, defaults to the instance setting.
+        :param cache: Write each value into the local cache as soon as it arrives.
+        :return: A generator of (key, value) pairs in completion order; value is None for missing keys.
+        """
+        max_workers = max_workers or self.max_workers
+
+        def fetch(key):
             value = self.get(key)
-            if value is not None:
-                with open(f'/tmp/s3kv_cache/{key}.json', 'w') as f:
-                    json.dump(value, f)
+            if cache and value is not None:
+                self.cache.put(key, value)
+            return key, value
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = set()
+            for key in keys:
+                pending.add(executor.submit(fetch, key))
+                # bound the number of queued downloads so huge key sets stream in constant memory
+                if len(pending) >= 4 * max_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            for future in as_completed(pending):
+                yield future.result()
+
+    def cache_all_keys(self, max_workers: int = None):
+        """
+        Saves all keys to the local cache, downloading them concurrently.
+
+        :param max_workers: (Optional) Number of concurrent downloads, defaults to the instance setting.
+        """
+        for _ in self.fetch_many(self.iter_keys(), max_workers=max_workers, cache=True):
+            pass
 
     def get_from_cache(self, key: str) -> dict:
         """
-        Retrieves a key from the local cache if present, and clears old cache entries.
+        Retrieves a key from the local cache if present. Old cache entries are cleared periodically.
 
         :param key: The key to retrieve from the cache.
         :return: The value associated with the given key if present in the cache, else None.
         """
-        self.clear_old_cache()
-        cache_path = f'/tmp/s3kv_cache/{key}.json'
-        if os.path.exists(cache_path):
-            with open(cache_path, 'r') as f:
-                return json.load(f)
-        else:
-            return None
+        return self.cache.get(key)
 
 
     def add(self, key: str, value: dict, metadata: dict = None):
@@ -104,9 +390,38 @@ class S3KV:
         serialized_value = json.dumps(value)
         self.s3_client.put_object(Bucket=self.bucket_name, Key=s3_object_key, Body=serialized_value)
 
-        with open(f'/tmp/s3kv_cache/{key}.json', 'w') as f:
-            json.dump(value, f)
+        if self.enable_local_cache:
+            self.cache.put(key, value)
+
+
+    def add_if_absent(self, key: str, value: dict) -> bool:
+        """
+        Adds a key-value pair only if the key does not exist yet, e.g. to lock a key.
+        Uses a conditional write, so concurrent callers cannot both succeed.
+
+        :param key: The key to be added.
+        :param value: The value corresponding to the key.
+        :return: True if the key was added, False if it already existed.
+        """
+        s3_object_key = self._get_object_key(key)
+        serialized_value = json.dumps(value)
+        try:
+            self.s3_client.put_object(Bucket=self.bucket_name, Key=s3_object_key, Body=serialized_value,
+                                      IfNoneMatch='*')
+        except ClientError as e:
+            code = e.response.get('Error', {}).get('Code')
+            if code in ('412', 'PreconditionFailed', '409', 'ConditionalRequestConflict'):
+                return False
+            if code not in ('501', 'NotImplemented', '400', 'InvalidArgument'):
+                raise
+            # endpoint without conditional writes: check, then write
+            if self.key_exists(key):
+                return False
+            self.s3_client.put_object(Bucket=self.bucket_name, Key=s3_object_key, Body=serialized_value)
 
+        if self.enable_local_cache:
+            self.cache.put(key, value)
+        return True
 
 
     def delete(self, key: str):
@@ -116,11 +431,15 @@ class S3KV:
         :param key: The key to be deleted.
         """
         s3_object_key = self._get_object_key(key)
+        try:
+            tags = self.get_tags(s3_object_key)
+        except Exception:
+            tags = {}
         self.s3_client.delete_object(Bucket=self.bucket_name, Key=s3_object_key)
+        for k, v in tags.items():
+            self.s3_client.delete_object(Bucket=self.bucket_name, Key=self._get_tag_prefix(k, v) + key)
 
-        cache_path = f'/tmp/s3kv_cache/{key}.json'
-        if os.path.exists(cache_path):
-            os.remove(cache_path)
+        self.cache.delete(key)
 
 
     def get(self, key: str, default: dict = None) -> dict:
@@ -140,25 +459,52 @@ class S3KV:
             return default
 
 
+    def iter_keys(self, prefix: str = 's3kv/'):
+        """
+        Lists keys page by page.
+
+        :param prefix: The S3 prefix to list, starting with 's3kv/'.
+        :return: A generator of keys.
+        """
+        for key, _ in self.iter_key_sizes(prefix):
+            yield key
+
+
+    def iter_key_sizes(self, prefix: str = 's3kv/'):
+        """
+        Lists keys with the size of their serialized values page by page.
+
+        :param prefix: The S3 prefix to list, starting with 's3kv/'.
+        :return: A generator of (key, size in bytes) pairs.
+        """
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            for obj in page.get('Contents', []):
+                if obj['Key'].endswith('.json'):
+                    yield obj['Key'][5:-5], obj.get('Size', 0)
+
+
     def list_keys(self) -> list:
         """
         Lists all the keys in the S3KV database.
 
         :return: A list of all keys in the database.
         """
-        response = self.s3_client.list_objects_v2(Bucket=self.bucket_name, Prefix="")
-        keys = [obj['Key'][5:-5] for obj in response.get('Contents', []) if obj['Key'].endswith('.json')]
-        return keys
+        return list(self.iter_keys())
+
+
+    def close(self):
+        """
+        Stops the background cache cleanup, if enabled.
+        """
+        self.cache.close()
 
 
     def clear_cache(self):
         """
         Clears the local cache by removing all cached JSON files.
         """
-        cache_directory = '/tmp/s3kv_cache'
-        if os.path.exists(cache_directory):
-            shutil.rmtree(cache_directory)
-        os.makedirs('/tmp/s3kv_cache')
+        self.cache.clear()
 
 
     def clear_old_cache(self, max_days: int = 7):
@@ -167,16 +513,7 @@ class S3KV:
 
         :param max_days: The maximum number of days a key can stay in the cache before being cleared.
         """
-        cache_directory = '/tmp/s3kv_cache'
-        current_time = time.time()
-
-        if os.path.exists(cache_directory):
-            for filename in os.listdir(cache_directory):
-                file_path = os.path.join(cache_directory, filename)
-                if os.path.isfile(file_path):
-                    file_age = current_time - os.path.getmtime(file_path)
-                    if file_age > max_days * 86400:  # Convert days to seconds
-                        os.remove(file_path)
+        self.cache.cleanup(max_age_days=max_days)
 
 
     def clear_cache_for_key(self, key: str):
@@ -185,9 +522,7 @@ class S3KV:
 
         :param key: The key for which to clear the local cache.
         """
-        cache_path = f'/tmp/s3kv_cache/{key}.json'
-        if os.path.exists(cache_path):
-            os.remove(cache_path)
+        self.cache.delete(key)
 
 
     def key_exists(self, key: str) -> bool:
@@ -213,9 +548,7 @@ class S3KV:
         :param prefix: The prefix to filter the keys.
         :return: A list of keys in the database that have the specified prefix.
         """
-        response = self.s3_client.list_objects_v2(Bucket=self.bucket_name, Prefix=prefix)
-        keys = [obj['Key'][5:-5] for obj in response.get('Contents', []) if obj['Key'].endswith('.json')]
-        return keys
+        return list(self.iter_keys(prefix))
 
 
     def copy_key(self, source_key: str, destination_key: str):
@@ -234,10 +567,7 @@ class S3KV:
         self.s3_client.put_object(Bucket=self.bucket_name, Key=destination_s3_object_key, Body=value)
 
         # Copy the key in the local cache if it exists
-        source_cache_path = f'/tmp/s3kv_cache/{source_key}.json'
-        destination_cache_path = f'/tmp/s3kv_cache/{destination_key}.json'
-        if os.path.exists(source_cache_path):
-            shutil.copy(source_cache_path, destination_cache_path)
+        self.cache.copy(source_key, destination_key)
 
 
     def get_key_size(self, key: str) -> int:
@@ -300,15 +630,19 @@ class S3KV:
         self.s3_client.put_bucket_policy(Bucket=self.bucket_name, Policy=policy_json)
 
 
-    def tag_key(self, key: str, tags: dict):
+    def tag_key(self, key: str, tags: dict, previous_tags: dict = None):
         """
-        Tags a key in the S3KV database with the provided tags.
+        Tags a key in the S3KV database with the provided tags and mirrors them into the tag index.
 
         :param key: The key to be tagged.
         :param tags: A dictionary containing the tags to be added to the key.
                      For example, {'TagKey1': 'TagValue1', 'TagKey2': 'TagValue2'}
+        :param previous_tags: (Optional) The tags the key had before, if known. Saves a request.
         """
         s3_object_key = self._get_object_key(key)
+        if previous_tags is None:
+            # put_object_tagging replaces the whole tag set, the old set is needed to drop its index entries
+            previous_tags = self.get_tags(s3_object_key)
 
         # Convert the tags dictionary to a format compatible with the `put_object_tagging` method
         tagging = {'TagSet': [{'Key': k, 'Value': v} for k, v in tags.items()]}
@@ -316,36 +650,75 @@ class S3KV:
         # Apply the tags to the object
         self.s3_client.put_object_tagging(Bucket=self.bucket_name, Key=s3_object_key, Tagging=tagging)
 
+        # put_object_tagging replaces the whole tag set, so stale index entries are removed
+        for k, v in tags.items():
+            if previous_tags.get(k) != v:
+                self.s3_client.put_object(Bucket=self.bucket_name, Key=self._get_tag_prefix(k, v) + key, Body=b'')
+        for k, v in previous_tags.items():
+            if tags.get(k) != v:
+                self.s3_client.delete_object(Bucket=self.bucket_name, Key=self._get_tag_prefix(k, v) + key)
 
-    def tag_keys_with_prefix(self, prefix: str, tags: dict):
+
+    def tag_keys_with_prefix(self, prefix: str, tags: dict, max_workers: int = 32):
         """
         Tags all keys in the S3KV database with the provided prefix with the specified tags.
 
         :param prefix: The prefix of the keys to be tagged.
         :param tags: A dictionary containing the tags to be added to the keys.
                      For example, {'TagKey1': 'TagValue1', 'TagKey2': 'TagValue2'}
+        :param max_workers: Number of keys tagged concurrently.
         """
         keys_to_tag = self.list_keys_with_prefix(prefix)
 
-        for key in keys_to_tag:
-            self.tag_key(key, tags)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(lambda key: self.tag_key(key, tags), keys_to_tag))
+
 
+    def rebuild_tag_index(self, max_workers: int = 32):
+        """
+        Rebuilds the tag index from the object tags, e.g. for keys tagged before the index existed,
+        and marks it as complete. Run it once per bucket, on a new bucket it only writes the marker.
 
-    def merge_keys(self, source_keys: list, destination_key: str):
+        :param max_workers: Number of objects whose tags are read concurrently.
+        """
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        stale = []
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix='s3kv-tags/'):
+            stale.extend({'Key': obj['Key']} for obj in page.get('Contents', []))
+        for i in range(0, len(stale), 1000):
+            self.s3_client.delete_objects(Bucket=self.bucket_name, Delete={'Objects': stale[i:i + 1000], 'Quiet': True})
+
+        def index_object(s3_object_key):
+            key = s3_object_key[5:-5]
+            for k, v in self.get_tags(s3_object_key).items():
+                self.s3_client.put_object(Bucket=self.bucket_name, Key=self._get_tag_prefix(k, v) + key, Body=b'')
+
+        s3_object_keys = []
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix='s3kv/'):
+            s3_object_keys.extend(obj['Key'] for obj in page.get('Contents', []) if obj['Key'].endswith('.json'))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(index_object, s3_object_keys))
+        self.s3_client.put_object(Bucket=self.bucket_name, Key=self._get_tag_index_marker(), Body=b'')
+        self._tag_index_checked = True
+
+
+    def merge_keys(self, source_keys: list, destination_key: str, max_workers: int = None):
         """
         Merges the values of source keys into the value of the destination key in the S3KV database.
 
         :param source_keys: A list of source keys whose values will be merged.
         :param destination_key: The key whose value will be updated by merging the source values.
+        :param max_workers: (Optional) Number of concurrent downloads, defaults to the instance setting.
         """
         destination_s3_object_key = self._get_object_key(destination_key)
 
         # Initialize an empty dictionary for the destination value
         destination_value = {}
 
-        # Retrieve and merge values from source keys
+        # Retrieve source values concurrently, merge them in the order of source_keys
+        source_values = dict(self.fetch_many(source_keys, max_workers=max_workers))
         for source_key in source_keys:
-            source_value = self.get(source_key)
+            source_value = source_values[source_key]
             if source_value:
                 destination_value.update(source_value)
 
@@ -353,29 +726,41 @@ class S3KV:
         serialized_value = json.dumps(destination_value)
         self.s3_client.put_object(Bucket=self.bucket_name, Key=destination_s3_object_key, Body=serialized_value)
 
-        # Update the value in the local cache if it exists
-        destination_cache_path = f'/tmp/s3kv_cache/{destination_key}.json'
-        with open(destination_cache_path, 'w') as f:
-            json.dump(destination_value, f)
+        # Update the value in the local cache
+        if self.enable_local_cache:
+            self.cache.put(destination_key, destination_value)
 
 
 
-    def find_keys_by_tag_value(self, tag_key: str, tag_value: str) -> list:
+    def find_keys_by_tag_value(self, tag_key: str, tag_value: str, max_workers: int = None) -> list:
         """
         Finds keys in the S3KV database based on the value of a specific tag.
+        Served from the tag index with one paginated listing once rebuild_tag_index has run on the
+        bucket; before that, the tags of all keys are read, as keys tagged earlier are not indexed.
 
         :param tag_key: The tag key to search for.
         :param tag_value: The tag value to search for.
+        :param max_workers: (Optional) Number of concurrent tag reads without the tag index, defaults to the instance setting.
         :return: A list of keys that have the specified tag key with the specified value.
         """
-        response = self.s3_client.list_objects_v2(Bucket=self.bucket_name, Prefix="s3kv/")
+        if not self.has_tag_index():
+            logging.warning(f'No complete tag index in bucket {self.bucket_name}, reading the tags of all keys. '
+                            f'Run rebuild_tag_index() once to serve tag lookups from the index.')
+
+            def has_tag(key):
+                return self.get_tags(self._get_object_key(key)).get(tag_key) == tag_value
+
+            keys = list(self.iter_keys())
+            with ThreadPoolExecutor(max_workers=max_workers or self.max_workers) as executor:
+                return [key for key, match in zip(keys, executor.map(has_tag, keys)) if match]
+
+        tag_prefix = self._get_tag_prefix(tag_key, tag_value)
+        paginator = self.s3_client.get_paginator('list_objects_v2')
         keys_with_tag = []
 
-        for obj in response.get('Contents', []):
-            s3_object_key = obj['Key']
-            tags = self.get_tags(s3_object_key)
-            if tags and tag_key in tags and tags[tag_key] == tag_value:
-                keys_with_tag.append(s3_object_key[5:-5])  # Extract the key name
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=tag_prefix):
+            for obj in page.get('Contents', []):
+                keys_with_tag.append(obj['Key'][len(tag_prefix):])  # Extract the key name
 
         return keys_with_tag
 
@@ -434,17 +819,19 @@ class S3KV:
         )
 
 
-    def delete_by_tag(self, tag_key: str, tag_value: str):
+    def delete_by_tag(self, tag_key: str, tag_value: str, max_workers: int = None):
         """
         Deletes keys in the S3KV database based on a specific tag.
 
         :param tag_key: The tag key to match for deletion.
         :param tag_value: The tag value to match for deletion.
+        :param max_workers: (Optional) Number of concurrent deletes, defaults to the instance setting.
         """
-        keys_to_delete = self.find_keys_by_tag_value(tag_key, tag_value)
+        max_workers = max_workers or self.max_workers
+        keys_to_delete = self.find_keys_by_tag_value(tag_key, tag_value, max_workers=max_workers)
 
-        for key in keys_to_delete:
-            self.delete(key)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(self.delete, keys_to_delete))
 
 
     def apply_legal_hold(self, key: str):
@@ -575,26 +962,55 @@ def load_batches_from_file(batch_file):
     return batches
 
 
-def perform_process(process, batch, coordinator):
+# A batch is locked by the key <batch id>; its final state is recorded as the key <batch id>.<state>,
+# so one listing of the coordinator yields the state of every batch.
+STATE_SEPARATOR = '.'
+
+
+def get_batch_id(batch):
+    return sha256(batch.encode('utf-8')).hexdigest() # ensure no special characters break cos
+
+
+def get_state_key(batch_id, state):
+    return f'{batch_id}{STATE_SEPARATOR}{state}'
+
+
+def states_from_keys(keys):
+    states = {}
+    for key in keys:
+        batch_id, _, state = key.partition(STATE_SEPARATOR)
+        # a final state overrides the lock
+        if state or batch_id not in states:
+            states[batch_id] = state or 'locked'
+    return states
+
+
+def get_coordinator_states(coordinator):
+    # one paginated listing instead of one request per batch
+    return states_from_keys(coordinator.iter_keys())
+
+
+def perform_process(process, batch, coordinator, states=None):
     logging.debug(f'Check coordinator files for batch {batch}.')
 
-    batch_id = sha256(batch.encode('utf-8')).hexdigest() # ensure no special characters break cos
+    batch_id = get_batch_id(batch)
     logging.info(f'Generating {batch_id} for {batch}')
 
-    if coordinator.key_exists(batch_id):
-        if coordinator.get(batch_id) == 'locked':
-            logging.debug(f'Batch {batch_id} is locked')
-            return
-        elif coordinator.get(batch_id) == 'processed':
-            logging.debug(f'Batch {batch_id} is processed')
-            return
-        else:
-            logging.debug(f'Batch {batch_id} is failed')
-            return
+    if states is None:
+        state = states_from_keys(coordinator.iter_keys(f's3kv/{batch_id}')).get(batch_id)
+    else:
+        state = states.get(batch_id)
 
+    if state is not None:
+        logging.debug(f'Batch {batch_id} is {state}')
+        return
 
     logging.debug(f'Locking batch {batch_id}.')
-    coordinator.add(batch_id,'locked')
+    if not coordinator.add_if_absent(batch_id, 'locked'):
+        logging.debug(f'Batch {batch_id} was locked by another process')
+        if states is not None:
+            states[batch_id] = 'locked'
+        return
 
     # processing files with custom process
     logging.info(f'Processing batch {batch_id}.')
@@ -602,12 +1018,16 @@ def perform_process(process, batch, coordinator):
         process(batch, ${component_inputs})
     except Exception as err:
         logging.exception(err)
-        coordinator.add(batch_id,f"{type(err).__name__} in batch {batch_id}: {err}")
+        coordinator.add(get_state_key(batch_id, 'failed'), f"{type(err).__name__} in batch {batch_id}: {err}")
+        if states is not None:
+            states[batch_id] = 'failed'
         logging.error(f'Continue processing.')
         return
 
     logging.info(f'Finished Batch {batch_id}.')
-    coordinator.add(batch_id,'processed')
+    coordinator.add(get_state_key(batch_id, 'processed'), 'processed')
+    if states is not None:
+        states[batch_id] = 'processed'
 
 
 def process_wrapper(sub_process):
@@ -625,15 +1045,19 @@ def process_wrapper(sub_process):
     # get batches
     batches = load_batches_from_file(gw_batch_file)
 
+    # Local state map, batches handled by other processes are skipped without a request
+    states = get_coordinator_states(coordinator)
+
     # Iterate over all batches
     for batch in batches:
-        perform_process(sub_process, batch, coordinator)
+        perform_process(sub_process, batch, coordinator, states)
 
     # Check and log status of batches
-    processed_status = sum(coordinator.get(batch_id) == 'processed' for batch_id in batches)
-    lock_status = sum(coordinator.get(batch_id) == 'locked' for batch_id in batches)
-    exists_status = sum(coordinator.key_exists(batch_id) for batch_id in batches)
-    error_status = exists_status - processed_status - lock_status
+    states = get_coordinator_states(coordinator)
+    batch_states = [states.get(get_batch_id(batch)) for batch in batches]
+    processed_status = batch_states.count('processed')
+    lock_status = batch_states.count('locked')
+    error_status = batch_states.count('failed')
 
     logging.info(f'Finished current process. Status batches: '
                  f'{processed_status} processed / {lock_status} locked / {error_status} errors / {len(batches)} total')
@@ -1,12 +1,28 @@
 import os
+import contextlib
+import hashlib
+import json
 import logging
-import nbformat
 import re
 import subprocess
-from nbconvert.exporters import PythonExporter
+import threading
+import time
+import urllib.error
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+BUILD_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'claimed', 'c3_build_cache.json')
+BUILD_HASH_LABEL = 'claimed.build-hash'
+REGISTRY_TAGS_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'claimed', 'c3_registry_tags.json')
+REGISTRY_TAGS_CACHE_TTL = 30
+DOCKER_HUB_REGISTRY = 'registry-1.docker.io'
 
 
 def convert_notebook(path):
+    # nbformat and nbconvert are slow to import, only load them when converting notebooks
+    import nbformat
+    from nbconvert.exporters import PythonExporter
+
     notebook = nbformat.read(path, as_version=4)
 
     # backwards compatibility (v0.1 description was included in second cell, merge first two markdown cells)
@@ -102,7 +118,175 @@ def pull_icr_image_tags(image):
     return image_tags
 
 
-def get_image_version(repository, name):
+def _registry_endpoint(image):
+    # split image into the registry API base url and the repository name
+    registry, _, path = image.partition('/')
+    if not path or ('.' not in registry and ':' not in registry and registry != 'localhost'):
+        # image without registry host, e.g. <username>/<image>
+        registry, path = 'docker.io', image
+    if registry in ('docker.io', 'index.docker.io'):
+        registry = DOCKER_HUB_REGISTRY
+        if '/' not in path:
+            path = 'library/' + path
+    # local registries (e.g. the registry:2 container) are served without TLS
+    scheme = 'http' if registry.split(':')[0] in ('localhost', '127.0.0.1') else 'https'
+    return f'{scheme}://{registry}', path
+
+
+def _registry_credentials(registry):
+    # base64 encoded basic auth from `docker login`, credential helpers are not supported
+    config_dir = os.environ.get('DOCKER_CONFIG', os.path.join(os.path.expanduser('~'), '.docker'))
+    try:
+        with open(os.path.join(config_dir, 'config.json')) as f:
+            auths = json.load(f).get('auths', {})
+    except (OSError, ValueError):
+        return None
+    keys = [registry, f'https://{registry}']
+    if registry == DOCKER_HUB_REGISTRY:
+        keys.append('https://index.docker.io/v1/')
+    for key in keys:
+        if auths.get(key, {}).get('auth'):
+            return auths[key]['auth']
+    return None
+
+
+def _registry_token(challenge, path, credentials, timeout):
+    import urllib.request
+
+    # token auth as used by docker hub and most registries: WWW-Authenticate: Bearer realm=...,service=...,scope=...
+    params = dict(re.findall(r'(\w+)="([^"]*)"', challenge))
+    realm = params.pop('realm')
+    params.setdefault('scope', f'repository:{path}:pull')
+    request = urllib.request.Request(f'{realm}?{urllib.parse.urlencode(params)}')
+    if credentials is not None:
+        request.add_header('Authorization', f'Basic {credentials}')
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        body = json.load(response)
+    return body.get('token') or body['access_token']
+
+
+def pull_registry_image_tags(image, timeout=10):
+    """
+    Lists the image tags with the registry API (OCI distribution GET /v2/<name>/tags/list).
+    Returns an empty list if the repository does not exist and None if the registry cannot be queried.
+    """
+    # http.client and ssl are only imported when a registry is queried
+    import urllib.request
+
+    base_url, path = _registry_endpoint(image)
+    credentials = _registry_credentials(base_url.split('://', 1)[1])
+    headers = {'Accept': 'application/json'}
+    url = f'{base_url}/v2/{path}/tags/list?n=1000'
+    image_tags = []
+    try:
+        while url is not None:
+            try:
+                with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout) as response:
+                    body = json.load(response)
+                    link = response.headers.get('Link', '')
+            except urllib.error.HTTPError as err:
+                challenge = err.headers.get('WWW-Authenticate', '')
+                if err.code == 401 and 'Authorization' not in headers:
+                    # authenticate and retry the request
+                    if challenge.lower().startswith('bearer'):
+                        headers['Authorization'] = f'Bearer {_registry_token(challenge, path, credentials, timeout)}'
+                        continue
+                    elif credentials is not None:
+                        headers['Authorization'] = f'Basic {credentials}'
+                        continue
+                if err.code == 404:
+                    # no image pushed yet
+                    return []
+                raise
+            image_tags.extend(body.get('tags') or [])
+            # follow pagination: Link: </v2/<name>/tags/list?n=1000&last=<tag>>; rel="next"
+            next_page = re.search(r'<([^>]+)>\s*;\s*rel="?next"?', link)
+            url = urllib.parse.urljoin(base_url, next_page.group(1)) if next_page else None
+    except (OSError, ValueError, KeyError) as err:
+        logging.debug(f'Could not list image tags of {image} with the registry API: {err}')
+        return None
+
+    # filter latest and none
+    image_tags = [t for t in image_tags if t not in ['latest', '<none>']]
+    return image_tags
+
+
+def get_registry_image_tags(image, cache_path=REGISTRY_TAGS_CACHE_PATH, ttl=REGISTRY_TAGS_CACHE_TTL):
+    """
+    Returns the image tags from the registry API, reusing results from the on-disk cache for ttl seconds.
+    """
+    if cache_path:
+        entry = _load_cache(cache_path).get(_registry_cache_key(image))
+        if entry is not None and time.time() - entry['time'] < ttl:
+            logging.debug(f'Using cached image tags for {image}.')
+            return entry['tags']
+    image_tags = pull_registry_image_tags(image)
+    if image_tags is not None and cache_path:
+        _update_registry_tags_cache(cache_path, image, image_tags, ttl)
+    return image_tags
+
+
+def prefetch_registry_image_tags(images, cache_path=REGISTRY_TAGS_CACHE_PATH, ttl=REGISTRY_TAGS_CACHE_TTL,
+                                 max_workers=16):
+    """
+    Looks up the tags of multiple images concurrently and fills the on-disk cache, e.g. before bulk builds.
+    Returns a dict with the tags per image (None if the registry cannot be queried).
+    """
+    images = list(images)
+    if len(images) == 0:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(images))) as executor:
+        image_tags = executor.map(lambda image: get_registry_image_tags(image, cache_path, ttl), images)
+        return dict(zip(images, image_tags))
+
+
+def add_registry_image_tag(image, tag, cache_path=REGISTRY_TAGS_CACHE_PATH, ttl=REGISTRY_TAGS_CACHE_TTL):
+    """
+    Adds a pushed tag to the cached image tags, so that the next version is not computed from a stale list.
+    """
+    if not cache_path:
+        return
+    entry = _load_cache(cache_path).get(_registry_cache_key(image))
+    if entry is not None and tag not in entry['tags']:
+        _update_registry_tags_cache(cache_path, image, entry['tags'] + [tag], ttl, entry['time'])
+
+
+def _registry_cache_key(image):
+    # the same repository can be written with or without the registry host, e.g. docker.io/<username>/<image>
+    base_url, path = _registry_endpoint(image)
+    return f"{base_url.split('://', 1)[1]}/{path}"
+
+
+def _update_registry_tags_cache(cache_path, image, image_tags, ttl, timestamp=None):
+    os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+    with _locked(cache_path):
+        now = time.time()
+        # drop expired entries
+        cache = {k: v for k, v in _load_cache(cache_path).items() if now - v['time'] < ttl}
+        cache[_registry_cache_key(image)] = {'time': timestamp or now, 'tags': image_tags}
+        _save_cache(cache, cache_path)
+
+
+VERSION_TAG_PATTERN = re.compile(r'^([A-Za-z]*)(\d+(?:\.\d+)*)$')
+
+
+def get_latest_version(image_tags):
+    """
+    Returns the highest version tag, comparing the numbers of tags like 0.10 or v0.3 numerically.
+    Purely numeric tags take precedence over prefixed tags. Returns None if no tag looks like a version.
+    """
+    versions = []
+    for tag in image_tags:
+        match = VERSION_TAG_PATTERN.match(tag)
+        if match is not None:
+            prefix, numbers = match.groups()
+            versions.append((prefix == '', tuple(map(int, numbers.split('.'))), tag))
+    if len(versions) == 0:
+        return None
+    return max(versions)[2]
+
+
+def get_image_version(repository, name, cache_path=REGISTRY_TAGS_CACHE_PATH):
     """
     Get current version of the image from the registry and increase the version by 1.
     Defaults to 0.1 if no image is found in the registry.
@@ -112,7 +296,10 @@ def get_image_version(repository, name):
         return '0.1'
 
     logging.debug(f'Get image version from registry.')
-    if 'docker.io' in repository:
+    image_tags = get_registry_image_tags(f'{repository}/claimed-{name}', cache_path)
+    if image_tags is not None:
+        logging.debug('Got image tags from the registry API.')
+    elif 'docker.io' in repository:
         logging.debug('Get image tags from docker.')
         image_tags = pull_docker_image_tags(f'{repository}/claimed-{name}')
     elif 'icr.io' in repository:
@@ -123,24 +310,103 @@ def get_image_version(repository, name):
         image_tags = pull_docker_image_tags(f'{repository}/claimed-{name}')
     logging.debug(f'Image tags: {image_tags}')
 
-    def check_only_numbers(test_str):
-        return set(test_str) <= set('.0123456789')
-
     if len(image_tags) == 0:
         # default version
         version = '0.1'
         logging.info(f'Using default version {version}. No prior image tag found for {repository}/claimed-{name}.')
+        return version
 
-    elif not check_only_numbers(image_tags[0]):
-        # increase last version
+    latest_tag = get_latest_version(image_tags)
+    if latest_tag is None:
+        # no version-like tag, increase the most recent tag (docker and ibmcloud list the newest image first)
         version = increase_image_version(image_tags[0])
         logging.info(f'Using version {version} based on last version {image_tags[0]}.')
-
     else:
-        # find the highest numerical version
-        image_tags = list(filter(check_only_numbers, image_tags))
-        image_tags.sort(key=lambda s: list(map(int, s.split('.'))))
-        version = increase_image_version(image_tags[-1])
-        logging.info(f'Using version {version} based on highest previous version {image_tags[-1]}.')
+        version = increase_image_version(latest_tag)
+        logging.info(f'Using version {version} based on highest previous version {latest_tag}.')
 
     return version
+
+
+def _hash_file(sha, path):
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+
+
+def get_build_hash(dockerfile, files, platform):
+    """
+    Hash of the generated Dockerfile, the target platform and the content of all files and directories
+    added to the image. Images with the same hash are identical up to non-pinned requirements.
+    """
+    sha = hashlib.sha256()
+    sha.update(platform.encode('utf-8') + b'\0')
+    _hash_file(sha, dockerfile)
+    for path in sorted(set(files)):
+        if os.path.isdir(path):
+            paths = sorted(os.path.join(root, file) for root, _, dir_files in os.walk(path) for file in dir_files)
+        else:
+            paths = [path]
+        for file in paths:
+            sha.update(b'\0' + file.encode('utf-8') + b'\0')
+            _hash_file(sha, file)
+    return sha.hexdigest()
+
+
+def _load_cache(cache_path):
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def lookup_build_cache(image, build_hash, cache_path=BUILD_CACHE_PATH):
+    """
+    Returns the version of the image that was built with the given build hash or None.
+    """
+    return _load_cache(cache_path).get(image, {}).get(build_hash)
+
+
+@contextlib.contextmanager
+def _locked(path):
+    # serialize read-modify-write cycles of concurrent c3 processes (bulk mode)
+    try:
+        import fcntl
+    except ImportError:
+        # no advisory file locks on this platform
+        yield
+        return
+    with open(f'{path}.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _save_cache(cache, cache_path):
+    tmp_path = f'{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp_path, cache_path)
+
+
+def update_build_cache(image, build_hash, version, cache_path=BUILD_CACHE_PATH):
+    os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+    with _locked(cache_path):
+        cache = _load_cache(cache_path)
+        cache.setdefault(image, {})[build_hash] = version
+        _save_cache(cache, cache_path)
+
+
+def image_exists(image, remote=True):
+    """
+    Checks if an image tag exists in the registry (remote) or in the local docker images.
+    """
+    command = ['docker', 'manifest', 'inspect', image] if remote else ['docker', 'image', 'inspect', image]
+    try:
+        return subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+    except FileNotFoundError:
+        # docker is not installed
+        return False
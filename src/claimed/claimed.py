@@ -1,8 +1,21 @@
+import argparse
+import collections
 import importlib
 import inspect
+import json
 import os
+import selectors
+import signal
+import socket
 import subprocess
 import sys
+import tempfile
+import traceback
+
+SERVER_SOCKET = os.environ.get(
+    'CLAIMED_SERVER_SOCKET',
+    os.path.join(os.environ.get('XDG_RUNTIME_DIR', tempfile.gettempdir()), f'claimed-{os.getuid()}.sock'),
+)
 
 
 def _parse_kwargs(rest, sig):
@@ -63,9 +76,14 @@ def _parse_kwargs(rest, sig):
 
 def _run_module(args):
     if not args:
-        print("Usage: claimed run <module.path> [--param-name value ...] [--help]")
+        print("Usage: claimed run [--via-server] <module.path> [--param-name value ...] [--help]")
         sys.exit(1)
 
+    if args[0] == '--via-server':
+        if '--help' not in args:
+            return _run_via_server(args[1:])
+        args = args[1:]
+
     module_path = args[0]
     rest = args[1:]
 
@@ -108,7 +126,268 @@ def _run_module(args):
         sys.exit(0)
 
     kwargs = _parse_kwargs(rest, sig)
-    fn(**kwargs)
+    return fn(**kwargs)
+
+
+def _run_via_server(args):
+    """Send the run request to a `claimed serve` worker, falls back to a local run if no worker is listening."""
+    if not args:
+        _run_module(args)
+    request = {'module': args[0], 'args': args[1:], 'cwd': os.getcwd(), 'env': dict(os.environ)}
+    try:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(SERVER_SOCKET)
+    except OSError as e:
+        print(f"No claimed server at {SERVER_SOCKET} ({e}), running locally.", file=sys.stderr)
+        return _run_module(args)
+
+    sys.stdout.flush()
+    with conn:
+        # the worker writes directly to our stdin/stdout/stderr
+        socket.send_fds(conn, [json.dumps(request).encode('utf-8') + b'\n'], [0, 1, 2])
+        response = conn.makefile('rb').readline()
+    if not response:
+        print("Error: claimed server closed the connection.", file=sys.stderr)
+        sys.exit(1)
+    response = json.loads(response)
+    sys.exit(response['exit_code'])
+
+
+def _execute_request(request):
+    """Runs a request in the forked child, returns the result of run()."""
+    if request.get('cwd'):
+        os.chdir(request['cwd'])
+    if request.get('env') is not None:
+        os.environ.clear()
+        os.environ.update(request['env'])
+    if request.get('kwargs') is not None:
+        # kwargs are passed as is, without type coercion
+        return importlib.import_module(request['module']).run(**request['kwargs'])
+    return _run_module([request['module'], *request.get('args', [])])
+
+
+def _fork_request(request, fds, stdin_mode):
+    """Forks a child that runs the request. Returns the pid and the pipe that receives the result."""
+    result_r, result_w = os.pipe()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid:
+        os.close(result_w)
+        return pid, result_r
+
+    # child: isolated copy of the warm interpreter
+    os.close(result_r)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    if fds:
+        for target, fd in zip((0, 1, 2), fds):
+            os.dup2(fd, target)
+    elif stdin_mode:
+        # stdin and stdout carry the JSONL protocol
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(2, 1)
+    sys.argv = ['claimed', 'run', request.get('module', '')]
+    response = {'result': None, 'error': None}
+    exit_code = 0
+    try:
+        response['result'] = _execute_request(request)
+    except SystemExit as e:
+        if isinstance(e.code, int) or e.code is None:
+            exit_code = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException as e:
+        traceback.print_exc()
+        response['error'] = f'{type(e).__name__}: {e}'
+        exit_code = 1
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        payload = json.dumps(response, default=str).encode('utf-8')
+        while payload:
+            payload = payload[os.write(result_w, payload):]
+    finally:
+        os._exit(exit_code)
+
+
+def _serve(args):
+    parser = argparse.ArgumentParser(prog='claimed serve',
+                                     description='Warm interpreter worker that runs `claimed run` requests in '
+                                                 'forked children.')
+    parser.add_argument('--socket', default=SERVER_SOCKET,
+                        help=f'Unix socket to listen on (default: {SERVER_SOCKET}, env CLAIMED_SERVER_SOCKET)')
+    parser.add_argument('--stdin', action='store_true',
+                        help='Read JSONL requests from stdin and write JSONL responses to stdout instead of a socket')
+    parser.add_argument('--preload', default=os.environ.get('CLAIMED_PRELOAD', ''),
+                        help='Comma-separated modules imported at start-up, e.g. torch,pandas,s3fs '
+                             '(env CLAIMED_PRELOAD)')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count(),
+                        help='Maximum number of concurrently running requests, further requests are queued '
+                             '(default: number of CPUs)')
+    parser.add_argument('--learn', default=os.environ.get('CLAIMED_LEARN', ''),
+                        help='Comma-separated modules imported into the worker after their first request, so that '
+                             'subsequent requests start warm (env CLAIMED_LEARN). Other modules are only imported '
+                             'in the forked children.')
+    args = parser.parse_args(args)
+    learn = set(filter(None, (m.strip() for m in args.learn.split(','))))
+
+    loaded = set()
+
+    def preload(module_path):
+        if module_path in loaded:
+            return
+        loaded.add(module_path)
+        try:
+            importlib.import_module(module_path)
+        except Exception as e:
+            print(f"Warning: cannot preload module '{module_path}': {e}", file=sys.stderr)
+
+    for module_path in filter(None, (m.strip() for m in args.preload.split(','))):
+        preload(module_path)
+
+    selector = selectors.DefaultSelector()
+    pending = {}  # result pipe -> [pid, request id, connection or None, result chunks]
+    queued = collections.deque()
+
+    def start(request, fds=None, conn=None):
+        if len(pending) >= args.max_workers:
+            queued.append((request, fds, conn))
+            return
+        pid, result_r = _fork_request(request, fds, args.stdin)
+        for fd in fds or []:
+            os.close(fd)
+        pending[result_r] = [pid, request.get('id'), conn, []]
+        selector.register(result_r, selectors.EVENT_READ, 'result')
+        if request.get('module') in learn:
+            # following requests for this module start without importing it
+            preload(request['module'])
+
+    def respond(response, conn):
+        line = json.dumps(response, default=str).encode('utf-8') + b'\n'
+        if conn is None:
+            sys.stdout.buffer.write(line)
+            sys.stdout.flush()
+            return
+        try:
+            conn.sendall(line)
+        except OSError:
+            pass
+        conn.close()
+
+    def finish(result_r):
+        pid, request_id, conn, chunks = pending.pop(result_r)
+        selector.unregister(result_r)
+        os.close(result_r)
+        _, status = os.waitpid(pid, 0)
+        exit_code = os.waitstatus_to_exitcode(status)
+        if exit_code < 0:
+            # killed by a signal
+            exit_code = 128 - exit_code
+        try:
+            response = json.loads(b''.join(chunks) or b'{}')
+        except ValueError:
+            response = {}
+        response.setdefault('error', None if exit_code == 0 else f'worker exited with code {exit_code}')
+        respond({'id': request_id, 'exit_code': exit_code, 'result': response.get('result'),
+                 'error': response['error']}, conn)
+        if queued:
+            start(*queued.popleft())
+
+    def receive(conn, buffer):
+        # non-blocking read of a socket request, the client sends its stdio fds with the first bytes
+        try:
+            msg, fds, _, _ = socket.recv_fds(conn, 1 << 16, 3)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            msg, error = b'', e
+        else:
+            error = None
+        buffer[0] += msg
+        buffer[1].extend(fds)
+        if msg and not msg.endswith(b'\n'):
+            return
+        selector.unregister(conn)
+        conn.setblocking(True)
+        try:
+            if error is not None:
+                raise error
+            request = parse_request(buffer[0])
+        except (OSError, ValueError) as e:
+            for fd in buffer[1]:
+                os.close(fd)
+            respond({'id': None, 'exit_code': 2, 'result': None, 'error': f'invalid request: {e}'}, conn)
+            return
+        start(request, buffer[1], conn)
+
+    def parse_request(line):
+        request = json.loads(line)
+        if not isinstance(request, dict) or 'module' not in request:
+            raise ValueError('request requires a "module"')
+        return request
+
+    listener = None
+    stdin_buffer = b''
+    if args.stdin:
+        selector.register(0, selectors.EVENT_READ, 'stdin')
+    else:
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            listener.bind(args.socket)
+        finally:
+            os.umask(old_umask)
+        listener.listen(128)
+        selector.register(listener, selectors.EVENT_READ, 'accept')
+        print(f"claimed server listening on {args.socket}", file=sys.stderr)
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    accepting = True
+    try:
+        while accepting or pending or queued:
+            for key, _ in selector.select():
+                if key.data == 'accept':
+                    conn, _ = listener.accept()
+                    conn.setblocking(False)
+                    # a slow client must not block the other requests, its request is read when it arrives
+                    selector.register(conn, selectors.EVENT_READ, [b'', []])
+                elif isinstance(key.data, list):
+                    receive(key.fileobj, key.data)
+                elif key.data == 'stdin':
+                    data = os.read(0, 1 << 16)
+                    if not data:
+                        # end of input, finish the running requests
+                        selector.unregister(0)
+                        accepting = False
+                        data = b'\n'
+                    stdin_buffer += data
+                    *lines, stdin_buffer = stdin_buffer.split(b'\n')
+                    for line in filter(bytes.strip, lines):
+                        try:
+                            request = parse_request(line)
+                        except ValueError as e:
+                            respond({'id': None, 'exit_code': 2, 'result': None,
+                                     'error': f'invalid request: {e}'}, None)
+                            continue
+                        start(request)
+                else:
+                    chunk = os.read(key.fd, 1 << 16)
+                    if chunk:
+                        pending[key.fd][3].append(chunk)
+                    else:
+                        finish(key.fd)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if listener is not None:
+            listener.close()
+            if os.path.exists(args.socket):
+                os.remove(args.socket)
 
 
 def main():
@@ -116,10 +395,18 @@ def main():
         _run_module(sys.argv[2:])
         return
 
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        _serve(sys.argv[2:])
+        return
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'pipeline':
+        from claimed.pipeline import main as pipeline_main
+        pipeline_main(sys.argv[2:])
+        return
+
     dir_path = os.path.dirname(os.path.realpath(__file__))
-    return subprocess.call(
-        f'{dir_path}/scripts/claimed ' + ' '.join(sys.argv[1:]), shell=True
-    )
+    # argv list without a shell, so that parameter values are passed unchanged
+    return subprocess.call([f'{dir_path}/scripts/claimed', *sys.argv[1:]])
 
 
 if __name__ == '__main__':
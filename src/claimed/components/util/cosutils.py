@@ -17,64 +17,602 @@
 # In[ ]:
 
 
+import base64
+import contextlib
+import hashlib
+import json
 import logging
 import math
+import mmap
 import os
+import random
 import re
 import s3fs
 import sys
 import glob
+import threading
+import time
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from fsspec.utils import glob_translate
 from tqdm import tqdm
 from claimed.c3.operator_utils import explode_connection_string
 
 MIN_CHUNK_SIZE = 8 * 1024 * 1024   # 8 MiB
 MAX_PARTS      = 9500               # S3 hard limit is 10 000; stay safely below
+MAX_RETRIES    = 5
+MANIFEST_VERSION = 1
 
+# errors a retry cannot fix
+_FATAL_ERROR_CODES = ('403', '404', '412', 'AccessDenied', 'NoSuchBucket', 'NoSuchKey', 'PreconditionFailed')
 
-def _upload(s3, local_file, cos_file):
+_GLOB_MAGIC = re.compile(r'[*?[]')
+
+
+def _chunk_size(size):
+    """Smallest part size >= MIN_CHUNK_SIZE that keeps a file of `size` bytes below MAX_PARTS parts."""
+    return max(MIN_CHUNK_SIZE, math.ceil(size / MAX_PARTS))
+
+
+def _split_cos_path(cos_path):
+    """Split 'bucket/key' into bucket and key."""
+    bucket, _, key = cos_path.lstrip('/').partition('/')
+    return bucket, key
+
+
+def _upload_target(local_file, cos_file):
+    # If cos_file is a bucket root or ends with '/', treat it as a directory prefix
+    if cos_file == '' or cos_file.endswith('/') or '/' not in cos_file:
+        cos_file = cos_file.rstrip('/') + '/' + os.path.basename(local_file)
+    return cos_file
+
+
+def _retry(fn, *args, retries=MAX_RETRIES, **kwargs):
+    """Call fn, retrying with jittered exponential backoff on any error."""
+    for attempt in range(retries):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == retries - 1:
+                raise
+            if isinstance(e, ClientError) and e.response.get('Error', {}).get('Code') in _FATAL_ERROR_CODES:
+                raise
+            delay = min(30, 2 ** attempt) * (0.5 + random.random())
+            logging.warning(f'{e}; retry {attempt + 1}/{retries - 1} in {delay:.1f}s')
+            time.sleep(delay)
+
+
+@contextlib.contextmanager
+def _mapped(path, writable=False):
+    """Memory-map a whole file and yield a memoryview of it."""
+    if os.path.getsize(path) == 0:
+        # empty files cannot be mapped
+        yield memoryview(bytearray() if writable else b'')
+        return
+    with open(path, 'r+b' if writable else 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        view = memoryview(mm)
+        try:
+            yield view
+        finally:
+            view.release()
+            try:
+                mm.close()
+            except BufferError:
+                # slices are still referenced elsewhere; the mapping goes away with them
+                pass
+
+
+class _MemoryViewReader:
+    """Seekable file object over a memoryview whose reads return slices, not copies."""
+
+    def __init__(self, view):
+        self._view = view
+        self._pos = 0
+
+    def __len__(self):
+        return len(self._view)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        base = {os.SEEK_SET: 0, os.SEEK_CUR: self._pos, os.SEEK_END: len(self._view)}[whence]
+        self._pos = min(max(0, base + offset), len(self._view))
+        return self._pos
+
+    def read(self, size=-1):
+        end = len(self._view) if size is None or size < 0 else min(len(self._view), self._pos + size)
+        chunk = self._view[self._pos:end]
+        self._pos = end
+        return chunk
+
+
+def _readinto(stream, view):
+    """Fill a writable memoryview from a stream; returns the number of bytes read."""
+    readinto = getattr(stream, 'readinto', None)
+    filled = 0
+    while filled < len(view):
+        if readinto is not None:
+            n = readinto(view[filled:])
+        else:
+            block = stream.read(len(view) - filled)
+            n = len(block)
+            view[filled:filled + n] = block
+        if not n:
+            break
+        filled += n
+    return filled
+
+
+class TransferEngine:
+    """Concurrent, resumable multi-file and multipart transfers between local disk and S3/COS.
+
+    Up to `max_concurrent_files` files are transferred at the same time, and files
+    larger than one chunk are split into parts of which up to `max_concurrent_parts`
+    per file are in flight. Failed parts are retried individually. A single
+    progress bar shows the aggregate throughput of all transfers.
+
+    Multipart transfers are resumable: an upload keeps its upload ID and the ETags
+    of completed parts in a sidecar file in `state_dir`, a download writes to
+    `<local_file>.partial` and records completed ranges the same way. A failed run
+    leaves both in place and the next transfer of the same file only moves the
+    missing parts. Every part is sent with its MD5 for the server to check, and
+    downloads are verified against the object's ETag before they are renamed.
+
+    Files are memory-mapped: parts are uploaded from memoryview slices of the
+    source and downloaded with readinto() straight into the preallocated target,
+    so no per-part buffers are allocated or copied.
+    """
+
+    def __init__(self, client, max_concurrent_files=8, max_concurrent_parts=4, max_retries=MAX_RETRIES,
+                 state_dir=None, verify=True):
+        self.client = client
+        self.max_concurrent_files = max(1, max_concurrent_files)
+        self.max_concurrent_parts = max(1, max_concurrent_parts)
+        self.max_retries = max_retries
+        self.state_dir = state_dir or os.path.join(os.path.expanduser('~'), '.cache', 'claimed', 'cosutils')
+        self.verify = verify
+        self._lock = threading.Lock()
+        self._pbar = None
+
+    @classmethod
+    def from_connection(cls, access_key_id, secret_access_key, endpoint, max_concurrent_files=8,
+                        max_concurrent_parts=4, max_retries=MAX_RETRIES, **kwargs):
+        pool_size = max(10, max_concurrent_files * max_concurrent_parts)
+        try:
+            # parts carry a Content-MD5 already; a second, trailing checksum would
+            # make botocore re-chunk (and copy) every body
+            config = Config(max_pool_connections=pool_size, request_checksum_calculation='when_required')
+        except TypeError:
+            # botocore < 1.36 has no flexible checksums
+            config = Config(max_pool_connections=pool_size)
+        client = boto3.client(
+            's3',
+            endpoint_url=endpoint,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            config=config,
+        )
+        return cls(client, max_concurrent_files, max_concurrent_parts, max_retries, **kwargs)
+
+    def _progress(self, n):
+        with self._lock:
+            if self._pbar is not None:
+                self._pbar.update(n)
+
+    def _run(self, fn, jobs, total, desc):
+        if not jobs:
+            return
+        with tqdm(total=total, unit='B', unit_scale=True, unit_divisor=1024, desc=desc) as pbar:
+            self._pbar = pbar
+            try:
+                with ThreadPoolExecutor(max_workers=self.max_concurrent_files) as executor:
+                    # list() re-raises the first failed transfer
+                    list(executor.map(lambda job: fn(*job), jobs))
+            finally:
+                self._pbar = None
+
+    def _state_path(self, kind, cos_file, local_file):
+        digest = hashlib.sha256(f'{cos_file}\0{os.path.abspath(local_file)}'.encode('utf-8')).hexdigest()
+        return os.path.join(self.state_dir, f'{kind}-{digest[:32]}.json')
+
+    @staticmethod
+    def _load_state(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_state(self, path, state):
+        # called from part threads; serialize writers so the sidecar is never torn
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f'{path}.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp, path)
+
+    @staticmethod
+    def _drop_state(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def upload(self, pairs):
+        """Upload (local_file, cos_file) pairs; cos_file is 'bucket/key'."""
+        jobs = [(local_file, _upload_target(local_file, cos_file)) for local_file, cos_file in pairs]
+        total = sum(os.path.getsize(local_file) for local_file, _ in jobs)
+        self._run(self._upload_file, jobs, total, f'↑ {len(jobs)} file(s)')
+
+    def download(self, pairs):
+        """Download (cos_file, local_file[, size[, etag]]) tuples; size and ETag from a listing save a HEAD request."""
+        jobs = []
+        for pair in pairs:
+            cos_file, local_file = pair[0], pair[1]
+            size = pair[2] if len(pair) > 2 else None
+            etag = pair[3] if len(pair) > 3 else None
+            if size is None or etag is None:
+                bucket, key = _split_cos_path(cos_file)
+                head = _retry(self.client.head_object, Bucket=bucket, Key=key, retries=self.max_retries)
+                size, etag = head['ContentLength'], head['ETag']
+            jobs.append((cos_file, local_file, size, etag.strip('"')))
+        total = sum(size for _, _, size, _ in jobs)
+        self._run(self._download_file, jobs, total, f'↓ {len(jobs)} file(s)')
+
+    def _put_part(self, view, **kwargs):
+        digest = hashlib.md5(view).digest()
+        kwargs['ContentMD5'] = base64.b64encode(digest).decode('ascii')
+        body = _MemoryViewReader(view)
+        if 'UploadId' in kwargs:
+            return self.client.upload_part(Body=body, **kwargs)['ETag'], digest
+        return self.client.put_object(Body=body, **kwargs)['ETag'], digest
+
+    def _completed_parts(self, bucket, key, state):
+        """Parts of the sidecar's upload the server confirms, or None if the upload is gone."""
+        server = {}
+        kwargs = {'Bucket': bucket, 'Key': key, 'UploadId': state['upload_id']}
+        try:
+            while True:
+                resp = self.client.list_parts(**kwargs)
+                for part in resp.get('Parts', []):
+                    server[part['PartNumber']] = part['ETag']
+                if not resp.get('IsTruncated'):
+                    break
+                kwargs['PartNumberMarker'] = resp['NextPartNumberMarker']
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in ('NoSuchUpload', '404'):
+                raise
+            return None
+        return {number: part for number, part in state['parts'].items()
+                if server.get(int(number)) == part['etag']}
+
+    def _upload_file(self, local_file, cos_file):
+        with _mapped(local_file) as view:
+            self._upload_view(view, local_file, cos_file)
+
+    def _upload_view(self, view, local_file, cos_file):
+        bucket, key = _split_cos_path(cos_file)
+        st = os.stat(local_file)
+        size = st.st_size
+        chunk_size = _chunk_size(size)
+        logging.debug(f'uploading {local_file} to {cos_file}')
+        if size <= chunk_size:
+            _retry(self._put_part, view, Bucket=bucket, Key=key, retries=self.max_retries)
+            self._progress(size)
+            return
+
+        state_path = self._state_path('upload', cos_file, local_file)
+        state = self._load_state(state_path)
+        parts = None
+        if state and (state['size'], state['mtime_ns'], state['chunk_size']) == (size, st.st_mtime_ns, chunk_size):
+            parts = self._completed_parts(bucket, key, state)
+        if parts is None:
+            state = {'upload_id': self.client.create_multipart_upload(Bucket=bucket, Key=key)['UploadId'],
+                     'size': size, 'mtime_ns': st.st_mtime_ns, 'chunk_size': chunk_size, 'parts': {}}
+            self._save_state(state_path, state)
+        else:
+            state['parts'] = parts
+            logging.info(f'resuming upload of {local_file}: {len(parts)} part(s) already uploaded')
+        upload_id = state['upload_id']
+        n_parts = math.ceil(size / chunk_size)
+        self._progress(sum(min(chunk_size, size - (int(n) - 1) * chunk_size) for n in state['parts']))
+
+        def upload_part(part_number):
+            offset = (part_number - 1) * chunk_size
+            length = min(chunk_size, size - offset)
+            etag, md5 = _retry(self._put_part, view[offset:offset + length], Bucket=bucket, Key=key,
+                               UploadId=upload_id, PartNumber=part_number, retries=self.max_retries)
+            with self._lock:
+                state['parts'][str(part_number)] = {'etag': etag, 'md5': md5.hex()}
+            self._save_state(state_path, state)
+            self._progress(length)
+
+        try:
+            missing = [n for n in range(1, n_parts + 1) if str(n) not in state['parts']]
+            with ThreadPoolExecutor(max_workers=self.max_concurrent_parts) as executor:
+                list(executor.map(upload_part, missing))
+        except Exception:
+            logging.error(f'upload of {local_file} failed; {len(state["parts"])}/{n_parts} parts are kept for resuming')
+            raise
+        parts = [{'PartNumber': n, 'ETag': state['parts'][str(n)]['etag']} for n in range(1, n_parts + 1)]
+        etag = self.client.complete_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id,
+                                                     MultipartUpload={'Parts': parts})['ETag'].strip('"')
+        expected = hashlib.md5(b''.join(bytes.fromhex(state['parts'][str(n)]['md5'])
+                                        for n in range(1, n_parts + 1))).hexdigest()
+        self._drop_state(state_path)
+        if self.verify and _is_md5_etag(etag) and etag != f'{expected}-{n_parts}':
+            raise IOError(f'integrity check failed for {cos_file}: ETag {etag} != {expected}-{n_parts}')
+
+    def matches_etag(self, local_file, cos_file, size, etag):
+        """Whether local_file has the content of cos_file, by recomputing its ETag.
+
+        Multipart ETags depend on the part size of the uploader. This module's part size
+        is tried first; otherwise the size of the object's first part is requested.
+        Returns None if the ETag cannot be recomputed, e.g. with SSE-KMS or unequal parts.
+        """
+        if not _is_md5_etag(etag):
+            return None
+        parts = _etag_parts(etag)
+        if parts == 0:
+            return _file_etag(local_file, size, multipart=False) == etag
+        chunk_size = _chunk_size(size)
+        if math.ceil(size / chunk_size) == parts and _file_etag(local_file, size, chunk_size, True) == etag:
+            return True
+        # uploaded with another part size, e.g. by a different client
+        bucket, key = _split_cos_path(cos_file)
+        try:
+            part_size = self.client.head_object(Bucket=bucket, Key=key, PartNumber=1)['ContentLength']
+        except ClientError as e:
+            logging.debug(f'cannot determine the part size of {cos_file}: {e}')
+            return None
+        if part_size == chunk_size:
+            return False
+        if not part_size or math.ceil(size / part_size) != parts:
+            logging.debug(f'cannot verify {cos_file}: {parts} parts of unequal size')
+            return None
+        return _file_etag(local_file, size, part_size, True) == etag
+
+    def _download_file(self, cos_file, local_file, size, etag):
+        bucket, key = _split_cos_path(cos_file)
+        os.makedirs(os.path.dirname(local_file) or '.', exist_ok=True)
+        partial = f'{local_file}.partial'
+        chunk_size = _chunk_size(size)
+        state_path = self._state_path('download', cos_file, local_file)
+        logging.debug(f'downloading {cos_file} to {local_file}')
+
+        state = self._load_state(state_path) if size > chunk_size else None
+        if state and (state['etag'], state['size'], state['chunk_size']) == (etag, size, chunk_size) \
+                and os.path.exists(partial) and os.path.getsize(partial) == size:
+            logging.info(f'resuming download of {cos_file}: {len(state["done"])} part(s) already downloaded')
+        else:
+            state = {'etag': etag, 'size': size, 'chunk_size': chunk_size, 'done': []}
+            # preallocate, so parts can be written at their offsets in any order
+            with open(partial, 'wb') as f:
+                f.truncate(size)
+            if size > chunk_size:
+                self._save_state(state_path, state)
+        done = set(state['done'])
+        self._progress(sum(min(chunk_size, size - offset) for offset in done))
+
+        with _mapped(partial, writable=True) as view:
+            def download_part(offset):
+                length = min(chunk_size, size - offset)
+
+                def get_part():
+                    # IfMatch pins every range to the same version of the object
+                    response = self.client.get_object(Bucket=bucket, Key=key, IfMatch=etag,
+                                                      Range=f'bytes={offset}-{offset + length - 1}')
+                    if _readinto(response['Body'], view[offset:offset + length]) != length:
+                        raise IOError(f'short read of {cos_file} at offset {offset}')
+                _retry(get_part, retries=self.max_retries)
+                if size > chunk_size:
+                    with self._lock:
+                        state['done'].append(offset)
+                    self._save_state(state_path, state)
+                self._progress(length)
+
+            with ThreadPoolExecutor(max_workers=self.max_concurrent_parts) as executor:
+                list(executor.map(download_part, [o for o in range(0, size, chunk_size) if o not in done]))
+
+        if self.verify and self.matches_etag(partial, cos_file, size, etag) is False:
+            os.remove(partial)
+            self._drop_state(state_path)
+            raise IOError(f'integrity check failed for {cos_file}: content does not match ETag {etag}')
+        os.replace(partial, local_file)
+        self._drop_state(state_path)
+
+
+def _glob_root(pattern):
+    """Longest leading directory of a glob pattern that contains no wildcards."""
+    parts = []
+    for part in pattern.split('/')[:-1]:
+        if _GLOB_MAGIC.search(part):
+            break
+        parts.append(part)
+    return '/'.join(parts)
+
+
+def _scan_local(pattern, recursive=False):
+    """Size and mtime of all local files matching a glob pattern, from one os.scandir walk.
+
+    A path without wildcards matches itself if it is a file, or all files below it
+    if it is a directory, like the remote listing in _list_remote.
+    """
+    if not _GLOB_MAGIC.search(pattern):
+        if os.path.isfile(pattern):
+            st = os.stat(pattern)
+            return {pattern: {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}}
+        if not os.path.isdir(pattern):
+            return {}
+        pattern, recursive = pattern.rstrip('/') + '/**', True
+    if not recursive:
+        pattern = pattern.replace('**', '*')
+    regex = re.compile(glob_translate(pattern))
+    root = _glob_root(pattern)
+    # without '**' a pattern can only match a fixed number of levels below its root
+    max_depth = None
+    if '**' not in pattern:
+        max_depth = len(pattern.split('/')) - len(root.split('/') if root else []) - 1
+
+    files = {}
+    stack = [(root, 0)]
+    while stack:
+        directory, depth = stack.pop()
+        try:
+            entries = os.scandir(directory or '.')
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                path = os.path.join(directory, entry.name) if directory else entry.name
+                if entry.is_dir():
+                    if max_depth is None or depth < max_depth:
+                        stack.append((path, depth + 1))
+                elif entry.is_file() and regex.match(path):
+                    st = entry.stat()
+                    files[path] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    return files
+
+
+def _list_remote(s3, path):
+    """Size and ETag of all objects matching a glob, from one bulk listing.
+
+    A path without wildcards matches the object itself or all objects below it as a
+    directory, never siblings that merely share its name as a prefix.
+    """
+    if _GLOB_MAGIC.search(path):
+        infos = s3.glob(path, detail=True)
+    else:
+        infos = s3.find(path, detail=True)
+    return {p: {'size': info['size'], 'etag': info.get('ETag', '').strip('"')}
+            for p, info in infos.items() if info.get('type') != 'directory'}
+
+
+def _file_etag(local_file, size, chunk_size=None, multipart=None):
+    """ETag S3/COS assigns to local_file when it is uploaded in parts of chunk_size (default: this module's)."""
+    chunk_size = chunk_size or _chunk_size(size)
+    if multipart is None:
+        multipart = size > chunk_size
+    elif not multipart:
+        chunk_size = max(size, 1)
+    with _mapped(local_file) as view:
+        digests = [hashlib.md5(view[offset:offset + chunk_size]).digest() for offset in range(0, size, chunk_size)]
+    if not multipart:
+        return digests[0].hex() if digests else hashlib.md5(b'').hexdigest()
+    return f'{hashlib.md5(b"".join(digests)).hexdigest()}-{len(digests)}'
+
+
+def _etag_parts(etag):
+    """Number of parts of a multipart ETag ('<md5>-<parts>'), 0 for a single-part upload."""
+    _, _, parts = etag.partition('-')
+    return int(parts) if parts else 0
+
+
+def _is_md5_etag(etag):
+    """True for ETags derived from MD5 digests; objects with SSE-KMS or SSE-C have opaque ETags."""
+    return re.fullmatch(r'[0-9a-f]{32}(-\d+)?', etag) is not None
+
+
+def _in_sync(local_file, local, remote, entry=None, checksum=False, engine=None, remote_file=None):
+    """Decide whether a local file and its remote counterpart are already identical.
+
+    A manifest entry recorded by the previous sync short-cuts the decision when
+    neither side changed since. Otherwise the sizes are compared and, with
+    checksum, the ETag is recomputed from the local file. With an engine, objects
+    uploaded with another part size are compared too; files whose ETag cannot be
+    recomputed count as changed.
+    """
+    if local is None or remote is None or local['size'] != remote['size']:
+        return False
+    if entry is not None and entry.get('etag') == remote['etag'] \
+            and entry.get('size') == local['size'] and entry.get('mtime_ns') == local['mtime_ns']:
+        return True
+    if checksum:
+        if engine is not None:
+            return engine.matches_etag(local_file, remote_file, local['size'], remote['etag']) is True
+        return _file_etag(local_file, local['size']) == remote['etag']
+    # a manifest entry that no longer matches means one side changed with the same size
+    return entry is None
+
+
+def _load_manifest(manifest):
+    if not manifest or not os.path.exists(manifest):
+        return {}
+    with open(manifest) as f:
+        data = json.load(f)
+    if data.get('version') != MANIFEST_VERSION:
+        logging.warning(f'ignoring manifest {manifest} with unsupported version {data.get("version")}')
+        return {}
+    return data.get('files', {})
+
+
+def _save_manifest(manifest, files):
+    tmp = f'{manifest}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'version': MANIFEST_VERSION, 'files': files}, f)
+    os.replace(tmp, manifest)
+
+
+def _upload(s3, local_file, cos_file, engine=None):
     """Upload a single file to S3/COS with a byte-level progress bar.
 
     Chunk size is computed dynamically so the number of multipart parts
     never exceeds the S3/COS limit of 10 000.
     """
-    # If cos_file is a bucket root or ends with '/', treat it as a directory prefix
-    if cos_file == '' or cos_file.endswith('/') or '/' not in cos_file:
-        cos_file = cos_file.rstrip('/') + '/' + os.path.basename(local_file)
+    if engine is not None:
+        engine.upload([(local_file, cos_file)])
+        return
+    cos_file = _upload_target(local_file, cos_file)
     size = os.path.getsize(local_file)
     # Ensure chunk size is large enough to stay within the 10 000-part limit
-    chunk_size = max(MIN_CHUNK_SIZE, math.ceil(size / MAX_PARTS))
+    chunk_size = _chunk_size(size)
     desc = os.path.basename(local_file)
+    buffer = memoryview(bytearray(chunk_size))
     with tqdm(total=size, unit='B', unit_scale=True, unit_divisor=1024,
               desc=f'↑ {desc}', leave=True) as pbar:
         with open(local_file, 'rb') as f_in, \
              s3.open(cos_file, 'wb', block_size=chunk_size) as f_out:
             while True:
-                chunk = f_in.read(chunk_size)
-                if not chunk:
+                n = f_in.readinto(buffer)
+                if not n:
                     break
-                f_out.write(chunk)
-                pbar.update(len(chunk))
+                f_out.write(buffer[:n])
+                pbar.update(n)
 
 
-def _download(s3, cos_file, local_file):
+def _download(s3, cos_file, local_file, engine=None):
     """Download a single file from S3/COS with a byte-level progress bar."""
+    if engine is not None:
+        engine.download([(cos_file, local_file)])
+        return
     os.makedirs(os.path.dirname(local_file) or '.', exist_ok=True)
     size = s3.info(cos_file)['size']
     desc = os.path.basename(cos_file)
     with tqdm(total=size, unit='B', unit_scale=True, unit_divisor=1024,
               desc=f'↓ {desc}', leave=True) as pbar:
+        buffer = memoryview(bytearray(MIN_CHUNK_SIZE))
         with s3.open(cos_file, 'rb') as f_in, open(local_file, 'wb') as f_out:
             while True:
-                chunk = f_in.read(MIN_CHUNK_SIZE)
-                if not chunk:
+                n = f_in.readinto(buffer)
+                if not n:
                     break
-                f_out.write(chunk)
-                pbar.update(len(chunk))
+                f_out.write(buffer[:n])
+                pbar.update(n)
 
 # In[ ]:
 
 
-
 # cos_connection in format: [cos|s3]://access_key_id:secret_access_key@endpoint/bucket/path
 cos_connection = os.environ.get('cos_connection')
 
@@ -90,6 +628,18 @@ operation = os.environ.get('operation')
 # log level
 log_level = os.environ.get('log_level', 'INFO')
 
+# number of files transferred concurrently
+max_concurrent_files = int(os.environ.get('max_concurrent_files', 8))
+
+# number of multipart parts transferred concurrently per large file
+max_concurrent_parts = int(os.environ.get('max_concurrent_parts', 4))
+
+# sync: compare content checksums (ETags) of equally sized files
+checksum = os.environ.get('checksum', 'False').lower() in ('true', '1', 'yes')
+
+# sync: manifest file recording the state of the last sync, speeds up the next run
+manifest = os.environ.get('manifest', '')
+
 # In[ ]:
 
 
@@ -99,6 +649,10 @@ def run(
     operation: str,
     recursive: bool = False,
     log_level: str = 'INFO',
+    max_concurrent_files: int = 8,
+    max_concurrent_parts: int = 4,
+    checksum: bool = False,
+    manifest: str = '',
 ) -> None:
     """
     Perform a COS/S3 file operation.
@@ -108,6 +662,10 @@ def run(
     local_path:     local file or directory used for get / put / sync operations
     recursive:      apply the operation recursively
     log_level:      logging verbosity: DEBUG | INFO | WARNING | ERROR  (default: INFO)
+    max_concurrent_files: number of files transferred concurrently (default: 8)
+    max_concurrent_parts: number of multipart parts transferred concurrently per large file (default: 4)
+    checksum:       sync only: also compare ETags of equally sized files (default: False)
+    manifest:       sync only: file recording the synced state, reused by the next run (default: none)
     """
     logging.basicConfig(level=getattr(logging, log_level.upper(), logging.INFO))
     (access_key_id, secret_access_key, endpoint, cos_path) = explode_connection_string(cos_connection)
@@ -117,6 +675,8 @@ def run(
         secret=secret_access_key,
         client_kwargs={'endpoint_url': endpoint}
     )
+    engine = TransferEngine.from_connection(access_key_id, secret_access_key, endpoint,
+                                            max_concurrent_files, max_concurrent_parts)
 
     if operation == 'mkdir':
         s3.mkdir(cos_path)
@@ -133,64 +693,63 @@ def run(
             files = [f for f in glob.glob(
                 os.path.join(local_path, '**'), recursive=True)
                 if os.path.isfile(f)]
-            with tqdm(files, unit='file', desc='Uploading') as pbar:
-                for f in pbar:
-                    rel = os.path.relpath(f, local_path)
-                    pbar.set_postfix_str(rel)
-                    _upload(s3, f, cos_path.rstrip('/') + '/' + rel)
+            engine.upload([(f, cos_path.rstrip('/') + '/' + os.path.relpath(f, local_path))
+                           for f in files])
         else:
-            _upload(s3, local_path, cos_path)
+            _upload(s3, local_path, cos_path, engine)
 
     elif operation == 'sync_to_cos':
-        files = glob.glob(local_path, recursive=recursive)
-        with tqdm(files, unit='file', desc='Syncing → COS') as pbar:
-            for file in pbar:
-                pbar.set_postfix_str(file)
-                logging.info(f'processing {file}')
-                if s3.exists(cos_path + file):
-                    logging.debug(f's3.info {s3.info(cos_path + file)}')
-                    if s3.info(cos_path + file)['size'] != os.path.getsize(file):
-                        logging.info(f'uploading {file}')
-                        _upload(s3, file, cos_path + file)
-                    else:
-                        logging.info(f'skipping {file}')
-                else:
-                    logging.info(f'uploading {file}')
-                    _upload(s3, file, cos_path + file)
+        local_files = _scan_local(local_path, recursive)
+        remote_root = cos_path + (_glob_root(local_path) if _GLOB_MAGIC.search(local_path) else local_path)
+        remote_files = _list_remote(s3, remote_root)
+        previous = _load_manifest(manifest)
+        to_upload = [(file, cos_path + file) for file, local in sorted(local_files.items())
+                     if not _in_sync(file, local, remote_files.get(cos_path + file),
+                                     previous.get(file), checksum, engine, cos_path + file)]
+        logging.info(f'uploading {len(to_upload)} of {len(local_files)} files')
+        engine.upload(to_upload)
+        if manifest:
+            if to_upload:
+                remote_files = _list_remote(s3, remote_root)
+            _save_manifest(manifest, {
+                file: {'remote': cos_path + file, **local,
+                       'etag': remote_files.get(cos_path + file, {}).get('etag')}
+                for file, local in local_files.items()})
 
     elif operation == 'sync_to_local':
-        remote_files = [p for p in s3.glob(cos_path)
-                        if s3.info(p)['type'] != 'directory']
-        with tqdm(remote_files, unit='file', desc='Syncing → local') as pbar:
-            for full_path in pbar:
-                local_full_path = local_path + full_path
-                pbar.set_postfix_str(os.path.basename(full_path))
-                logging.info(f'processing {full_path}')
-                if os.path.exists(local_full_path):
-                    if s3.info(full_path)['size'] != os.path.getsize(local_full_path):
-                        logging.info(f'downloading {full_path} to {local_full_path}')
-                        _download(s3, full_path, local_full_path)
-                    else:
-                        logging.info(f'skipping {full_path}')
-                else:
-                    logging.info(f'downloading {full_path} to {local_full_path}')
-                    _download(s3, full_path, local_full_path)
+        remote_files = _list_remote(s3, cos_path)
+        # the same path or glob applied below local_path finds the local counterparts,
+        # matched by normalized path so 'dir/' and 'dir' or doubled slashes agree
+        local_files = {os.path.normpath(f): local
+                       for f, local in _scan_local(local_path + cos_path, recursive=True).items()}
+        previous = _load_manifest(manifest)
+        to_download = [(full_path, local_path + full_path, remote['size'], remote['etag'])
+                       for full_path, remote in sorted(remote_files.items())
+                       if not _in_sync(local_path + full_path, local_files.get(os.path.normpath(local_path + full_path)),
+                                       remote, previous.get(local_path + full_path), checksum, engine, full_path)]
+        logging.info(f'downloading {len(to_download)} of {len(remote_files)} files')
+        engine.download(to_download)
+        if manifest:
+            files = {}
+            for full_path, remote in remote_files.items():
+                st = os.stat(local_path + full_path)
+                files[local_path + full_path] = {'remote': full_path, 'size': st.st_size,
+                                                 'mtime_ns': st.st_mtime_ns, 'etag': remote['etag']}
+            _save_manifest(manifest, files)
 
     elif operation == 'get':
         if recursive:
-            remote_files = [p for p in s3.find(cos_path)
-                            if s3.info(p)['type'] != 'directory']
-            with tqdm(remote_files, unit='file', desc='Downloading') as pbar:
-                for rp in pbar:
-                    rel = rp[len(cos_path):].lstrip('/')
-                    lp = os.path.join(local_path, rel)
-                    pbar.set_postfix_str(os.path.basename(rp))
-                    _download(s3, rp, lp)
+            # one listing with sizes instead of an info request per object
+            remote_files = {p: info for p, info in s3.find(cos_path, detail=True).items()
+                            if info['type'] != 'directory'}
+            engine.download([(rp, os.path.join(local_path, rp[len(cos_path):].lstrip('/')), info['size'],
+                              info.get('ETag'))
+                             for rp, info in remote_files.items()])
         else:
             dest = local_path
             if os.path.isdir(local_path):
                 dest = os.path.join(local_path, os.path.basename(cos_path))
-            _download(s3, cos_path, dest)
+            _download(s3, cos_path, dest, engine)
 
     elif operation == 'rm':
         s3.rm(cos_path, recursive=recursive)
@@ -205,5 +764,6 @@ def run(
 
 
 if __name__ == "__main__":
-    run(cos_connection, local_path, operation, recursive, log_level)
+    run(cos_connection, local_path, operation, recursive, log_level, max_concurrent_files, max_concurrent_parts,
+        checksum, manifest)
 
@@ -0,0 +1,205 @@
+import asyncio
+import json
+import posixpath
+from contextlib import AsyncExitStack
+from typing import Optional, Dict, List, Any, Tuple, AsyncIterator, Generator
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from claimed.mlx.s3_kv_store import (
+    NOT_FOUND_CODES,
+    SUPERSEDES_METADATA_KEY,
+    S3Request,
+    _build_filename,
+    _encode_component,
+    _entry_from_listing,
+    _is_not_found,
+    _update_requests,
+)
+
+DEFAULT_MAX_CONCURRENCY = 64
+
+
+class AsyncS3KVStore:
+    """asyncio counterpart of ``S3KVStore`` built on aiobotocore.
+
+    Objects are laid out exactly as in ``S3KVStore``, so both clients can share a
+    store. One client and its HTTP connection pool are shared by all operations,
+    and at most ``max_concurrency`` S3 requests are in flight at a time::
+
+        async with AsyncS3KVStore("bucket", "jobs", endpoint_url=...) as store:
+            await asyncio.gather(*(store.put(f"job-{i}", {"i": i}) for i in range(500)))
+    """
+
+    def __init__(self, bucket: str, store_name: str, s3_client: Optional[Any] = None, endpoint_url: Optional[str] = None, aws_access_key_id: Optional[str] = None, aws_secret_access_key: Optional[str] = None, max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        self.bucket = bucket
+        self.store_name = store_name.strip("/")
+        self.s3 = s3_client
+        self._client_kwargs = {
+            "endpoint_url": endpoint_url,
+            "aws_access_key_id": aws_access_key_id,
+            "aws_secret_access_key": aws_secret_access_key,
+            "config": Config(max_pool_connections=max_concurrency),
+        }
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._exit_stack: Optional[AsyncExitStack] = None
+
+    async def open(self) -> "AsyncS3KVStore":
+        if self.s3 is None:
+            try:
+                from aiobotocore.session import get_session
+            except ImportError:
+                raise ImportError(
+                    "aiobotocore is not installed but is required for AsyncS3KVStore.\n\n"
+                    "Install options:\n"
+                    "  pip install aiobotocore\n"
+                    "  pip install 'claimed[async]'\n"
+                ) from None
+            self._exit_stack = AsyncExitStack()
+            self.s3 = await self._exit_stack.enter_async_context(
+                get_session().create_client("s3", **self._client_kwargs)
+            )
+        return self
+
+    async def close(self) -> None:
+        if self._exit_stack is not None:
+            await self._exit_stack.aclose()
+            self._exit_stack = None
+            self.s3 = None
+
+    async def __aenter__(self) -> "AsyncS3KVStore":
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    def _prefix(self) -> str:
+        return f"{self.store_name}/" if self.store_name else ""
+
+    def _s3_key_for_filename(self, filename: str) -> str:
+        return posixpath.join(self._prefix(), filename)
+
+    async def _call(self, method: str, **kwargs) -> Dict[str, Any]:
+        async with self._semaphore:
+            return await getattr(self.s3, method)(**kwargs)
+
+    async def _run_requests(self, requests: Generator[S3Request, Any, Any]) -> Any:
+        """Async counterpart of ``s3_kv_store._run_requests``."""
+        try:
+            method, kwargs = next(requests)
+            while True:
+                try:
+                    resp = await self._call(method, **kwargs)
+                except ClientError as e:
+                    method, kwargs = requests.throw(e)
+                else:
+                    method, kwargs = requests.send(resp)
+        except StopIteration as stop:
+            return stop.value
+
+    async def _read_object(self, **kwargs) -> Tuple[bytes, Dict[str, Any]]:
+        # hold the slot until the body is consumed, the connection is busy until then
+        async with self._semaphore:
+            resp = await self.s3.get_object(**kwargs)
+            async with resp["Body"] as stream:
+                return await stream.read(), resp
+
+    async def iter_items(self, prefix: Optional[str] = None, index_filter: Optional[Dict[str, Any]] = None, page_size: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+        s3_prefix = self._prefix() + (_encode_component(prefix) if prefix else "")
+        continuation_token = None
+
+        while True:
+            kwargs = {"Bucket": self.bucket, "Prefix": s3_prefix, "MaxKeys": page_size}
+            if continuation_token:
+                kwargs["ContinuationToken"] = continuation_token
+            resp = await self._call("list_objects_v2", **kwargs)
+            for obj in resp.get("Contents", []):
+                entry = _entry_from_listing(obj, prefix=prefix, index_filter=index_filter)
+                if entry is not None:
+                    yield entry
+            if not resp.get("IsTruncated"):
+                break
+            continuation_token = resp.get("NextContinuationToken")
+
+    async def list(self, prefix: Optional[str] = None, max_keys: int = 1000) -> List[Dict[str, Any]]:
+        return [item async for item in self.iter_items(prefix=prefix, page_size=max_keys)]
+
+    async def search(self, index_filter: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [item async for item in self.iter_items(index_filter=index_filter)]
+
+    async def _find_objects_for_key(self, key: str, index_filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return [item async for item in self.iter_items(prefix=key, index_filter=index_filter)]
+
+    async def _drop_superseded(self, matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        async def superseded_by(m):
+            try:
+                head = await self._call("head_object", Bucket=self.bucket, Key=m["s3_key"])
+            except ClientError as e:
+                if not _is_not_found(e):
+                    raise
+                return m["s3_key"]
+            return head.get("Metadata", {}).get(SUPERSEDES_METADATA_KEY)
+
+        superseded = set(await asyncio.gather(*(superseded_by(m) for m in matches)))
+        return [m for m in matches if m["s3_key"] not in superseded]
+
+    async def get(self, key: str, index_filter: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        value, _ = await self.get_with_etag(key, index_filter=index_filter)
+        return value
+
+    async def get_with_etag(self, key: str, index_filter: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], str]:
+        matches = await self._find_objects_for_key(key, index_filter=index_filter)
+        if not matches:
+            raise KeyError(f"key not found: {key} (filter={index_filter})")
+        if len(matches) > 1:
+            matches = await self._drop_superseded(matches)
+        if len(matches) > 1:
+            raise ValueError(f"multiple objects match key={key}; refine using index_filter: {matches}")
+        try:
+            body, resp = await self._read_object(Bucket=self.bucket, Key=matches[0]["s3_key"])
+            return json.loads(body.decode("utf-8")), resp.get("ETag")
+        except ClientError as e:
+            if e.response["Error"]["Code"] in NOT_FOUND_CODES:
+                raise KeyError(f"key not found: {key} (filter={index_filter})")
+            raise IOError(f"s3 get_object failed: {e}")
+
+    async def put(self, key: str, value: Dict[str, Any], indexes: Optional[Dict[str, Any]] = None, overwrite: bool = False) -> str:
+        if overwrite:
+            existing = await self._find_objects_for_key(key)
+            await asyncio.gather(*(self._call("delete_object", Bucket=self.bucket, Key=obj["s3_key"]) for obj in existing))
+
+        filename = _build_filename(key, {k: str(v) for k, v in (indexes or {}).items()})
+        s3_key = self._s3_key_for_filename(filename)
+        if not overwrite:
+            try:
+                await self._call("head_object", Bucket=self.bucket, Key=s3_key)
+                raise FileExistsError(f"object already exists: {s3_key}")
+            except ClientError as e:
+                if e.response["Error"]["Code"] not in NOT_FOUND_CODES:
+                    raise
+
+        payload = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        await self._call("put_object", Bucket=self.bucket, Key=s3_key, Body=payload, ContentType="application/json")
+        return s3_key
+
+    async def update(self, key: str, value: Dict[str, Any], index_filter: Optional[Dict[str, Any]] = None, new_indexes: Optional[Dict[str, Any]] = None, if_match: Optional[str] = None) -> str:
+        """Same semantics as ``S3KVStore.update``, including ``if_match`` compare-and-swap."""
+        matches = await self._find_objects_for_key(key, index_filter=index_filter)
+        if len(matches) > 1:
+            matches = await self._drop_superseded(matches)
+        if not matches:
+            raise KeyError(f"no object matches key={key} index_filter={index_filter}")
+        if len(matches) > 1:
+            raise ValueError(f"multiple objects match key={key} index_filter={index_filter}: {matches}")
+
+        old = matches[0]
+        target_indexes = new_indexes if new_indexes is not None else old["indexes"]
+        new_filename = _build_filename(key, {k: str(v) for k, v in (target_indexes or {}).items()})
+        new_s3_key = self._s3_key_for_filename(new_filename)
+        payload = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        return await self._run_requests(_update_requests(self.bucket, old, new_s3_key, payload, if_match=if_match))
+
+    async def delete(self, key: str, index_filter: Optional[Dict[str, Any]] = None) -> int:
+        matches = await self._find_objects_for_key(key, index_filter=index_filter)
+        await asyncio.gather(*(self._call("delete_object", Bucket=self.bucket, Key=obj["s3_key"]) for obj in matches))
+        return len(matches)
@@ -1,37 +1,83 @@
 import json
 import boto3
-import jsonschema
-from jsonschema import validate
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for, Draft202012Validator
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
 import os
+import threading
+
+
+def compile_validator(schema):
+    """
+    Build a reusable validator for a JSON schema.
+    The meta-schema check runs once here instead of on every validation.
+    :param schema: JSON Schema as a dictionary.
+    :return: A jsonschema validator for the schema's draft (default: 2020-12) with format checking.
+    """
+    cls = validator_for(schema, default=Draft202012Validator)
+    cls.check_schema(schema)
+    return cls(schema, format_checker=cls.FORMAT_CHECKER)
+
 
 class COSKVStore:
     def __init__(self, bucket_name, schema, cos_client=None):
         """
         Initialize the COS Key-Value store.
         :param bucket_name: Name of the COS bucket.
-        :param schema: JSON Schema to validate values.
+        :param schema: JSON Schema to validate values, or a validator from load_schemas / compile_validator.
         :param cos_client: Optional COS client instance (for dependency injection).
         """
         self.bucket_name = bucket_name
-        self.schema = schema
+        if isinstance(schema, Mapping):
+            self.validator = compile_validator(schema)
+        else:
+            self.validator = schema
+        self.schema = self.validator.schema
         self.cos_client = cos_client or boto3.client('s3')
 
+    def _validate(self, value):
+        error = best_match(self.validator.iter_errors(value))
+        if error is not None:
+            raise ValueError(f"Validation error: {error.message}")
+
     def put(self, key, value):
         """
         Store a value in COS after validating against the JSON schema.
         :param key: The key under which the value is stored.
         :param value: The value to store (must be JSON-serializable).
         """
-        try:
-            validate(instance=value, schema=self.schema)
-        except jsonschema.exceptions.ValidationError as e:
-            raise ValueError(f"Validation error: {e.message}")
+        self._validate(value)
         self.cos_client.put_object(
             Bucket=self.bucket_name,
             Key=key,
             Body=json.dumps(value)
         )
 
+    def put_many(self, items, max_workers=16):
+        """
+        Validate a batch of values up front, then upload them concurrently.
+        Nothing is uploaded if any value fails validation.
+        :param items: A dictionary or iterable of (key, value) pairs.
+        :param max_workers: Number of concurrent uploads.
+        """
+        items = list(items.items() if isinstance(items, Mapping) else items)
+        errors = {}
+        for key, value in items:
+            try:
+                self._validate(value)
+            except ValueError as e:
+                errors[key] = str(e)
+        if errors:
+            raise ValueError(f"Validation failed for {len(errors)} of {len(items)} values: {errors}")
+
+        def upload(item):
+            key, value = item
+            self.cos_client.put_object(Bucket=self.bucket_name, Key=key, Body=json.dumps(value))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(upload, items))
+
     def get(self, key):
         """
         Retrieve a value from COS.
@@ -51,27 +97,117 @@ class COSKVStore:
         """
         self.cos_client.delete_object(Bucket=self.bucket_name, Key=key)
 
-    def list_keys(self):
+    def list_keys(self, prefix=''):
         """
         List all keys in the COS bucket.
+        :param prefix: Only list keys starting with this prefix.
         :return: A list of keys.
         """
-        response = self.cos_client.list_objects_v2(Bucket=self.bucket_name)
-        return [obj['Key'] for obj in response.get('Contents', [])]
+        return list(self.iter_keys(prefix=prefix))
+
+    def iter_keys(self, prefix='', start_after=None, page_size=1000):
+        """
+        Stream keys page by page, filtered server-side by prefix.
+        :param prefix: Only list keys starting with this prefix.
+        :param start_after: Only list keys after this key (e.g. to resume a walk).
+        :param page_size: Keys requested per list_objects_v2 call.
+        :return: A generator of keys in lexicographic order.
+        """
+        kwargs = {'Bucket': self.bucket_name, 'Prefix': prefix, 'MaxKeys': page_size}
+        if start_after:
+            kwargs['StartAfter'] = start_after
+        while True:
+            response = self.cos_client.list_objects_v2(**kwargs)
+            for obj in response.get('Contents', []):
+                yield obj['Key']
+            if not response.get('IsTruncated'):
+                break
+            kwargs.pop('StartAfter', None)
+            kwargs['ContinuationToken'] = response['NextContinuationToken']
+
+    def _split_prefix(self, prefix, delimiter):
+        """
+        One delimiter listing of a prefix.
+        :return: Keys directly under the prefix and the sub-prefixes below it.
+        """
+        keys, sub_prefixes = [], []
+        kwargs = {'Bucket': self.bucket_name, 'Prefix': prefix, 'Delimiter': delimiter}
+        while True:
+            response = self.cos_client.list_objects_v2(**kwargs)
+            keys.extend(obj['Key'] for obj in response.get('Contents', []))
+            sub_prefixes.extend(p['Prefix'] for p in response.get('CommonPrefixes', []))
+            if not response.get('IsTruncated'):
+                break
+            kwargs['ContinuationToken'] = response['NextContinuationToken']
+        return keys, sub_prefixes
+
+    def iter_keys_parallel(self, prefix='', delimiter='/', depth=1, max_workers=16):
+        """
+        List a large bucket by walking its sub-prefixes concurrently.
+        The keyspace below ``prefix`` is split at ``delimiter`` up to ``depth`` levels
+        and each partition is paginated by its own worker.
+        :param prefix: Only list keys starting with this prefix.
+        :param delimiter: Separator used to discover partitions.
+        :param depth: Number of delimiter levels to split before listing.
+        :param max_workers: Number of partitions listed at the same time.
+        :return: A generator of keys; order is per partition, not global.
+        """
+        partitions = [prefix]
+        for _ in range(depth):
+            next_partitions = []
+            for p in partitions:
+                keys, sub_prefixes = self._split_prefix(p, delimiter)
+                yield from keys
+                next_partitions.extend(sub_prefixes)
+            partitions = next_partitions
+        if not partitions:
+            return
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for keys in executor.map(lambda p: list(self.iter_keys(prefix=p)), partitions):
+                yield from keys
+
+
+class SchemaValidators(Mapping):
+    """
+    Read-only mapping of schema name to compiled validator.
+    Each schema file is read and compiled on first access and cached afterwards.
+    """
+
+    def __init__(self, schema_folder):
+        self.schema_folder = schema_folder
+        self._paths = {
+            filename[:-5]: os.path.join(schema_folder, filename)
+            for filename in sorted(os.listdir(schema_folder))
+            if filename.endswith(".json")
+        }
+        self._validators = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        validator = self._validators.get(name)
+        if validator is None:
+            with self._lock:
+                validator = self._validators.get(name)
+                if validator is None:
+                    with open(self._paths[name], 'r') as f:
+                        validator = compile_validator(json.load(f))
+                    self._validators[name] = validator
+        return validator
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def __len__(self):
+        return len(self._paths)
+
 
 def load_schemas(schema_folder):
     """
     Loads all JSON schemas from the given folder.
     :param schema_folder: Path to the folder containing JSON schema files.
-    :return: A dictionary of schema names and their corresponding JSON objects.
+    :return: A mapping of schema names to lazily compiled validators (use ``.schema`` for the JSON object).
     """
-    schemas = {}
-    for filename in os.listdir(schema_folder):
-        if filename.endswith(".json"):
-            filepath = os.path.join(schema_folder, filename)
-            with open(filepath, 'r') as f:
-                schemas[filename[:-5]] = json.load(f)
-    return schemas
+    return SchemaValidators(schema_folder)
 
 # Example Usage
 if __name__ == "__main__":
@@ -2,7 +2,8 @@ import json
 import posixpath
 import re
 import argparse
-from typing import Optional, Dict, List, Any, Tuple
+import sys
+from typing import Optional, Dict, List, Any, Tuple, Iterator, Generator, Callable
 from urllib.parse import quote, unquote
 import boto3
 from botocore.exceptions import ClientError
@@ -10,6 +11,90 @@ from botocore.exceptions import ClientError
 INDEX_SEPARATOR = "__i__"
 KV_SEPARATOR = "="
 FILENAME_SUFFIX = ".json"
+SUPERSEDES_METADATA_KEY = "supersedes"
+PRECONDITION_FAILED_CODES = ("412", "PreconditionFailed", "409", "ConditionalRequestConflict")
+NOT_FOUND_CODES = ("404", "NotFound", "NoSuchKey")
+
+
+class ConcurrentUpdateError(RuntimeError):
+    """Raised when a conditional write loses against a concurrent writer."""
+
+
+def _is_precondition_failed(e: ClientError) -> bool:
+    return e.response.get("Error", {}).get("Code") in PRECONDITION_FAILED_CODES
+
+
+def _is_not_found(e: ClientError) -> bool:
+    return e.response.get("Error", {}).get("Code") in NOT_FOUND_CODES
+
+
+S3Request = Tuple[str, Dict[str, Any]]
+
+
+def _update_requests(bucket: str, old: Dict[str, Any], new_s3_key: str, payload: bytes, if_match: Optional[str] = None) -> Generator[S3Request, Any, str]:
+    """The S3 requests of ``update`` as ``(method, kwargs)`` pairs.
+
+    Shared by the sync and async stores: the caller sends back each response and
+    throws a request's ``ClientError`` back in (see ``_run_requests``).
+
+    An index-changing update writes the new object with ``IfNoneMatch`` and then
+    deletes the old one with ``IfMatch`` on the ETag it was based on. Of two
+    concurrent updates of the same object only one delete can succeed; the loser
+    removes its own new object again and raises ``ConcurrentUpdateError``.
+    """
+    body = {"Bucket": bucket, "Key": new_s3_key, "Body": payload, "ContentType": "application/json"}
+    if old["s3_key"] == new_s3_key:
+        try:
+            yield "put_object", dict(body, IfMatch=if_match) if if_match is not None else body
+        except ClientError as e:
+            if _is_precondition_failed(e):
+                raise ConcurrentUpdateError(f"object changed concurrently: {new_s3_key}")
+            raise
+        return new_s3_key
+
+    expected_etag = if_match if if_match is not None else old.get("etag")
+    if if_match is not None and old.get("etag") and old["etag"].strip('"') != if_match.strip('"'):
+        raise ConcurrentUpdateError(f"object changed concurrently: {old['s3_key']}")
+
+    # write-new-then-delete: the new object names the one it replaces
+    try:
+        resp = yield "put_object", dict(body, Metadata={SUPERSEDES_METADATA_KEY: old["s3_key"]}, IfNoneMatch="*")
+    except ClientError as e:
+        if _is_precondition_failed(e):
+            raise ConcurrentUpdateError(f"target object already exists: {new_s3_key}")
+        raise
+
+    delete = {"Bucket": bucket, "Key": old["s3_key"]}
+    if expected_etag:
+        delete["IfMatch"] = expected_etag
+    try:
+        yield "delete_object", delete
+    except ClientError as e:
+        # lost the race on the old object: roll back our own new object, unless it was replaced meanwhile
+        try:
+            yield "delete_object", {"Bucket": bucket, "Key": new_s3_key, "IfMatch": resp["ETag"]}
+        except ClientError as rollback_error:
+            if not (_is_precondition_failed(rollback_error) or _is_not_found(rollback_error)):
+                raise
+        if _is_precondition_failed(e) or _is_not_found(e):
+            raise ConcurrentUpdateError(f"object changed concurrently: {old['s3_key']}")
+        raise
+    return new_s3_key
+
+
+def _run_requests(requests: Generator[S3Request, Any, Any], call: Callable[..., Any]) -> Any:
+    """Drive a request generator such as ``_update_requests`` with a blocking client."""
+    try:
+        method, kwargs = next(requests)
+        while True:
+            try:
+                resp = call(method, **kwargs)
+            except ClientError as e:
+                method, kwargs = requests.throw(e)
+            else:
+                method, kwargs = requests.send(resp)
+    except StopIteration as stop:
+        return stop.value
 
 
 def _encode_component(s: str) -> str:
@@ -48,6 +133,45 @@ def _parse_filename(filename: str) -> Tuple[str, Dict[str, str]]:
     return key, indexes
 
 
+def _match_indexes(item_indexes: Dict[str, str], filt: Dict[str, Any]) -> bool:
+    for fk, fv in filt.items():
+        if fk not in item_indexes:
+            return False
+        val = item_indexes[fk]
+        if isinstance(fv, (list, tuple, set)):
+            if val not in {str(x) for x in fv}:
+                return False
+        elif isinstance(fv, re.Pattern):
+            if not fv.search(val):
+                return False
+        else:
+            if val != str(fv):
+                return False
+    return True
+
+
+def _entry_from_listing(obj: Dict[str, Any], prefix: Optional[str] = None, index_filter: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    full_key = obj["Key"]
+    filename = posixpath.basename(full_key)
+    try:
+        logical_key, indexes = _parse_filename(filename)
+    except ValueError:
+        return None
+    if prefix and not logical_key.startswith(prefix):
+        return None
+    if index_filter and not _match_indexes(indexes, index_filter):
+        return None
+    return {
+        "s3_key": full_key,
+        "filename": filename,
+        "key": logical_key,
+        "indexes": indexes,
+        "size": obj.get("Size", 0),
+        "last_modified": obj.get("LastModified"),
+        "etag": obj.get("ETag"),
+    }
+
+
 class S3KVStore:
     def __init__(self, bucket: str, store_name: str, s3_client: Optional[Any] = None, endpoint_url: Optional[str] = None, aws_access_key_id: Optional[str] = None, aws_secret_access_key: Optional[str] = None):
         self.bucket = bucket
@@ -68,70 +192,76 @@ class S3KVStore:
     def _s3_key_for_filename(self, filename: str) -> str:
         return posixpath.join(self._prefix(), filename)
 
-    def list(self, prefix: Optional[str] = None, max_keys: int = 1000) -> List[Dict[str, Any]]:
-        s3_prefix = self._prefix()
+    def iter_items(self, prefix: Optional[str] = None, index_filter: Optional[Dict[str, Any]] = None, page_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Yield parsed entries page by page without materializing the whole listing.
+
+        The key prefix is pushed down to S3 (encoded key components preserve prefixes),
+        so only matching objects are listed.
+        """
+        s3_prefix = self._prefix() + (_encode_component(prefix) if prefix else "")
         continuation_token = None
-        results: List[Dict[str, Any]] = []
 
         while True:
-            kwargs = {"Bucket": self.bucket, "Prefix": s3_prefix, "MaxKeys": max_keys}
+            kwargs = {"Bucket": self.bucket, "Prefix": s3_prefix, "MaxKeys": page_size}
             if continuation_token:
                 kwargs["ContinuationToken"] = continuation_token
             resp = self.s3.list_objects_v2(**kwargs)
-            contents = resp.get("Contents", [])
-            for obj in contents:
-                full_key = obj["Key"]
-                filename = posixpath.basename(full_key)
-                try:
-                    logical_key, indexes = _parse_filename(filename)
-                except ValueError:
-                    continue
-                if prefix and not logical_key.startswith(prefix):
-                    continue
-                results.append({
-                    "s3_key": full_key,
-                    "filename": filename,
-                    "key": logical_key,
-                    "indexes": indexes,
-                    "size": obj.get("Size", 0),
-                    "last_modified": obj.get("LastModified"),
-                })
+            for obj in resp.get("Contents", []):
+                entry = _entry_from_listing(obj, prefix=prefix, index_filter=index_filter)
+                if entry is not None:
+                    yield entry
             if not resp.get("IsTruncated"):
                 break
             continuation_token = resp.get("NextContinuationToken")
 
-        return results
+    def list(self, prefix: Optional[str] = None, max_keys: int = 1000) -> List[Dict[str, Any]]:
+        return list(self.iter_items(prefix=prefix, page_size=max_keys))
 
     def _match_indexes(self, item_indexes: Dict[str, str], filt: Dict[str, Any]) -> bool:
-        for fk, fv in filt.items():
-            if fk not in item_indexes:
-                return False
-            val = item_indexes[fk]
-            if isinstance(fv, (list, tuple, set)):
-                if val not in {str(x) for x in fv}:
-                    return False
-            elif isinstance(fv, re.Pattern):
-                if not fv.search(val):
-                    return False
-            else:
-                if val != str(fv):
-                    return False
-        return True
+        return _match_indexes(item_indexes, filt)
 
     def get(self, key: str, index_filter: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        value, _ = self.get_with_etag(key, index_filter=index_filter)
+        return value
+
+    def get_with_etag(self, key: str, index_filter: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], str]:
+        """Return the value and its ETag, to be passed as ``if_match`` to ``update``."""
         matches = self._find_objects_for_key(key, index_filter=index_filter)
         if not matches:
             raise KeyError(f"key not found: {key} (filter={index_filter})")
+        if len(matches) > 1:
+            matches = self._drop_superseded(matches)
         if len(matches) > 1:
             raise ValueError(f"multiple objects match key={key}; refine using index_filter: {matches}")
         s3_key = matches[0]["s3_key"]
         try:
             resp = self.s3.get_object(Bucket=self.bucket, Key=s3_key)
             body = resp["Body"].read()
-            return json.loads(body.decode("utf-8"))
+            return json.loads(body.decode("utf-8")), resp.get("ETag")
         except ClientError as e:
+            if _is_not_found(e):
+                # the object was replaced by an index-changing update between list and get
+                raise KeyError(f"key not found: {key} (filter={index_filter})")
             raise IOError(f"s3 get_object failed: {e}")
 
+    def _drop_superseded(self, matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # An index-changing update writes the new object before deleting the old one.
+        # Readers that observe both hide the old object named by the new one's metadata.
+        superseded = set()
+        for m in matches:
+            try:
+                head = self.s3.head_object(Bucket=self.bucket, Key=m["s3_key"])
+            except ClientError as e:
+                # deleted since the listing, i.e. superseded; anything else is a real error
+                if not _is_not_found(e):
+                    raise
+                superseded.add(m["s3_key"])
+                continue
+            old_key = head.get("Metadata", {}).get(SUPERSEDES_METADATA_KEY)
+            if old_key:
+                superseded.add(old_key)
+        return [m for m in matches if m["s3_key"] not in superseded]
+
     def put(self, key: str, value: Dict[str, Any], indexes: Optional[Dict[str, Any]] = None, overwrite: bool = False) -> str:
         if overwrite:
             existing = self._find_objects_for_key(key)
@@ -152,8 +282,18 @@ class S3KVStore:
         self.s3.put_object(Bucket=self.bucket, Key=s3_key, Body=payload, ContentType="application/json")
         return s3_key
 
-    def update(self, key: str, value: Dict[str, Any], index_filter: Optional[Dict[str, Any]] = None, new_indexes: Optional[Dict[str, Any]] = None) -> str:
+    def update(self, key: str, value: Dict[str, Any], index_filter: Optional[Dict[str, Any]] = None, new_indexes: Optional[Dict[str, Any]] = None, if_match: Optional[str] = None) -> str:
+        """Replace the value of a single object.
+
+        With ``if_match`` the update only succeeds if the object still has that ETag
+        (compare-and-swap); otherwise ``ConcurrentUpdateError`` is raised and nothing
+        is changed. Updates that change the indexes write the new object first and
+        delete the old one afterwards with a conditional delete, so readers never see
+        the key disappear and concurrent index changes cannot both succeed.
+        """
         matches = self._find_objects_for_key(key, index_filter=index_filter)
+        if len(matches) > 1:
+            matches = self._drop_superseded(matches)
         if not matches:
             raise KeyError(f"no object matches key={key} index_filter={index_filter}")
         if len(matches) > 1:
@@ -164,10 +304,10 @@ class S3KVStore:
         new_filename = _build_filename(key, {k: str(v) for k, v in (target_indexes or {}).items()})
         new_s3_key = self._s3_key_for_filename(new_filename)
         payload = json.dumps(value, ensure_ascii=False).encode("utf-8")
-        self.s3.put_object(Bucket=self.bucket, Key=new_s3_key, Body=payload, ContentType="application/json")
-        if old["s3_key"] != new_s3_key:
-            self.s3.delete_object(Bucket=self.bucket, Key=old["s3_key"])
-        return new_s3_key
+        return _run_requests(
+            _update_requests(self.bucket, old, new_s3_key, payload, if_match=if_match),
+            lambda method, **kwargs: getattr(self.s3, method)(**kwargs),
+        )
 
     def delete(self, key: str, index_filter: Optional[Dict[str, Any]] = None) -> int:
         matches = self._find_objects_for_key(key, index_filter=index_filter)
@@ -178,17 +318,19 @@ class S3KVStore:
         return count
 
     def search(self, index_filter: Dict[str, Any]) -> List[Dict[str, Any]]:
-        all_items = self.list()
-        return [it for it in all_items if self._match_indexes(it["indexes"], index_filter)]
+        return list(self.iter_items(index_filter=index_filter))
 
     def _find_objects_for_key(self, key: str, index_filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        candidates = self.list(prefix=key)
-        if index_filter is None:
-            return candidates
-        return [c for c in candidates if self._match_indexes(c["indexes"], index_filter)]
+        return list(self.iter_items(prefix=key, index_filter=index_filter))
 
 
 # ---------------- CLI ----------------
+def _print_jsonl(items: Iterator[Dict[str, Any]]) -> None:
+    for item in items:
+        sys.stdout.write(json.dumps(item, default=str) + "\n")
+    sys.stdout.flush()
+
+
 def main():
     parser = argparse.ArgumentParser(description="S3 KV Store CLI")
     parser.add_argument("bucket")
@@ -209,12 +351,14 @@ def main():
     sp = sub.add_parser("get")
     sp.add_argument("key")
     sp.add_argument("--filter", type=json.loads, default="{}")
+    sp.add_argument("--etag", action="store_true", help="print the ETag to stderr")
 
     # update
     sp = sub.add_parser("update")
     sp.add_argument("key")
     sp.add_argument("--filter", type=json.loads, default="{}")
     sp.add_argument("--new-indexes", type=json.loads, default=None)
+    sp.add_argument("--if-match", help="only update if the object still has this ETag")
     sp.add_argument("--value")
     sp.add_argument("--value-file")
 
@@ -226,10 +370,12 @@ def main():
     # list
     sp = sub.add_parser("list")
     sp.add_argument("--prefix")
+    sp.add_argument("--jsonl", action="store_true", help="stream one JSON object per line")
 
     # search
     sp = sub.add_parser("search")
     sp.add_argument("--filter", type=json.loads, required=True)
+    sp.add_argument("--jsonl", action="store_true", help="stream one JSON object per line")
 
     args = parser.parse_args()
     store = S3KVStore(bucket=args.bucket, store_name=args.store, endpoint_url=args.endpoint)
@@ -243,7 +389,9 @@ def main():
         print(key)
 
     elif args.cmd == "get":
-        value = store.get(args.key, index_filter=args.filter)
+        value, etag = store.get_with_etag(args.key, index_filter=args.filter)
+        if args.etag:
+            print(etag, file=sys.stderr)
         print(json.dumps(value, indent=2))
 
     elif args.cmd == "update":
@@ -251,7 +399,7 @@ def main():
             value = json.load(open(args.value_file))
         else:
             value = json.loads(args.value)
-        key = store.update(args.key, value, index_filter=args.filter, new_indexes=args.new_indexes)
+        key = store.update(args.key, value, index_filter=args.filter, new_indexes=args.new_indexes, if_match=args.if_match)
         print(key)
 
     elif args.cmd == "delete":
@@ -259,12 +407,18 @@ def main():
         print(f"Deleted {count} object(s)")
 
     elif args.cmd == "list":
-        items = store.list(prefix=args.prefix)
-        print(json.dumps(items, indent=2, default=str))
+        if args.jsonl:
+            _print_jsonl(store.iter_items(prefix=args.prefix))
+        else:
+            items = store.list(prefix=args.prefix)
+            print(json.dumps(items, indent=2, default=str))
 
     elif args.cmd == "search":
-        items = store.search(args.filter)
-        print(json.dumps(items, indent=2, default=str))
+        if args.jsonl:
+            _print_jsonl(store.iter_items(index_filter=args.filter))
+        else:
+            items = store.search(args.filter)
+            print(json.dumps(items, indent=2, default=str))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,331 @@
+"""Local DAG runner for CLAIMED components: ``claimed pipeline run <dag.yaml>``.
+
+A DAG file lists the steps with their component, parameters and dependencies::
+
+    budget: {cpus: 8, gpus: 1, memory: 16G}
+    steps:
+      download:
+        module: claimed.components.util.cosutils      # runs `claimed run <module>`
+        params: {operation: get, cos_connection: ..., local_path: data/}
+        outputs: [data/]
+      train:
+        component: docker.io/claimed/train:0.1        # runs `claimed --component <image>`
+        params: {data_path: data/}
+        inputs: [config.json]
+        outputs: [model/]
+        resources: {cpus: 4, gpus: 1, memory: 8G}
+        depends_on: [download]
+
+Independent steps run concurrently as long as their resources fit into the budget. Steps with
+outputs are cached: the cache key covers the component, parameters, content of the inputs and the
+keys of all upstream steps, and a step is skipped if its key is unchanged and its outputs still exist
+unmodified.
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+DEFAULT_CACHE_DIR = os.path.join('.claimed', 'cache')
+DEFAULT_LOG_DIR = os.path.join('.claimed', 'logs')
+MEMORY_UNITS = {'': 1, 'K': 1e3, 'M': 1e6, 'G': 1e9, 'T': 1e12, 'KI': 2 ** 10, 'MI': 2 ** 20, 'GI': 2 ** 30,
+                'TI': 2 ** 40}
+
+
+def parse_memory(value) -> int:
+    """Parses memory sizes like 512M, 16G or 2Gi into bytes."""
+    if value is None:
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value)
+    value = str(value).strip().upper().rstrip('B')
+    number = value.rstrip('KMGTI')
+    unit = value[len(number):]
+    if unit not in MEMORY_UNITS:
+        raise ValueError(f"invalid memory size '{value}'")
+    return int(float(number) * MEMORY_UNITS[unit])
+
+
+def _host_gpus():
+    if os.environ.get('CUDA_VISIBLE_DEVICES') is not None:
+        return [g for g in os.environ['CUDA_VISIBLE_DEVICES'].split(',') if g.strip()]
+    try:
+        output = subprocess.run(['nvidia-smi', '-L'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                text=True).stdout
+    except OSError:
+        return []
+    return [str(i) for i, line in enumerate(output.splitlines()) if line.startswith('GPU')]
+
+
+def _host_memory():
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        return 0
+
+
+class ResourcePool:
+    """CPU, GPU and memory budget shared by the running steps."""
+
+    def __init__(self, cpus: float, gpus: list, memory: int):
+        self.cpus = cpus
+        self.free_gpus = list(gpus)
+        self.memory = memory
+        self.total = (cpus, len(gpus), memory)
+        self._available = threading.Condition()
+
+    def _clamp(self, cpus, gpus, memory):
+        # a step larger than the budget runs alone instead of waiting forever
+        return min(cpus, self.total[0]), min(gpus, self.total[1]), min(memory, self.total[2]) if self.total[2] else 0
+
+    def acquire(self, cpus: float, gpus: int, memory: int):
+        """Blocks until the resources are available, returns the allocated GPU ids."""
+        cpus, gpus, memory = self._clamp(cpus, gpus, memory)
+        with self._available:
+            self._available.wait_for(lambda: self.cpus >= cpus and len(self.free_gpus) >= gpus
+                                     and (not self.total[2] or self.memory >= memory))
+            self.cpus -= cpus
+            self.memory -= memory
+            allocated, self.free_gpus = self.free_gpus[:gpus], self.free_gpus[gpus:]
+            return allocated
+
+    def release(self, cpus: float, gpu_ids: list, memory: int):
+        cpus, _, memory = self._clamp(cpus, 0, memory)
+        with self._available:
+            self.cpus += cpus
+            self.memory += memory
+            self.free_gpus.extend(gpu_ids)
+            self._available.notify_all()
+
+
+def load_dag(path):
+    import yaml
+
+    with open(path) as f:
+        dag = yaml.safe_load(f) or {}
+    steps = dag.get('steps') or {}
+    if isinstance(steps, list):
+        # list form: [{name: ..., module: ...}, ...]
+        steps = {step['name']: step for step in steps}
+    for name, step in steps.items():
+        if ('module' in step) == ('component' in step):
+            raise ValueError(f"step '{name}' requires either 'module' or 'component'")
+        step['depends_on'] = list(step.get('depends_on') or [])
+        for dependency in step['depends_on']:
+            if dependency not in steps:
+                raise ValueError(f"step '{name}' depends on unknown step '{dependency}'")
+    topological_order(steps)
+    dag['steps'] = steps
+    return dag
+
+
+def topological_order(steps):
+    order, state = [], {}
+
+    def visit(name, path):
+        if state.get(name) == 'done':
+            return
+        if state.get(name) == 'visiting':
+            raise ValueError(f"cycle in pipeline: {' -> '.join(path + [name])}")
+        state[name] = 'visiting'
+        for dependency in steps[name]['depends_on']:
+            visit(dependency, path + [name])
+        state[name] = 'done'
+        order.append(name)
+
+    for name in steps:
+        visit(name, [])
+    return order
+
+
+def _walk(path):
+    if os.path.isdir(path):
+        return sorted(os.path.join(root, f) for root, _, files in os.walk(path) for f in files)
+    return [path] if os.path.exists(path) else []
+
+
+def _hash_inputs(paths):
+    sha = hashlib.sha256()
+    for path in paths:
+        sha.update(path.encode('utf-8') + b'\0')
+        files = _walk(path)
+        if not files:
+            sha.update(b'missing\0')
+        for file in files:
+            sha.update(file.encode('utf-8') + b'\0')
+            with open(file, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _fingerprint(paths):
+    # cheap output validation: size and modification time of every output file
+    return {file: [st.st_size, st.st_mtime_ns] for path in paths for file in _walk(path)
+            for st in [os.stat(file)]}
+
+
+def cache_key(step, upstream_keys):
+    definition = {k: step.get(k) for k in ('module', 'component', 'params')}
+    sha = hashlib.sha256(json.dumps(definition, sort_keys=True, default=str).encode('utf-8'))
+    sha.update(_hash_inputs(step.get('inputs') or []).encode('utf-8'))
+    for key in upstream_keys:
+        sha.update(key.encode('utf-8'))
+    return sha.hexdigest()
+
+
+def _cache_valid(record_path, key, outputs):
+    try:
+        with open(record_path) as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return (record.get('key') == key and all(os.path.exists(p) for p in outputs)
+            and record.get('outputs') == json.loads(json.dumps(_fingerprint(outputs))))
+
+
+def step_command(step, via_server=False):
+    """Command line of a step, using the `claimed run` or `claimed --component` execution path."""
+    args = []
+    for key, value in (step.get('params') or {}).items():
+        if isinstance(value, bool):
+            value = str(value).lower()
+        elif isinstance(value, (dict, list)):
+            value = json.dumps(value)
+        args += [f'--{key}', str(value)]
+    if 'module' in step:
+        return [sys.executable, '-m', 'claimed.claimed', 'run', *(['--via-server'] if via_server else []),
+                step['module'], *args]
+    return [sys.executable, '-m', 'claimed.claimed', '--component', step['component'], *args]
+
+
+def run_pipeline(dag_path, max_cpus=None, max_gpus=None, max_memory=None, cache_dir=DEFAULT_CACHE_DIR,
+                 log_dir=DEFAULT_LOG_DIR, use_cache=True, via_server=False, dry_run=False):
+    """
+    Runs the steps of the DAG concurrently within the resource budget. Returns a dict with status,
+    duration and cache key per step.
+    """
+    dag = load_dag(dag_path)
+    steps = dag['steps']
+    budget = dag.get('budget') or {}
+    gpus = _host_gpus()
+    max_gpus = budget.get('gpus', len(gpus)) if max_gpus is None else max_gpus
+    pool = ResourcePool(
+        cpus=float(max_cpus or budget.get('cpus') or os.cpu_count()),
+        gpus=(gpus + [str(i) for i in range(len(gpus), max_gpus)])[:max_gpus],
+        memory=parse_memory(max_memory or budget.get('memory')) or _host_memory(),
+    )
+    os.makedirs(cache_dir, exist_ok=True)
+    os.makedirs(log_dir, exist_ok=True)
+
+    results = {name: {'status': 'pending', 'seconds': None, 'key': None} for name in steps}
+    done = {name: threading.Event() for name in steps}
+    print_lock = threading.Lock()
+
+    def report(name, message):
+        with print_lock:
+            print(f'[{name}] {message}', flush=True)
+
+    def run_step(name):
+        step = steps[name]
+        result = results[name]
+        try:
+            for dependency in step['depends_on']:
+                done[dependency].wait()
+            failed = [d for d in step['depends_on'] if results[d]['status'] not in ('success', 'cached')]
+            if failed:
+                result['status'] = 'skipped'
+                report(name, f"skipped, failed dependencies: {', '.join(failed)}")
+                return
+
+            key = result['key'] = cache_key(step, [results[d]['key'] for d in step['depends_on']])
+            outputs = step.get('outputs') or []
+            record_path = os.path.join(cache_dir, f'{name}.json')
+            cacheable = use_cache and outputs and step.get('cache', True)
+            if cacheable and _cache_valid(record_path, key, outputs):
+                result['status'] = 'cached'
+                report(name, 'cached outputs are valid, skipped')
+                return
+
+            command = step_command(step, via_server)
+            if dry_run:
+                result['status'] = 'success'
+                report(name, 'would run: ' + ' '.join(command))
+                return
+
+            resources = step.get('resources') or {}
+            cpus, gpus = float(resources.get('cpus', 1)), int(resources.get('gpus', 0))
+            memory = parse_memory(resources.get('memory'))
+            gpu_ids = pool.acquire(cpus, gpus, memory)
+            try:
+                env = dict(os.environ, **{k: str(v) for k, v in (step.get('env') or {}).items()})
+                if gpus:
+                    env['CUDA_VISIBLE_DEVICES'] = ','.join(gpu_ids)
+                    # claimed --component passes the allocated GPUs to docker run
+                    env['CLAIMED_GPUS'] = ','.join(gpu_ids)
+                log_path = os.path.join(log_dir, f'{name}.log')
+                report(name, f'running, log: {log_path}')
+                start = time.time()
+                with open(log_path, 'w') as log:
+                    returncode = subprocess.run(command, stdout=log, stderr=subprocess.STDOUT, env=env).returncode
+                result['seconds'] = round(time.time() - start, 1)
+            finally:
+                pool.release(cpus, gpu_ids, memory)
+
+            if returncode != 0:
+                result['status'] = 'failed'
+                report(name, f'failed with exit code {returncode} after {result["seconds"]}s, see {log_path}')
+                return
+            missing = [p for p in outputs if not os.path.exists(p)]
+            if missing:
+                result['status'] = 'failed'
+                report(name, f"missing outputs: {', '.join(missing)}")
+                return
+            result['status'] = 'success'
+            if cacheable:
+                with open(record_path, 'w') as f:
+                    json.dump({'key': key, 'outputs': _fingerprint(outputs)}, f)
+            report(name, f'finished in {result["seconds"]}s')
+        except Exception as e:
+            result['status'] = 'failed'
+            report(name, f'failed: {e}')
+        finally:
+            done[name].set()
+
+    threads = [threading.Thread(target=run_step, args=(name,), name=f'step-{name}', daemon=True)
+               for name in topological_order(steps)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def main(args):
+    parser = argparse.ArgumentParser(prog='claimed pipeline', description='Run a DAG of CLAIMED components locally.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run', help='Run all steps of a DAG file')
+    run_parser.add_argument('DAG', help='YAML file with the pipeline steps')
+    run_parser.add_argument('--max-cpus', type=float, default=None, help='CPU budget (default: budget in DAG or all CPUs)')
+    run_parser.add_argument('--max-gpus', type=int, default=None, help='GPU budget (default: budget in DAG or all GPUs)')
+    run_parser.add_argument('--max-memory', default=None, help='Memory budget, e.g. 16G (default: budget in DAG or RAM)')
+    run_parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help=f'Step cache records (default: {DEFAULT_CACHE_DIR})')
+    run_parser.add_argument('--log-dir', default=DEFAULT_LOG_DIR, help=f'Step logs (default: {DEFAULT_LOG_DIR})')
+    run_parser.add_argument('--no-cache', action='store_true', help='Run all steps, ignoring cached outputs')
+    run_parser.add_argument('--via-server', action='store_true', help='Run module steps with `claimed run --via-server`')
+    run_parser.add_argument('--dry-run', action='store_true', help='Print the commands without running them')
+    args = parser.parse_args(args)
+
+    start = time.time()
+    results = run_pipeline(args.DAG, max_cpus=args.max_cpus, max_gpus=args.max_gpus, max_memory=args.max_memory,
+                           cache_dir=args.cache_dir, log_dir=args.log_dir, use_cache=not args.no_cache,
+                           via_server=args.via_server, dry_run=args.dry_run)
+    print(f'\nPipeline finished in {time.time() - start:.1f}s')
+    for name, result in results.items():
+        print(f"  {name:30s} {result['status']:8s} {'' if result['seconds'] is None else str(result['seconds']) + 's'}")
+    if any(r['status'] in ('failed', 'skipped') for r in results.values()):
+        sys.exit(1)
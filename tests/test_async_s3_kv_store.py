@@ -0,0 +1,39 @@
+import asyncio
+
+import boto3
+import pytest
+from moto.server import ThreadedMotoServer
+
+from claimed.mlx.async_s3_kv_store import AsyncS3KVStore
+from claimed.mlx.s3_kv_store import ConcurrentUpdateError
+
+BUCKET = 'async-kv-test'
+
+
+@pytest.fixture(scope='module')
+def endpoint():
+    server = ThreadedMotoServer(port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+    endpoint = f'http://{host}:{port}'
+    boto3.client('s3', endpoint_url=endpoint, aws_access_key_id='test', aws_secret_access_key='test',
+                 region_name='us-east-1').create_bucket(Bucket=BUCKET)
+    yield endpoint
+    server.stop()
+
+
+def test_concurrent_index_changes(endpoint):
+    async def run():
+        async with AsyncS3KVStore(BUCKET, 'race', endpoint_url=endpoint, aws_access_key_id='test',
+                                  aws_secret_access_key='test') as store:
+            await store.put('job', {'v': 0}, indexes={'state': 'new'})
+            results = await asyncio.gather(
+                *(store.update('job', {'v': state}, new_indexes={'state': state}) for state in ('a', 'b')),
+                return_exceptions=True,
+            )
+            return results, await store.list(), await store.get('job')
+
+    results, listing, value = asyncio.run(run())
+    assert sum(isinstance(r, ConcurrentUpdateError) for r in results) == 1
+    assert len(listing) == 1
+    assert value == {'v': listing[0]['indexes']['state']}
@@ -0,0 +1,32 @@
+from string import Template
+
+import pytest
+
+from c3 import templates
+
+# module attributes of c3.templates before the templates were loaded lazily
+LEGACY_TEXTS = ['python_component_setup_code', 'r_component_setup_code', 'component_setup_code_wo_logging']
+LEGACY_TEMPLATES = ['python_dockerfile_template', 'python_optimized_dockerfile_template', 'r_dockerfile_template',
+                    'kfp_component_template', 'kubernetes_job_template', 'cwl_component_template',
+                    'grid_wrapper_template', 'cos_grid_wrapper_template', 'legacy_cos_grid_wrapper_template',
+                    's3kv_grid_wrapper_template', 'simple_grid_wrapper_template', 'folder_grid_wrapper_template']
+
+
+@pytest.mark.parametrize('name', LEGACY_TEXTS)
+def test_legacy_text_names(name):
+    assert type(getattr(templates, name)) is str
+    assert getattr(templates, name) is getattr(templates, name)
+    assert name in dir(templates)
+
+
+@pytest.mark.parametrize('name', LEGACY_TEMPLATES)
+def test_legacy_template_names(name):
+    assert type(getattr(templates, name)) is Template
+    assert getattr(templates, name) is getattr(templates, name)
+    assert name in dir(templates)
+    assert getattr(templates, name).template
+
+
+def test_unknown_name():
+    with pytest.raises(AttributeError):
+        templates.unknown_template
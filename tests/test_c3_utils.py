@@ -0,0 +1,55 @@
+import pytest
+
+from c3 import utils
+from c3.utils import get_build_hash, get_image_version, lookup_build_cache, update_build_cache
+
+
+def test_build_hash_and_cache(tmp_path):
+    dockerfile = tmp_path / 'Dockerfile'
+    dockerfile.write_text('FROM python:3.12\n')
+    code = tmp_path / 'component.py'
+    code.write_text('print(1)\n')
+    (tmp_path / 'data').mkdir()
+    (tmp_path / 'data' / 'file.txt').write_text('a')
+    files = [str(code), str(tmp_path / 'data')]
+
+    build_hash = get_build_hash(str(dockerfile), files, 'linux/amd64')
+    assert build_hash == get_build_hash(str(dockerfile), list(reversed(files)), 'linux/amd64')
+    assert build_hash != get_build_hash(str(dockerfile), files, 'linux/arm64')
+    (tmp_path / 'data' / 'file.txt').write_text('b')
+    assert build_hash != get_build_hash(str(dockerfile), files, 'linux/amd64')
+
+    cache_path = str(tmp_path / 'cache' / 'build_cache.json')
+    assert lookup_build_cache('repo/claimed-component', build_hash, cache_path) is None
+    update_build_cache('repo/claimed-component', build_hash, '0.3', cache_path)
+    assert lookup_build_cache('repo/claimed-component', build_hash, cache_path) == '0.3'
+    assert lookup_build_cache('repo/claimed-other', build_hash, cache_path) is None
+
+
+@pytest.mark.parametrize('image_tags, version', [
+    ([], '0.1'),
+    (['v0.1', 'v0.2', 'v0.3'], 'v0.4'),
+    (['v0.10', 'v0.9'], 'v0.11'),
+    (['0.1', '0.10', '0.2', '0.9'], '0.11'),
+    (['v1.0', '0.3', 'dev'], '0.4'),
+    (['dev'], 'dev.1'),
+])
+def test_get_image_version(tmp_path, monkeypatch, image_tags, version):
+    monkeypatch.setattr(utils, 'pull_registry_image_tags', lambda image: list(image_tags))
+    assert get_image_version('registry.example.com/repo', 'component', str(tmp_path / 'tags.json')) == version
+
+
+def test_registry_tags_cache(tmp_path, monkeypatch):
+    pulled = []
+    monkeypatch.setattr(utils, 'pull_registry_image_tags', lambda image: pulled.append(image) or ['0.1'])
+    cache_path = str(tmp_path / 'tags.json')
+
+    assert utils.get_registry_image_tags('docker.io/user/claimed-a', cache_path) == ['0.1']
+    # the same repository without the registry host uses the cached tags
+    assert utils.get_registry_image_tags('user/claimed-a', cache_path) == ['0.1']
+    utils.add_registry_image_tag('user/claimed-a', '0.2', cache_path)
+    assert utils.get_registry_image_tags('docker.io/user/claimed-a', cache_path) == ['0.1', '0.2']
+    assert utils.get_registry_image_tags('quay.io/user/claimed-a', cache_path) == ['0.1']
+    assert pulled == ['docker.io/user/claimed-a', 'quay.io/user/claimed-a']
+    assert utils.get_registry_image_tags('user/claimed-a', cache_path, ttl=0) == ['0.1']
+    assert len(pulled) == 3
@@ -0,0 +1,75 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+MODULE = '''
+import os
+
+LOADED_BY = os.getpid()
+
+
+def run(name: str, count: int = 1):
+    print(f'hello {name}')
+    return {'name': name, 'count': count, 'cwd': os.getcwd(), 'loaded_in_child': LOADED_BY == os.getpid()}
+'''
+
+
+@pytest.fixture
+def env(tmp_path):
+    (tmp_path / 'serve_test_module.py').write_text(MODULE)
+    src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+    return dict(os.environ, PYTHONPATH=os.pathsep.join([str(tmp_path), src, os.path.join(src, 'claimed')]))
+
+
+def test_serve_stdin(tmp_path, env):
+    requests = [
+        {'id': 1, 'module': 'serve_test_module', 'args': ['--name', 'a', '--count', '2'], 'cwd': str(tmp_path)},
+        {'id': 2, 'module': 'serve_test_module', 'kwargs': {'name': 'b'}},
+        {'id': 3, 'module': 'serve_test_module', 'kwargs': {'name': 'c'}},
+        {'id': 4},
+    ]
+    process = subprocess.run([sys.executable, '-m', 'claimed.claimed', 'serve', '--stdin', '--max-workers', '1',
+                              '--learn', 'serve_test_module'],
+                             input=''.join(json.dumps(r) + '\n' for r in requests), env=env,
+                             capture_output=True, text=True, timeout=60, check=True)
+    responses = {r['id']: r for r in map(json.loads, process.stdout.splitlines())}
+    assert responses[1]['exit_code'] == 0 and responses[1]['error'] is None
+    assert responses[1]['result']['count'] == 2 and responses[1]['result']['cwd'] == str(tmp_path)
+    # the module is learned after the first request, later requests use the module of the worker
+    assert responses[1]['result']['loaded_in_child']
+    assert not responses[3]['result']['loaded_in_child']
+    assert responses[None]['exit_code'] == 2
+    assert 'hello a' in process.stderr
+
+
+def test_serve_socket_slow_client(tmp_path, env):
+    sock = str(tmp_path / 'claimed.sock')
+    server = subprocess.Popen([sys.executable, '-m', 'claimed.claimed', 'serve', '--socket', sock], env=env,
+                              stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            if os.path.exists(sock):
+                break
+            time.sleep(0.1)
+        # a client that connects without sending a request does not block other clients
+        slow = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        slow.connect(sock)
+        start = time.time()
+        process = subprocess.run([sys.executable, '-m', 'claimed.claimed', 'run', '--via-server',
+                                  'serve_test_module', '--name', 'x y "z"'],
+                                 env=dict(env, CLAIMED_SERVER_SOCKET=sock), cwd=tmp_path,
+                                 capture_output=True, text=True, timeout=30)
+        assert process.returncode == 0
+        assert process.stdout == 'hello x y "z"\n'
+        assert time.time() - start < 10
+        slow.sendall(b'not json\n')
+        assert json.loads(slow.makefile('rb').readline())['exit_code'] == 2
+        slow.close()
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
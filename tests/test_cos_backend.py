@@ -0,0 +1,50 @@
+import json
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from claimed.mlx.cos_backend import COSKVStore, load_schemas
+
+BUCKET = 'cos-kv-test'
+SCHEMA = {
+    'type': 'object',
+    'properties': {'id': {'type': 'string'}, 'accuracy': {'type': 'number'}},
+    'required': ['id'],
+}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'test')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'test')
+    with mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def test_put_many_validates_before_upload(client, tmp_path):
+    (tmp_path / 'model.json').write_text(json.dumps(SCHEMA))
+    schemas = load_schemas(str(tmp_path))
+    assert list(schemas) == ['model']
+    store = COSKVStore(BUCKET, schemas['model'], cos_client=client)
+    assert schemas['model'] is store.validator
+
+    with pytest.raises(ValueError):
+        store.put_many({'a': {'id': 'a'}, 'b': {'accuracy': 1.0}})
+    assert store.list_keys() == []
+
+    store.put_many({f'm{i}': {'id': str(i)} for i in range(5)}, max_workers=2)
+    assert store.get('m3') == {'id': '3'}
+
+
+def test_key_listing_pages_and_partitions(client):
+    store = COSKVStore(BUCKET, SCHEMA, cos_client=client)
+    keys = [f'{part}/{i:03d}' for part in ('a', 'b', 'c') for i in range(7)] + ['top']
+    for key in keys:
+        client.put_object(Bucket=BUCKET, Key=key, Body=b'{}')
+
+    assert list(store.iter_keys(page_size=4)) == sorted(keys)
+    assert list(store.iter_keys(prefix='b/', start_after='b/003', page_size=2)) == [f'b/{i:03d}' for i in range(4, 7)]
+    assert sorted(store.iter_keys_parallel(max_workers=3)) == sorted(keys)
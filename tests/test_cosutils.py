@@ -0,0 +1,175 @@
+import os
+
+import boto3
+import pytest
+from moto.server import ThreadedMotoServer
+
+from claimed.components.util import cosutils
+
+MiB = 1024 * 1024
+
+
+@pytest.fixture(scope='module')
+def endpoint():
+    server = ThreadedMotoServer(port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f'http://{host}:{port}'
+    server.stop()
+
+
+@pytest.fixture
+def bucket(endpoint, request):
+    name = request.node.name.replace('_', '-')[:40].lower()
+    _client(endpoint).create_bucket(Bucket=name)
+    return name
+
+
+def _client(endpoint):
+    return boto3.client('s3', endpoint_url=endpoint, aws_access_key_id='test', aws_secret_access_key='test',
+                        region_name='us-east-1')
+
+
+def _engine(endpoint, tmp_path, **kwargs):
+    return cosutils.TransferEngine(_client(endpoint), state_dir=str(tmp_path / 'state'), **kwargs)
+
+
+@pytest.fixture
+def transfers(endpoint, monkeypatch):
+    """Run cosutils.run against the moto server and record the files each transfer moves."""
+    counts = {'upload': [], 'download': []}
+    upload, download = cosutils.TransferEngine.upload, cosutils.TransferEngine.download
+
+    def counting_upload(self, pairs):
+        pairs = list(pairs)
+        counts['upload'].append(len(pairs))
+        return upload(self, pairs)
+
+    def counting_download(self, pairs):
+        pairs = list(pairs)
+        counts['download'].append(len(pairs))
+        return download(self, pairs)
+
+    monkeypatch.setattr(cosutils.TransferEngine, 'upload', counting_upload)
+    monkeypatch.setattr(cosutils.TransferEngine, 'download', counting_download)
+    # explode_connection_string always returns an https endpoint
+    monkeypatch.setattr(cosutils, 'explode_connection_string',
+                        lambda cs: ('test', 'test', endpoint, cs.split('@', 1)[1].split('/', 1)[1]))
+    return counts
+
+
+def test_engine_roundtrip_with_multipart(endpoint, bucket, tmp_path, monkeypatch):
+    monkeypatch.setattr(cosutils, 'MIN_CHUNK_SIZE', 5 * MiB)
+    files = {'small': os.urandom(1000), 'empty': b'', 'large': os.urandom(11 * MiB)}
+    for name, data in files.items():
+        (tmp_path / name).write_bytes(data)
+    engine = _engine(endpoint, tmp_path, max_concurrent_files=3, max_concurrent_parts=2)
+    engine.upload([(str(tmp_path / name), f'{bucket}/data/{name}') for name in files])
+    engine.download([(f'{bucket}/data/{name}', str(tmp_path / 'out' / name)) for name in files])
+    for name, data in files.items():
+        assert (tmp_path / 'out' / name).read_bytes() == data
+    assert not os.listdir(tmp_path / 'state')
+
+
+@pytest.mark.parametrize('cos_path', ['', 's'])
+def test_sync_to_local_twice_transfers_nothing(endpoint, bucket, tmp_path, transfers, cos_path):
+    for key in ('s/a', 's/b/c', 'sXYZ', 'other'):
+        _client(endpoint).put_object(Bucket=bucket, Key=key, Body=key.encode())
+    local = str(tmp_path) + '/'
+    connection = f's3://test:test@moto/{bucket}/{cos_path}'
+
+    cosutils.run(connection, local, 'sync_to_local', manifest=str(tmp_path / 'manifest.json'))
+    expected = ['other', 's/a', 's/b/c', 'sXYZ'] if cos_path == '' else ['s/a', 's/b/c']
+    assert transfers['download'] == [len(expected)]
+    assert all((tmp_path / bucket / key).exists() for key in expected)
+    if cos_path:
+        assert not (tmp_path / bucket / 'sXYZ').exists()
+
+    cosutils.run(connection, local, 'sync_to_local', manifest=str(tmp_path / 'manifest.json'))
+    cosutils.run(connection, local, 'sync_to_local')
+    assert transfers['download'] == [len(expected), 0, 0]
+
+
+def test_sync_to_cos_twice_transfers_nothing(endpoint, bucket, tmp_path, transfers, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for path in ('data/a', 'data/sub/b', 'data2/c'):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(path)
+    connection = f's3://test:test@moto/{bucket}/'
+
+    for _ in range(2):
+        cosutils.run(connection, 'data', 'sync_to_cos')
+    assert transfers['upload'] == [2, 0]
+    assert sorted(o['Key'] for o in _client(endpoint).list_objects_v2(Bucket=bucket)['Contents']) == ['data/a', 'data/sub/b']
+
+
+def test_interrupted_upload_resumes_missing_parts(endpoint, bucket, tmp_path, monkeypatch):
+    monkeypatch.setattr(cosutils, 'MIN_CHUNK_SIZE', 5 * MiB)
+    data = os.urandom(12 * MiB)
+    (tmp_path / 'large').write_bytes(data)
+    engine = _engine(endpoint, tmp_path, max_concurrent_parts=1, max_retries=1)
+    put_part = engine._put_part
+    sent, failed = [], []
+
+    def failing_put_part(view, **kwargs):
+        sent.append(kwargs.get('PartNumber'))
+        if kwargs.get('PartNumber') == 3 and not failed:
+            failed.append(3)
+            raise IOError('connection reset')
+        return put_part(view, **kwargs)
+
+    monkeypatch.setattr(engine, '_put_part', failing_put_part)
+    with pytest.raises(IOError):
+        engine.upload([(str(tmp_path / 'large'), f'{bucket}/large')])
+    assert len(os.listdir(tmp_path / 'state')) == 1
+
+    sent.clear()
+    engine.upload([(str(tmp_path / 'large'), f'{bucket}/large')])
+    assert sent == [3]
+    assert _client(endpoint).get_object(Bucket=bucket, Key='large')['Body'].read() == data
+    assert not os.listdir(tmp_path / 'state')
+
+
+def test_mapped_views_are_not_copied(tmp_path):
+    (tmp_path / 'file').write_bytes(b'0123456789')
+    with cosutils._mapped(str(tmp_path / 'file')) as view:
+        reader = cosutils._MemoryViewReader(view)
+        reader.seek(2)
+        chunk = reader.read(3)
+        assert isinstance(chunk, memoryview) and chunk.obj is view.obj
+        assert bytes(chunk) == b'234'
+        assert bytes(reader.read()) == b'56789'
+        chunk.release()
+
+    (tmp_path / 'target').write_bytes(b'\0' * 6)
+    with cosutils._mapped(str(tmp_path / 'target'), writable=True) as view:
+        assert cosutils._readinto(cosutils._MemoryViewReader(memoryview(b'abcdef')), view[1:4]) == 3
+    assert (tmp_path / 'target').read_bytes() == b'\0abc\0\0'
+    # the ETag of a single-part upload is the MD5 of the mapped file
+    assert cosutils._file_etag(str(tmp_path / 'file'), 10) == '781e5e245d69b566979b86e28d23f2c7'
+
+
+def test_download_object_uploaded_with_other_part_size(endpoint, bucket, tmp_path, transfers):
+    from boto3.s3.transfer import TransferConfig
+
+    data = os.urandom(20 * MiB)
+    (tmp_path / 'source').write_bytes(data)
+    _client(endpoint).upload_file(str(tmp_path / 'source'), bucket, 'data/large',
+                                  Config=TransferConfig(multipart_threshold=5 * MiB, multipart_chunksize=5 * MiB))
+    etag = _client(endpoint).head_object(Bucket=bucket, Key='data/large')['ETag'].strip('"')
+    assert etag.endswith('-4')
+
+    engine = _engine(endpoint, tmp_path)
+    engine.download([(f'{bucket}/data/large', str(tmp_path / 'out' / 'large'))])
+    assert (tmp_path / 'out' / 'large').read_bytes() == data
+    assert engine.matches_etag(str(tmp_path / 'out' / 'large'), f'{bucket}/data/large', len(data), etag)
+    (tmp_path / 'corrupt').write_bytes(data[:-1] + b'\0')
+    assert engine.matches_etag(str(tmp_path / 'corrupt'), f'{bucket}/data/large', len(data), etag) is False
+
+    # the checksum comparison of a sync recognizes the identical local copy
+    local = str(tmp_path / 'sync') + '/'
+    os.makedirs(f'{local}{bucket}/data')
+    (tmp_path / 'sync' / bucket / 'data' / 'large').write_bytes(data)
+    cosutils.run(f's3://test:test@moto/{bucket}/data/', local, 'sync_to_local', checksum=True)
+    assert transfers['download'][-1] == 0
@@ -0,0 +1,61 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import tarfile
+
+from c3 import create_containerless_operator as cco
+from c3.create_containerless_operator import get_env, get_env_hash, normalize_requirements
+
+
+def test_normalize_requirements():
+    assert normalize_requirements(' Pandas numpy==1.26 pandas Scikit_Learn>=1.0 ') == \
+        ['numpy==1.26', 'pandas', 'scikit-learn>=1.0']
+    # pip options keep their order
+    assert normalize_requirements('-r requirements.txt numpy') == ['-r', 'requirements.txt', 'numpy']
+    assert get_env_hash(normalize_requirements('numpy pandas')) == \
+        get_env_hash(normalize_requirements('pandas numpy numpy'))
+    assert get_env_hash(['numpy']) != get_env_hash(['numpy==1.26'])
+
+
+def test_get_env_reuses_cached_environment(tmp_path, monkeypatch):
+    commands = []
+
+    def run(command, **kwargs):
+        commands.append(command)
+        if command[1:3] == ['-m', 'venv']:
+            os.makedirs(os.path.join(command[3], 'bin'))
+        return subprocess.CompletedProcess(command, 0, stdout='')
+
+    monkeypatch.setattr(cco.subprocess, 'run', run)
+    env_path = get_env(['numpy'], str(tmp_path))
+    assert env_path == str(tmp_path / get_env_hash(['numpy']))
+    assert [c[1:3] for c in commands] == [['-m', 'venv'], ['install', 'numpy'], ['list']]
+
+    commands.clear()
+    assert get_env(['numpy'], str(tmp_path)) == env_path
+    assert commands == []
+
+    # an interrupted installation without the complete marker is recreated
+    os.remove(os.path.join(env_path, cco.ENV_COMPLETE_MARKER))
+    assert get_env(['numpy'], str(tmp_path)) == env_path
+    assert commands[0][1:3] == ['-m', 'venv']
+
+
+def test_create_containerless_operator_archive(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    shutil.copy(os.path.join(os.path.dirname(__file__), 'example_script.py'), 'example_script.py')
+    monkeypatch.setattr(cco, 'get_env', lambda requirements, cache_path: str(tmp_path / 'envs' / 'abc'))
+
+    cco.create_containerless_operator('example_script.py', '0.1', archive_format='tar', precompile=True)
+    archive = tmp_path / 'claimed-example_script:0.1.tar'
+    with open(f'{archive}.sha256') as f:
+        assert f.read() == hashlib.sha256(archive.read_bytes()).hexdigest()
+    with tarfile.open(archive) as tar:
+        names = tar.getnames()
+        assert tar.extractfile(cco.ENV_HASH_FILE).read() == b'abc'
+        assert tar.extractfile(cco.ENV_REQUIREMENTS_FILE).read() == b'numpy pandas'
+    assert {'runnable.py', cco.ENV_HASH_FILE, cco.ENV_REQUIREMENTS_FILE} <= set(names)
+    assert any(n.startswith('__pycache__/runnable.') and n.endswith('.pyc') for n in names)
+    assert (tmp_path / 'example_script.cwl').is_file()
+    assert not (tmp_path / 'runnable.py').exists()
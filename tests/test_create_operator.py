@@ -0,0 +1,52 @@
+import pytest
+
+from c3 import templates
+from c3.create_operator import create_dockerfile, find_component_files, _resolve_existing_files
+
+
+def test_find_component_files(tmp_path):
+    for name in ['a.py', 'sub/b.ipynb', 'sub/c.R', '_private.py', 'claimed_a.py', 'notes.txt',
+                 '.ipynb_checkpoints/b-checkpoint.ipynb']:
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text('')
+    expected = sorted(str(tmp_path / name) for name in ['a.py', 'sub/b.ipynb', 'sub/c.R'])
+    assert find_component_files(str(tmp_path)) == expected
+    assert find_component_files(str(tmp_path / '**' / '*.py')) == [str(tmp_path / 'a.py')]
+
+
+def test_resolve_existing_files_asks_once(tmp_path, monkeypatch):
+    file_paths = [str(tmp_path / f'{name}.py') for name in 'abc']
+    for name in 'ab':
+        (tmp_path / f'{name}.job.yaml').write_text('')
+    prompts = []
+    monkeypatch.setattr('builtins.input', lambda prompt: prompts.append(prompt) or '')
+
+    assert _resolve_existing_files(file_paths) == ('', False)
+    assert len(prompts) == 1 and 'Found 2 existing' in prompts[0]
+    assert _resolve_existing_files(file_paths, overwrite_files=True) == (None, True)
+    assert _resolve_existing_files(file_paths, rename_files='y') == ('y', True)
+    assert len(prompts) == 1
+
+    (tmp_path / 'modified_a.job.yaml').write_text('')
+    monkeypatch.setattr('builtins.input', lambda prompt: 'n')
+    with pytest.raises(FileExistsError):
+        _resolve_existing_files(file_paths, rename_files='y')
+    with pytest.raises(ValueError):
+        _resolve_existing_files(file_paths, rename_files='custom')
+
+
+@pytest.mark.parametrize('optimize_layers', [False, True])
+def test_create_dockerfile_chmods_working_dir(tmp_path, monkeypatch, optimize_layers):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'requirements.txt').write_text('numpy\n')
+    template = (templates.python_optimized_dockerfile_template if optimize_layers
+                else templates.python_dockerfile_template)
+    create_dockerfile(template, 'Dockerfile', ['pip install -r requirements.txt'], 'component.py', '',
+                      ['data.csv'], '/opt/app-root/src/', 'python', 'python3.12',
+                      optimize_layers=optimize_layers, precompile=optimize_layers)
+    dockerfile = (tmp_path / 'Dockerfile').read_text()
+    lines = dockerfile.splitlines()
+    assert 'RUN chmod -R 777 /opt/app-root/src/' in lines
+    # everything added to the working directory is made writable, including the precompiled bytecode
+    assert lines.index('RUN chmod -R 777 /opt/app-root/src/') > max(
+        i for i, line in enumerate(lines) if line.startswith(('ADD ', 'RUN python -m compileall')))
@@ -0,0 +1,49 @@
+from pathlib import Path
+
+from c3.parser import ContentParser
+
+TESTS_DIR = Path(__file__).parent
+
+
+def test_parse_interface_example_script():
+    interface = ContentParser().parse_interface(str(TESTS_DIR / 'example_script.py'))
+    assert interface['inputs'] == {
+        'input_path': {'description': 'A comment one line above os.getenv is the description of this variable.',
+                       'type': 'String', 'default': ''},
+        'batch_size': {'description': 'type casting to int(), float(), or bool()', 'type': 'Integer', 'default': '16'},
+        'debug': {'description': 'Commas in the previous comment are deleted because the yaml file requires '
+                                 'descriptions without commas.', 'type': 'Boolean', 'default': 'False'},
+        'output_path': {'description': '', 'type': 'String', 'default': 'default_value'},
+    }
+    assert interface['outputs'] == ['test_output']
+
+
+def test_parse_interface_multiline_and_subscript(tmp_path):
+    script = tmp_path / 'script.py'
+    script.write_text(
+        'import os\n'
+        '\n'
+        '# learning rate\n'
+        'lr = float(os.getenv(\n'
+        "    'lr',\n"
+        "    '0.1',\n"
+        '))\n'
+        "# os.environ['commented'] = 'x'\n"
+        "token = os.environ['token']\n"
+        "os.environ['result'] = str(lr)\n"
+    )
+    interface = ContentParser().parse_interface(str(script))
+    assert interface['inputs'] == {
+        'lr': {'description': 'learning rate', 'type': 'Float', 'default': '0.1'},
+        'token': {'description': '', 'type': 'String', 'default': None},
+    }
+    assert interface['outputs'] == ['result']
+
+
+def test_parse_interface_rscript():
+    interface = ContentParser().parse_interface(str(TESTS_DIR / 'example_rscript.R'))
+    assert interface['inputs'] == {
+        'name': {'description': '', 'type': 'String', 'default': None},
+        'default': {'description': '', 'type': 'String', 'default': 'default'},
+        'number': {'description': '', 'type': 'String', 'default': '10'},
+    }
@@ -0,0 +1,92 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from claimed.pipeline import run_pipeline, step_command
+
+MODULE = '''
+import json
+
+
+def run(source: str, target: str, options: str = '{}'):
+    with open(source) as f:
+        data = f.read()
+    with open(target, 'w') as f:
+        f.write(json.dumps({'data': data, 'options': json.loads(options)}))
+    with open('runs.log', 'a') as f:
+        f.write(target + '\\n')
+'''
+
+DAG = '''
+steps:
+  first:
+    module: pipeline_test_module
+    params: {source: input.txt, target: first.json, options: {label: "a b 'c'"}}
+    inputs: [input.txt]
+    outputs: [first.json]
+  second:
+    module: pipeline_test_module
+    params: {source: first.json, target: second.json}
+    outputs: [second.json]
+    depends_on: [first]
+'''
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    (tmp_path / 'pipeline_test_module.py').write_text(MODULE)
+    (tmp_path / 'dag.yaml').write_text(DAG)
+    (tmp_path / 'input.txt').write_text('1')
+    src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+    monkeypatch.setenv('PYTHONPATH', os.pathsep.join([str(tmp_path), src, os.path.join(src, 'claimed')]))
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def runs(workdir):
+    return (workdir / 'runs.log').read_text().split()
+
+
+def test_pipeline_cache(workdir):
+    results = run_pipeline('dag.yaml')
+    assert {name: r['status'] for name, r in results.items()} == {'first': 'success', 'second': 'success'}
+    assert json.loads((workdir / 'first.json').read_text())['options'] == {'label': "a b 'c'"}
+    assert runs(workdir) == ['first.json', 'second.json']
+
+    # unchanged inputs: both steps are cached
+    results = run_pipeline('dag.yaml')
+    assert {r['status'] for r in results.values()} == {'cached'}
+    assert len(runs(workdir)) == 2
+
+    # changed input invalidates the step and its dependents
+    (workdir / 'input.txt').write_text('2')
+    results = run_pipeline('dag.yaml')
+    assert {r['status'] for r in results.values()} == {'success'}
+    assert runs(workdir)[2:] == ['first.json', 'second.json']
+
+    # modified output only reruns the step that created it
+    (workdir / 'second.json').write_text('modified')
+    results = run_pipeline('dag.yaml')
+    assert results['first']['status'] == 'cached' and results['second']['status'] == 'success'
+    assert runs(workdir)[4:] == ['second.json']
+
+
+def test_component_step_arguments(workdir, monkeypatch):
+    # fake docker that records its arguments
+    (workdir / 'bin').mkdir()
+    (workdir / 'bin' / 'docker').write_text('#!/bin/sh\nfor arg in "$@"; do echo "$arg"; done > docker_args\n')
+    (workdir / 'bin' / 'docker').chmod(0o755)
+    monkeypatch.setenv('PATH', f"{workdir / 'bin'}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.delenv('CLAIMED_DATA_PATH', raising=False)
+    monkeypatch.setenv('CLAIMED_GPUS', '1,3')
+
+    command = step_command({'component': 'docker.io/user/claimed-train:0.1',
+                            'params': {'config': {'a': 'b c'}, 'name': "x 'y'", 'debug': True}})
+    assert command[:4] == [sys.executable, '-m', 'claimed.claimed', '--component']
+    assert subprocess.run(command, stdout=subprocess.DEVNULL).returncode == 0
+    assert (workdir / 'docker_args').read_text().splitlines() == [
+        'run', '--env', 'config={"a": "b c"}', '--env', "name=x 'y'", '--env', 'debug=true',
+        '--gpus', '"device=1,3"', 'docker.io/user/claimed-train:0.1']
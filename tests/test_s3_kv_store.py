@@ -0,0 +1,84 @@
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
+from claimed.mlx.s3_kv_store import S3KVStore, ConcurrentUpdateError, _update_requests
+
+BUCKET = 'kv-test'
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'test')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'test')
+    with mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket=BUCKET)
+        yield S3KVStore(BUCKET, 'store', s3_client=client)
+
+
+def test_update_if_match(store):
+    store.put('job', {'v': 0}, indexes={'state': 'new'})
+    _, etag = store.get_with_etag('job')
+    store.update('job', {'v': 1}, if_match=etag)
+    with pytest.raises(ConcurrentUpdateError):
+        store.update('job', {'v': 2}, if_match=etag)
+    with pytest.raises(ConcurrentUpdateError):
+        store.update('job', {'v': 2}, new_indexes={'state': 'done'}, if_match=etag)
+    assert store.get('job') == {'v': 1}
+    assert [i['indexes'] for i in store.list()] == [{'state': 'new'}]
+
+
+def test_concurrent_index_changes_only_one_wins(store):
+    store.put('job', {'v': 0}, indexes={'state': 'new'})
+    old = store.list()[0]
+    payloads = {'a': b'{"v": "a"}', 'b': b'{"v": "b"}'}
+    requests = {
+        name: _update_requests(BUCKET, old, store._s3_key_for_filename(f'job__i__state={name}.json'), payloads[name])
+        for name in payloads
+    }
+
+    def call(method, kwargs):
+        return getattr(store.s3, method)(**kwargs)
+
+    # both updaters write their new object before either deletes the old one
+    steps = {name: next(r) for name, r in requests.items()}
+    responses = {name: call(*step) for name, step in steps.items()}
+    steps = {name: requests[name].send(responses[name]) for name in requests}
+    with pytest.raises(StopIteration):
+        requests['a'].send(call(*steps['a']))
+    with pytest.raises(ClientError) as e:
+        call(*steps['b'])
+    rollback = requests['b'].throw(e.value)
+    with pytest.raises(ConcurrentUpdateError):
+        requests['b'].send(call(*rollback))
+
+    assert store.get('job') == {'v': 'a'}
+    assert [i['indexes'] for i in store.list()] == [{'state': 'a'}]
+
+
+def test_drop_superseded_reraises_errors(store, monkeypatch):
+    store.put('job', {'v': 0}, indexes={'state': 'a'})
+    store.put('job', {'v': 1}, indexes={'state': 'b'})
+
+    def forbidden(**kwargs):
+        raise ClientError({'Error': {'Code': '403'}}, 'HeadObject')
+
+    monkeypatch.setattr(store.s3, 'head_object', forbidden)
+    with pytest.raises(ClientError):
+        store.get('job')
+
+
+def test_iter_items_pages_and_prefix(store):
+    for i in range(5):
+        store.put(f'job-{i}', {'i': i}, indexes={'even': i % 2 == 0})
+    store.put('other', {'i': -1})
+    calls = []
+    store.s3.meta.events.register('provide-client-params.s3.ListObjectsV2', lambda **kwargs: calls.append(kwargs['params']))
+
+    items = list(store.iter_items(prefix='job-', page_size=2))
+    assert [i['key'] for i in items] == [f'job-{i}' for i in range(5)]
+    assert len(calls) == 3
+    assert all(c['Prefix'] == 'store/job-' for c in calls)
+    assert [i['key'] for i in store.iter_items(index_filter={'even': 'True'})] == ['job-0', 'job-2', 'job-4']
@@ -0,0 +1,93 @@
+import boto3
+import pytest
+from moto import mock_aws
+
+from claimed.mlx import s3_segment_store
+from claimed.mlx.s3_segment_store import S3SegmentKVStore
+
+BUCKET = 'segment-test'
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'test')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'test')
+    with mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def test_segments_roundtrip_and_compact(client):
+    with S3SegmentKVStore(BUCKET, 'store', s3_client=client) as store:
+        for i in range(10):
+            store.put(f'job-{i}', {'i': i}, indexes={'state': 'new'})
+        store.flush()
+        store.update('job-1', {'i': 1, 'done': True}, new_indexes={'state': 'done'})
+        store.delete('job-2')
+
+    # a fresh reader only sees the segment footers and values
+    reader = S3SegmentKVStore(BUCKET, 'store', s3_client=client)
+    assert reader.get('job-1') == {'i': 1, 'done': True}
+    assert [e['key'] for e in reader.search({'state': 'done'})] == ['job-1']
+    with pytest.raises(KeyError):
+        reader.get('job-2')
+    assert len(reader.list()) == 9
+
+    assert reader.compact() is None
+    reader.compact(settle_seconds=0)
+    listing = client.list_objects_v2(Bucket=BUCKET, Prefix='store/segments/')['Contents']
+    assert len(listing) == 1
+    assert reader.get_many(['job-0', 'job-1', 'job-2']) == {'job-0': {'i': 0}, 'job-1': {'i': 1, 'done': True}}
+
+
+def test_put_does_not_list(client):
+    calls = []
+    client.meta.events.register('before-call.s3.*', lambda model, **kwargs: calls.append(model.name))
+    store = S3SegmentKVStore(BUCKET, 'store', s3_client=client, buffer_bytes=1024)
+    for i in range(200):
+        store.put(f'job-{i}', {'i': i})
+    with pytest.raises(FileExistsError):
+        store.put('job-1', {'i': 1})
+    store.put('job-1', {'i': -1}, indexes={'state': 'done'}, overwrite=True)
+    store.flush()
+    # writes only upload segments
+    assert set(calls) == {'PutObject'}
+
+    assert store.get('job-1') == {'i': -1}
+    assert len(store.list()) == 200
+    assert 'ListObjectsV2' in calls
+
+
+def test_compact_keeps_concurrent_segments(client, monkeypatch):
+    store = S3SegmentKVStore(BUCKET, 'store', s3_client=client)
+    for i in range(3):
+        store.put('job', {'i': i}, overwrite=True)
+        store.flush()
+    first, second, last = sorted(store._footers)
+    writer = S3SegmentKVStore(BUCKET, 'store', s3_client=boto3.client('s3', region_name='us-east-1'))
+    segment_name = s3_segment_store._segment_name
+
+    # a slow writer's segment with an older timestamp shows up while compacting
+    def slow_flush(**kwargs):
+        if not writer._buffer:
+            return
+        timestamp = second[len('store/segments/'):].split('-', 1)[0]
+        monkeypatch.setattr(s3_segment_store, '_segment_name', lambda: f"{timestamp}-{'f' * 32}.seg")
+        writer.flush()
+
+    writer.put('other', {'i': 0})
+    client.meta.events.register('before-call.s3.GetObject', slow_flush)
+    assert store.compact(settle_seconds=0) is None
+    client.meta.events.unregister('before-call.s3.GetObject', slow_flush)
+    monkeypatch.setattr(s3_segment_store, '_segment_name', segment_name)
+    assert len(client.list_objects_v2(Bucket=BUCKET, Prefix='store/segments/')['Contents']) == 4
+
+    merged = store.compact(settle_seconds=0)
+    assert merged > last.replace('.seg', '')
+    assert store.get('job') == {'i': 2} and store.get('other') == {'i': 0}
+    # the merged segment sorts after its inputs but before segments flushed later
+    store.put('job', {'i': 3}, overwrite=True)
+    assert store.flush() > merged
+    again = store.compact(settle_seconds=0)
+    assert again > merged and S3SegmentKVStore(BUCKET, 'store', s3_client=client).get('job') == {'i': 3}
@@ -0,0 +1,36 @@
+import importlib.util
+import json
+from pathlib import Path
+
+import boto3
+import pytest
+from moto import mock_aws
+
+BENCH_DIR = Path(__file__).parent.parent / 'bench'
+spec = importlib.util.spec_from_file_location('s3kv_bench', BENCH_DIR / 's3kv_bench.py')
+s3kv_bench = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(s3kv_bench)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'test')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'test')
+    with mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket='bench-test')
+        yield client
+
+
+def test_request_counts_match_baseline(client):
+    results = {'1000': s3kv_bench.run_size(client, 'bench-test', 1000, 3, samples=5, scan_samples=1)}
+    baseline = json.loads((BENCH_DIR / 's3kv_baseline.json').read_text())
+    assert s3kv_bench.compare(results, baseline) == []
+
+
+def test_compare_reports_regressions():
+    baseline = {'results': {'10': {'get': {'requests_per_op': 2.0, 'p99_ms': 1.0}}}}
+    results = {'10': {'get': {'requests_per_op': 3.0, 'p99_ms': 5.0}}}
+    assert len(s3kv_bench.compare(results, baseline)) == 1
+    assert len(s3kv_bench.compare(results, baseline, latency_tolerance=0.5)) == 2
+    assert s3kv_bench.compare(results, baseline, request_tolerance=0.5) == []
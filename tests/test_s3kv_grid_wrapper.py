@@ -0,0 +1,153 @@
+import importlib
+import os
+import sys
+
+import pytest
+from moto import mock_aws
+
+from c3 import templates
+
+COMPONENT = '''
+def process(batch, *args):
+    pass
+'''
+
+
+@pytest.fixture(scope='module')
+def gw(tmp_path_factory):
+    # render the wrapper for a no-op component and import it
+    path = tmp_path_factory.mktemp('gw')
+    (path / 'component_noop.py').write_text(COMPONENT)
+    code = templates.get_template(templates.S3KV_GRID_WRAPPER_FILE).substitute(
+        component_name='component_noop',
+        component_description='no-op component',
+        component_dependencies='',
+        component_inputs='',
+        component_interface='',
+        component_process='process',
+    )
+    (path / 'gw_noop.py').write_text(code)
+    sys.path.insert(0, str(path))
+    try:
+        yield importlib.import_module('gw_noop')
+    finally:
+        sys.path.remove(str(path))
+
+
+def _usage(cache_dir):
+    return sum(os.path.getsize(cache_dir / f) for f in os.listdir(cache_dir) if f.endswith('.json'))
+
+
+def test_lru_disk_cache_budget_is_shared(gw, tmp_path):
+    # two caches on one directory stand in for two worker processes
+    value = {'data': 'x' * 90}
+    with gw.LRUDiskCache(str(tmp_path), max_bytes=1000) as a, gw.LRUDiskCache(str(tmp_path), max_bytes=1000) as b:
+        for i in range(10):
+            a.put(f'a{i}', value)
+            b.put(f'b{i}', value)
+            assert _usage(tmp_path) <= 1000
+        assert b.get('a9') == value
+        assert a.get('a0') is None
+        a.delete('b9')
+        assert b.get('b9') is None
+
+
+def test_lru_disk_cache_evicts_least_recently_read(gw, tmp_path):
+    with gw.LRUDiskCache(str(tmp_path), max_entries=3) as cache:
+        for i in range(3):
+            cache.put(f'k{i}', i)
+        # k0 and k1 were read long ago, then k0 again now
+        for i in range(2):
+            path = tmp_path / f'k{i}.json'
+            os.utime(path, (i, path.stat().st_mtime))
+        cache.get('k0')
+        cache.put('k3', 3)
+        assert [cache.get(f'k{i}') for i in range(4)] == [0, None, 2, 3]
+
+
+def test_lru_disk_cache_background_cleanup_stops(gw, tmp_path):
+    cache = gw.LRUDiskCache(str(tmp_path), max_age_days=0, cleanup_interval=0.01, background_cleanup=True)
+    thread = cache._thread
+    cache.close()
+    assert not thread.is_alive()
+
+
+@pytest.fixture
+def s3kv(gw, tmp_path, monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'test')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'test')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    with mock_aws():
+        store = gw.S3KV(None, 'gw-test', cache_dir=str(tmp_path / 'cache'), max_workers=4)
+        store.s3_client.create_bucket(Bucket='gw-test')
+        yield store
+        store.close()
+
+
+def test_find_keys_by_tag_value_without_index(s3kv, caplog):
+    for i in range(4):
+        s3kv.add(f'k{i}', {'i': i})
+    # tagged directly, as before the tag index existed
+    for i in range(2):
+        s3kv.s3_client.put_object_tagging(Bucket='gw-test', Key=f's3kv/k{i}.json',
+                                          Tagging={'TagSet': [{'Key': 'state', 'Value': 'done'}]})
+    s3kv.tag_key('k2', {'state': 'done'})
+
+    assert sorted(s3kv.find_keys_by_tag_value('state', 'done')) == ['k0', 'k1', 'k2']
+    assert 'rebuild_tag_index' in caplog.text
+
+    s3kv.rebuild_tag_index()
+    assert s3kv.has_tag_index()
+    s3kv.tag_key('k0', {'state': 'new'})
+    assert sorted(s3kv.find_keys_by_tag_value('state', 'done')) == ['k1', 'k2']
+    s3kv.delete_by_tag('state', 'done', max_workers=2)
+    assert s3kv.list_keys() == ['k0', 'k3']
+
+
+def test_fetch_many_and_merge_keys(s3kv):
+    for i in range(20):
+        s3kv.add(f'k{i:02d}', {f'k{i:02d}': i, 'last': i})
+    fetched = dict(s3kv.fetch_many(iter([f'k{i:02d}' for i in range(20)] + ['missing']), max_workers=2, cache=True))
+    assert fetched['missing'] is None
+    assert fetched['k07'] == {'k07': 7, 'last': 7}
+    assert s3kv.get_from_cache('k07') == {'k07': 7, 'last': 7}
+
+    s3kv.merge_keys(['k03', 'k01', 'k02'], 'merged', max_workers=3)
+    assert s3kv.get('merged') == {'k01': 1, 'k02': 2, 'k03': 3, 'last': 2}
+
+
+def test_coordinator_states(gw, s3kv):
+    def process(batch, *args):
+        if batch == 'bad':
+            raise ValueError('bad batch')
+
+    s3kv.add_if_absent(gw.get_batch_id('taken'), 'locked')
+    states = gw.get_coordinator_states(s3kv)
+    for batch in ('ok', 'bad', 'taken'):
+        gw.perform_process(process, batch, s3kv, states)
+    # a long error message or a changed payload must not change the state
+    s3kv.add(gw.get_state_key(gw.get_batch_id('bad'), 'failed'), 'x' * 7)
+
+    expected = {gw.get_batch_id('ok'): 'processed', gw.get_batch_id('bad'): 'failed', gw.get_batch_id('taken'): 'locked'}
+    assert states == expected
+    assert gw.get_coordinator_states(s3kv) == expected
+
+    calls = []
+    gw.perform_process(lambda *args: calls.append(args), 'ok', s3kv)
+    assert calls == []
+
+
+def test_lru_disk_cache_evicts_to_low_water(gw, tmp_path, monkeypatch):
+    with gw.LRUDiskCache(str(tmp_path), max_entries=100) as cache:
+        for i in range(100):
+            cache.put(f'k{i}', i)
+        scans = []
+        rebalance = cache._rebalance
+        monkeypatch.setattr(cache, '_rebalance', lambda *args: scans.append(1) or rebalance(*args))
+        cache.put('k100', 100)
+        assert len(os.listdir(tmp_path)) - 2 == 90
+        # the following writes fit below the budget without scanning the directory
+        for i in range(101, 111):
+            cache.put(f'k{i}', i)
+        assert len(scans) == 1
+        assert cache.get('k110') == 110 and cache.get('k0') is None